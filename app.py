@@ -1,9 +1,729 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-import pyodbc
-import io
+import time
+import uuid
+
+import charts
+import cleaning
+import datastore
+import export
+import filters
+import ingest
+import instrumentation
+import jobs
+import outofcore
+import profiling
+import sql_source
+import stats
+import viewer
+
+# Frames are cached and shared between reruns/sessions; copy-on-write keeps the
+# per-session shallow copies from writing through to the cached data.
+if int(pd.__version__.split(".")[0]) < 3:
+    pd.set_option("mode.copy_on_write", True)
+
+
+def render_chart(key, build, fmt):
+    """Render a chart on the job pool; requesting another chart cancels this one."""
+    return jobs.run("chart", (*key, fmt), charts.render, key, build, fmt, label="Rendering chart...")
+
+
+def load_sql_frame(pool, ref, compact, holder):
+    """Load ``ref`` into the dataset store, held by ``holder``, and return its content version.
+
+    Identical extracts loaded by other sessions get the same version, so the
+    store keeps one of them.
+    """
+    with pool.connection() as conn:
+        frame = sql_source.load_table(conn, ref)
+    if compact:
+        frame = ingest.compact_frame(frame)
+    jobs.report(message="Hashing rows...")
+    version = datastore.content_version(frame)
+    datastore.put(version, frame, holder)
+    return version
+
+
+def replay_cleaning(df, steps, version):
+    """Replay ``steps``; the snapshots stay in the dataset store and only the version is returned."""
+    _, version, error = cleaning.run(df, steps, version)
+    # The message, not the exception: its traceback would keep the frames alive
+    return version, error and (error[0], str(error[1]))
+
+
+def holder():
+    """This session's holder id in the dataset store."""
+    if "_holder_" not in st.session_state:
+        st.session_state._holder_ = uuid.uuid4().hex
+    return st.session_state._holder_
+
+
+def hold_data(*versions):
+    """Keep ``versions`` in the store for this session; what it held before may be evicted."""
+    datastore.hold(holder(), versions)
+
+
+def apply_cleaning(df, steps, version):
+    """Replay ``steps`` on the job pool; returns the cleaned view, its version and the error."""
+    key = cleaning.step_versions(version, steps)[-1]
+    hold_data(version, key)
+    for _ in range(2):
+        clean_version, error = jobs.run("clean", key, replay_cleaning, df, steps, version,
+                                        label="Applying cleaning steps...")
+        hold_data(version, clean_version)
+        cleaned = datastore.get(clean_version)
+        if cleaned is not None:
+            return cleaned, clean_version, error
+        # Evicted since the replay ran; the finished job would only hand back its version again
+        jobs.runner().cancel("clean")
+    st.rerun()
+
+
+def spool_dataset(source, version):
+    """Out-of-core dataset of ``source`` (content fingerprint ``version``), stored as ``{version}:ooc``."""
+    ds = jobs.run("spool", version, outofcore.spool_csv, source, version,
+                  label="Writing the CSV to the on-disk store...", where=st.sidebar)
+    if not ds.exists():
+        # The spooled file was pruned while the session was idle; write it again
+        jobs.runner().cancel("spool")
+        st.rerun()
+    return datastore.put(f"{version}:ooc", ds, holder())
+
+
+def checkout(version):
+    """This session's view of dataset ``version`` (``None`` when no data is loaded)."""
+    if version is None:
+        return None
+    df = datastore.get(version)
+    if df is None:
+        # Evicted while the session was idle; a full rerun loads it again
+        st.rerun()
+    return df
+
+
+def export_button(version, build, name, key):
+    """Format picker and download button for the data ``build()`` returns.
+
+    The file is encoded when the button is clicked, once per ``version`` and
+    format. ``build`` should fetch the data rather than hold it, so the
+    button does not keep the frame alive between reruns.
+    """
+    # The file is built outside the script run, so a failure is shown on the next rerun
+    errors = st.session_state.setdefault("_export_errors_", {})
+    if key in errors:
+        st.error(f"Export failed: {errors.pop(key)}")
+    e1, e2 = st.columns([1, 2])
+    fmt = e1.selectbox("Export format", list(export.FORMATS), key=f"{key}_export_format")
+    ext, mime = export.FORMATS[fmt]
+
+    def data():
+        try:
+            return export.export(version, build, fmt)
+        except Exception as e:
+            errors[key] = f"{fmt}: {e}"
+            raise
+    e2.download_button(f"📥 Download as {fmt}", data=data, file_name=f"{name}{ext}", mime=mime,
+                       on_click="ignore", key=f"{key}_export")
+
+
+def show_filtered(df, predicates, version, key, view_version, columns=None):
+    """Show the rows of ``df`` matching ``predicates``; out-of-core results are capped."""
+    if isinstance(df, outofcore.Dataset):
+        filtered_df, total = jobs.run("filter", view_version, df.filter, predicates, columns,
+                                      label="Scanning row groups...")
+        st.caption(f"{total:,} matching rows, showing the first {len(filtered_df):,}")
+        # The export streams every matching row from the store, not just those shown
+        build = lambda: df.scanner(predicates, columns)
+    else:
+        filtered_df = filters.apply_filters(df, predicates, version, columns=columns)
+        build = lambda: filters.apply_filters(datastore.get(version), predicates, version, columns=columns)
+    viewer.show_frame(filtered_df, key=key, version=view_version)
+    export_button(view_version, build, "filtered_data", key)
+
+
+def show_chart(image, name, fmt):
+    """Display rendered chart bytes and offer the same bytes for download."""
+    st.image(image.decode() if fmt == "svg" else image, width="stretch")
+    st.download_button(f"📥 Download Chart as {fmt.upper()}", data=image, file_name=f"{name}.{fmt}",
+                       mime=charts.FORMATS[fmt], on_click="ignore")
+
+
+# Metadata for the pushed-down SQL filter; cached so reruns skip the round trip
+@st.cache_data(ttl=600, show_spinner=False)
+def sql_sample(conn_str, ref, dialect_name):
+    with sql_source.get_pool(conn_str).connection() as conn:
+        return sql_source.sample_frame(conn, ref, dialect_name)
+
+
+@st.cache_data(ttl=600, show_spinner=False)
+def sql_primary_key(conn_str, database, schema, table, dialect_name):
+    with sql_source.get_pool(conn_str).connection() as conn:
+        return tuple(sql_source.primary_key(conn, database, schema, table, dialect_name))
+
+
+@st.cache_data(ttl=600, show_spinner=False)
+def sql_distinct_values(conn_str, ref, column, dialect_name, search=""):
+    """Up to ``DISTINCT_LIMIT`` values of ``column`` and whether the column has more."""
+    limit = sql_source.DISTINCT_LIMIT
+    with sql_source.get_pool(conn_str).connection() as conn:
+        values = sql_source.distinct_values(conn, ref, column, dialect_name, limit=limit + 1, search=search)
+    return values[:limit], len(values) > limit
+
+
+@st.cache_data(ttl=600, show_spinner=False)
+def sql_column_bounds(conn_str, ref, columns, dialect_name):
+    with sql_source.get_pool(conn_str).connection() as conn:
+        return sql_source.column_bounds(conn, ref, list(columns), dialect_name)
+
+
+# The sections below are fragments: using a widget inside one reruns only that
+# section, with the arguments of the last full run. Changes that affect the
+# data (cleaning steps) call st.rerun() so the whole script sees them. They
+# take the data version rather than the frame, so a session's stored
+# fragments do not keep an evicted dataset alive.
+@st.fragment
+@instrumentation.section("eda")
+def eda_section(data_version, is_out_of_core):
+    df = checkout(data_version)
+    st.subheader("🔍EDA")
+    st.write("Perform basic EDA on your uploaded CSV file")
+    c1, c2, c3, c4, c5, c6 ,c7= st.columns([1,1,1,1,1,1.5,1])
+
+        # Track which button is clicked
+    head_btn = c1.button('Head')
+    tail_btn = c2.button('Tail')
+    shape_btn = c3.button('Shape')
+    describe_btn = c4.button('Describe')
+    info_btn = c5.button('Info')
+    missing_btn = c6.button('Missing Values')
+    view_btn = c7.button("View Data")
+
+    # Show output in full width below
+    try:
+        if head_btn or tail_btn or shape_btn or describe_btn or info_btn or missing_btn:
+            if not (describe_btn or info_btn or missing_btn):
+                # Head/Tail/Shape need no pass over the data (out of core: just the first/last row groups)
+                profile = profiling.preview(df)
+            else:
+                # Every EDA statistic comes from one cached pass over the data
+                profile = jobs.run("profile", data_version, profiling.get_profile, df, data_version,
+                                   label="Profiling data...")
+
+        if head_btn:
+            st.subheader("First 5 Rows:")
+            st.write(profile["head"])
+            if st.button("clear"):
+                st.session_state.show_data = False
+
+        if tail_btn:
+            st.subheader("Last 5 Rows:")
+            st.write(profile["tail"])
+            if st.button("clear"):
+                st.session_state.show_data = False
+
+        if shape_btn:
+            st.subheader("Shape of the DataFrame:")
+            st.write(profile["shape"])
+            if st.button("clear"):
+                st.session_state.show_data = False
+
+        if describe_btn:
+            st.subheader("Statistical Summary:")
+            st.write(profile["describe"])
+            if st.button("clear"):
+                st.session_state.show_data = False
+
+        if info_btn:
+            st.subheader("Info:")
+            st.text(f"{type(df).__name__}: {profile['shape'][0]:,} entries, {profile['shape'][1]} columns")
+            st.dataframe(profiling.info_table(profile))
+            memory_now = profile["memory"]
+            memory_before = getattr(df, "attrs", {}).get("memory_before")
+            if is_out_of_core:
+                st.write(f"Memory: {memory_now / 1e6:,.1f} MB when decoded, {df.disk_bytes / 1e6:,.1f} MB on disk "
+                         f"in {df.num_row_groups:,} row groups")
+            elif memory_before:
+                st.write(f"Memory: {memory_before / 1e6:,.1f} MB before compaction, "
+                         f"{memory_now / 1e6:,.1f} MB now ({memory_before / max(memory_now, 1):.1f}x smaller)")
+            else:
+                st.write(f"Memory: {memory_now / 1e6:,.1f} MB")
+            if st.button("clear"):
+                st.session_state.show_data = False
+        if missing_btn:
+            st.subheader("Missing Values:")
+            missing_values = profile["missing"]
+            st.write(missing_values[missing_values > 0])
+        # View Data stays open across reruns so the pager and sort widgets work
+        if view_btn:
+            st.session_state._show_view_ = True
+        if st.session_state.get("_show_view_"):
+            st.subheader("Data")
+            viewer.show_frame(df, key="view_data", version=data_version)
+            if st.button("clear", key="clear_view"):
+                st.session_state._show_view_ = False
+                st.rerun()
+    except Exception:
+        st.error("Please choose Data....")
+
+
+@st.fragment
+@instrumentation.section("filter")
+def filter_section(data_version, schema_df, sql_ref, conn_str, sql_dialect):
+    df = checkout(data_version)
+    if st.session_state._show_filter_:
+        filter_type = st.selectbox("Choose Filter Type", ["Basic", "Custom"], index=0)
+
+        if filter_type == "Basic":
+            st.markdown("### Basic Filter")
+            col = st.selectbox("Select column", df.columns)
+            counts = jobs.run(f"counts:{col}", data_version, filters.value_counts, df, col, data_version,
+                              label=f"Counting values of {col}...")
+            if len(counts) > filters.SMALL_CARDINALITY:
+                search = st.text_input(f"Search {len(counts):,} values of {col}", key=f"_basic_search_{col}")
+                options = filters.candidate_values(counts, search)
+            else:
+                options = counts.index.tolist()
+            val = st.selectbox("Select value", options)
+            if val is None:
+                st.info("No value matches the search.")
+            else:
+                show_filtered(df, {col: [val]}, data_version, "basic_filter", f"{data_version}|basic|{col!r}|{val!r}")
+
+        elif filter_type == "Custom" and sql_ref:
+            st.markdown("### Custom Filter")
+            st.caption("Filters run on the database; only matching rows are fetched.")
+            try:
+                sample = sql_sample(conn_str, sql_ref, sql_dialect)
+                selected_cols = st.multiselect("Select columns to display", sample.columns, default=list(sample.columns))
+                numeric_cols = [c for c in selected_cols
+                                if pd.api.types.is_numeric_dtype(sample[c]) and not pd.api.types.is_bool_dtype(sample[c])]
+                bounds = sql_column_bounds(conn_str, sql_ref, tuple(numeric_cols), sql_dialect)
+
+                # Untouched widgets add no predicate, so the WHERE clause stays minimal
+                predicates = {}
+                for col in selected_cols:
+                    if col in bounds:
+                        min_val, max_val = bounds[col]
+                        if min_val is None or min_val == max_val:
+                            continue
+                        selected_range = st.slider(f"Range for {col}", float(min_val), float(max_val), (float(min_val), float(max_val)))
+                        if selected_range != (float(min_val), float(max_val)):
+                            predicates[col] = selected_range
+                    elif pd.api.types.is_string_dtype(sample[col]) or pd.api.types.is_object_dtype(sample[col]):
+                        options, more = sql_distinct_values(conn_str, sql_ref, col, sql_dialect)
+                        if not more:
+                            chosen = st.multiselect(f"Filter by {col}", options, default=options)
+                            if len(chosen) != len(options):
+                                predicates[col] = chosen
+                        else:
+                            # Not every value is listed, so deselecting would drop the unlisted
+                            # ones too: pick the values to keep instead
+                            pick_key = f"_sql_pick_{col}"
+                            search = st.text_input(f"Search values of {col}", key=f"_sql_search_{col}")
+                            if search:
+                                options, _ = sql_distinct_values(conn_str, sql_ref, col, sql_dialect, search)
+                            keep = st.session_state.get(pick_key, [])
+                            options = keep + [v for v in options if v not in keep]
+                            chosen = st.multiselect(f"Filter by {col} (empty = all values)", options, key=pick_key)
+                            if chosen:
+                                predicates[col] = chosen
+
+                max_rows = int(st.number_input("Max rows to fetch", 1000, None, 100_000, step=1000))
+                with sql_source.get_pool(conn_str).connection() as conn:
+                    total = sql_source.count_filtered(conn, sql_ref, predicates, sql_dialect)
+                    filtered_df = sql_source.read_filtered(conn, sql_ref, selected_cols, predicates, sql_dialect, limit=max_rows)
+                st.caption(f"{total:,} matching rows, showing {len(filtered_df):,}")
+                viewer.show_frame(filtered_df, key="sql_filter")
+                # Database rows have no data version, so this export is not cached
+                export_button(None, lambda: filtered_df, "filtered_data", "sql_filter")
+            except Exception as e:
+                st.error(f"Error filtering on the database: {e}")
+
+        elif filter_type == "Custom":
+            st.markdown("### Custom Filter")
+            selected_cols = st.multiselect("Select columns to display", df.columns, default=df.columns)
+
+            predicates = {}
+            for col in selected_cols:
+                if ingest.is_text(schema_df[col]):
+                    counts = jobs.run(f"counts:{col}", data_version, filters.value_counts, df, col, data_version,
+                                      label=f"Counting values of {col}...")
+                    if len(counts) <= filters.SMALL_CARDINALITY:
+                        options = counts.index.tolist()
+                        chosen = st.multiselect(f"Filter by {col}", options, default=options)
+                        # Everything selected means no predicate, not a full-column isin
+                        if len(chosen) != len(options):
+                            predicates[col] = chosen
+                    else:
+                        pick_key = f"_custom_pick_{col}"
+                        search = st.text_input(f"Search {len(counts):,} values of {col}", key=f"_custom_search_{col}")
+                        options = filters.candidate_values(counts, search, keep=st.session_state.get(pick_key, []))
+                        chosen = st.multiselect(f"Filter by {col} (empty = all values)", options, key=pick_key)
+                        if chosen:
+                            predicates[col] = chosen
+                elif pd.api.types.is_numeric_dtype(schema_df[col]) and not pd.api.types.is_bool_dtype(schema_df[col]):
+                    bounds = filters.column_range(df, col, data_version)
+                    if bounds is None or bounds[0] == bounds[1]:
+                        continue
+                    min_val, max_val = float(bounds[0]), float(bounds[1])
+                    selected_range = st.slider(f"Range for {col}", min_val, max_val, (min_val, max_val))
+                    if selected_range != (min_val, max_val):
+                        predicates[col] = selected_range
+
+            # One combined mask over cached column indexes, one take at the end
+            show_filtered(df, predicates, data_version, "custom_filter",
+                          f"{data_version}|custom|{predicates!r}|{selected_cols!r}", columns=selected_cols)
+        if st.button("hide"):
+                st.session_state._show_filter_ = False
+
+
+@st.fragment
+@instrumentation.section("clean")
+def cleaning_section(data_version, is_out_of_core, clean_error):
+    df = checkout(data_version)
+    # Cleaning actions only append to the operation log; the log is replayed on
+    # the loaded data at the top of the script, so every section sees the result.
+    if st.session_state.get("_show_cleaning_") and is_out_of_core:
+        st.info("Cleaning needs the data in memory; turn off out-of-core mode to clean it.")
+    elif st.session_state.get("_show_cleaning_"):
+        clean_log = st.session_state.clean_log
+        try:
+            if clean_error:
+                st.error(f"Cleaning step {clean_error[0]} failed and was skipped with the rest: {clean_error[1]}")
+
+            st.markdown("## 1. Handle Missing Values")
+            missing = jobs.run("profile", data_version, profiling.get_profile, df, data_version,
+                               label="Profiling data...")["missing"]
+            missing_cols = missing[missing > 0].index.tolist()
+            if missing_cols:
+                col_to_fill = st.selectbox("Select column with missing values", missing_cols)
+                method = st.radio("Choose fill method", cleaning.FILL_METHODS)
+                custom_val = st.text_input("Enter custom value") if method == "Custom Value" else None
+                if st.button("Fill Missing Values"):
+                    if method == "Custom Value" and not custom_val:
+                        st.warning("Please enter a custom value.")
+                    else:
+                        clean_log.add(cleaning.fill_missing(col_to_fill, method, custom_val))
+                        st.rerun()
+            else:
+                st.info("No missing values in your data.")
+
+            st.markdown("---")
+            st.markdown("## 2. Data Type Conversion")
+            col_dtype = st.selectbox("Select column to convert", df.columns)
+            dtype_choice = st.selectbox("Convert to type", cleaning.DTYPES)
+            if st.button("Convert Type"):
+                # A conversion that fails is reported by the replay, like any other step
+                clean_log.add(cleaning.convert_type(col_dtype, dtype_choice))
+                st.rerun()
+
+            st.markdown("---")
+            st.markdown("## 3. Filter Rows")
+            filter_col = st.selectbox("Select column to filter", df.columns)
+            if ingest.is_text(df[filter_col]):
+                counts = jobs.run(f"counts:{filter_col}", data_version, filters.value_counts, df, filter_col,
+                                  data_version, label=f"Counting values of {filter_col}...")
+                if len(counts) > filters.SMALL_CARDINALITY:
+                    search = st.text_input(f"Search {len(counts):,} values of {filter_col}",
+                                           key=f"_clean_search_{filter_col}")
+                    options = filters.candidate_values(counts, search)
+                else:
+                    options = counts.index.tolist()
+                filter_val = st.selectbox("Select value", options)
+                row_filter = {} if filter_val is None else {filter_col: [filter_val]}
+            else:
+                bounds = filters.column_range(df, filter_col, data_version)
+                min_val, max_val = (float(bounds[0]), float(bounds[1])) if bounds else (0.0, 0.0)
+                row_filter = {filter_col: st.slider("Select range", min_val, max_val, (min_val, max_val))} if min_val < max_val else {}
+            filtered_df = filters.apply_filters(df, row_filter, data_version)
+            viewer.show_frame(filtered_df, key="clean_filter", version=f"{data_version}|clean|{row_filter!r}")
+
+            st.markdown("---")
+            st.markdown("## 4. Drop Columns / Rows")
+            drop_cols = st.multiselect("Select columns to drop", df.columns)
+            # Only matching row labels are sent to the browser, not the whole index
+            row_search = st.text_input(f"Search {len(df):,} row labels", key="_drop_rows_search_")
+            drop_rows = st.multiselect(
+                "Select row indices to drop",
+                filters.index_candidates(df.index, row_search, keep=st.session_state.get("_drop_rows_", [])),
+                key="_drop_rows_")
+            if st.button("Drop Selected"):
+                clean_log.add(cleaning.drop(drop_cols, drop_rows))
+                # The dropped labels no longer exist; don't carry them into the next drop
+                st.session_state.pop("_drop_rows_", None)
+                st.rerun()
+
+            st.markdown("---")
+            st.markdown("## 5. Rename Columns")
+            rename_col = st.selectbox("Select column to rename", df.columns)
+            new_name = st.text_input("Enter new column name")
+            if st.button("Rename Column") and new_name:
+                clean_log.add(cleaning.rename(rename_col, new_name))
+                st.rerun()
+
+            st.markdown("---")
+            st.markdown("## 6. Reset or Set Index")
+            index_action = st.radio("Choose Index Action", ["Reset Index", "Set Index"])
+            if index_action == "Set Index":
+                idx_col = st.selectbox("Select column to set as index", df.columns)
+            if st.button("Apply Index Action"):
+                clean_log.add(cleaning.reset_index() if index_action == "Reset Index" else cleaning.set_index(idx_col))
+                st.rerun()
+
+            st.markdown("---")
+            st.markdown("## 7. Cleaning Steps")
+            if clean_log.steps:
+                for i, step in enumerate(clean_log.steps, start=1):
+                    st.write(f"{i}. {cleaning.describe(step)}")
+            else:
+                st.write("No cleaning steps yet.")
+            u1, u2, u3, u4 = st.columns([1, 1, 1, 2])
+            if u1.button("Undo", disabled=not clean_log.steps):
+                clean_log.undo()
+                st.rerun()
+            if u2.button("Redo", disabled=not clean_log.undone):
+                clean_log.redo()
+                st.rerun()
+            if u3.button("Reset", disabled=not clean_log.steps):
+                clean_log.clear()
+                st.rerun()
+            u4.download_button("📥 Download steps (JSON)", data=clean_log.to_json(),
+                               file_name="cleaning_steps.json", mime="application/json")
+            log_file = st.file_uploader("Replay saved steps", type="json")
+            if log_file is not None and st.session_state.get("_clean_log_file_") != log_file.file_id:
+                st.session_state._clean_log_file_ = log_file.file_id
+                st.session_state.clean_log = cleaning.OperationLog.from_json(log_file.getvalue().decode())
+                st.rerun()
+
+            st.markdown("---")
+            st.subheader("🧾 Cleaned Data")
+            viewer.show_frame(df, key="cleaned_data", version=data_version)
+            export_button(data_version, lambda: datastore.get(data_version), "cleaned_data", "cleaned_data")
+        except Exception as e:
+            st.error(f"Error in data cleaning: {e}")
+        if st.button("hide", key="hide_cleaning"):
+            st.session_state._show_cleaning_ = False
+            st.rerun()
+
+
+@st.fragment
+@instrumentation.section("visualization")
+def visualization_section(data_version, schema_df, is_out_of_core):
+    df = checkout(data_version)
+    if "hidden_charts" not in st.session_state:
+        st.session_state.hidden_charts = {v: False for v in [
+            "Bar Chart", "Line Chart", "Pie Chart", "Histogram",
+            "Box Plot", "Scatter Plot", "Heatmap"
+        ]}
+
+    st.subheader("📊 Visualization")
+    viz_type = st.selectbox(
+        "Select Visualization",
+        ["None", "Bar Chart", "Pie Chart", "Histogram", "Box Plot", "Scatter Plot", "Heatmap"],
+        index=0
+    )
+    chart_format = st.radio("Image format", list(charts.FORMATS), horizontal=True)
+    v1,v2=st.columns([1,1])
+    with v1:
+        if viz_type != "None" and not st.session_state.hidden_charts[viz_type]:
+            st.markdown(f"### {viz_type}")
+
+
+            if is_out_of_core and viz_type not in ("Histogram", "Box Plot"):
+                st.info(f"{viz_type} needs the data in memory; turn off out-of-core mode to draw it.")
+
+            elif viz_type == "Bar Chart":
+                categorical_col = st.selectbox(
+                    "Select categorical column (X-axis)",
+                    [c for c in df.columns if ingest.is_text(df[c])]  # only categorical/text columns
+                )
+
+                numeric_cols = st.multiselect(
+                    "Select numeric columns for clustered bars",
+                    df.select_dtypes(include='number').columns  # only numeric columns
+                )
+
+                bar_how = st.selectbox("Aggregate values by", charts.AGGREGATIONS)
+                top_n = st.slider("Show top N categories", 5, 50, 20)
+
+                if categorical_col and numeric_cols:
+                    if st.button("Generate Chart"):
+                        # One bar per category (top N + one for the rest), not one per row
+                        image = render_chart(
+                            (data_version, "bar", categorical_col, tuple(numeric_cols), bar_how, top_n),
+                            lambda: charts.bar_chart(charts.aggregate_bars(df, categorical_col, numeric_cols, bar_how, top_n),
+                                                     categorical_col, numeric_cols, bar_how),
+                            chart_format)
+                        show_chart(image, "bar_chart", chart_format)
+                else:
+                    st.info("Select one categorical column and at least one numeric column.")
+
+            elif viz_type == "Pie Chart":
+                cat_col = st.selectbox("Select categorical column", df.columns)
+                num_col = st.selectbox("Select numerical column for values", df.columns)
+
+                if cat_col and num_col:
+                    if st.button("Generate Pie Chart"):
+                        image = render_chart((data_version, "pie", cat_col, num_col),
+                                             lambda: charts.pie_chart(df, cat_col, num_col), chart_format)
+                        show_chart(image, "pie_chart", chart_format)
+                else:
+                    st.warning("Please select both categorical and numerical columns.")
+
+            elif viz_type == "Histogram":
+                selected_cols = st.multiselect("Select numeric columns", schema_df.select_dtypes(include='number').columns)
+                bins = st.slider("Number of bins", 5, 50, 10)
+                if selected_cols:
+                    if st.button("Generate Histogram"):
+                        image = render_chart((data_version, "histogram", tuple(selected_cols), bins),
+                                             lambda: charts.histogram({c: stats.histogram_counts(df, c, bins, data_version)
+                                                                      for c in selected_cols}),
+                                             chart_format)
+                        show_chart(image, "histogram", chart_format)
+                else:
+                    st.info("Select one or more numeric columns.")
+
+            elif viz_type == "Box Plot":
+                numeric_cols = schema_df.select_dtypes(include='number').columns
+                selected_cols = st.multiselect("Select numeric columns", numeric_cols)
+
+                if selected_cols:
+                    if st.button("Generate Box Plot"):
+                        image = render_chart((data_version, "box", tuple(selected_cols)),
+                                             lambda: charts.box_plot(stats.box_stats(df, selected_cols, data_version)),
+                                             chart_format)
+                        show_chart(image, "box_plot", chart_format)
+                else:
+                    st.info("Select one or more numeric columns.")
+
+            elif viz_type == "Scatter Plot":
+                x_col = st.selectbox("Select X-axis", df.columns)
+                y_col = st.selectbox("Select Y-axis", df.columns)
+                hue_col = st.selectbox(
+                    "Optional: Color by (categorical)",
+                    [None] + list(df.select_dtypes(exclude='number').columns)
+                )
+                scatter_mode = st.radio("Plot mode", ["Auto", "Points", "Density"], horizontal=True,
+                                        help=f"Auto draws a density image above {charts.SCATTER_MAX_POINTS:,} rows.")
+
+                if st.button("Generate Scatter Plot"):
+                    if x_col and y_col:
+                        use_density = scatter_mode == "Density" or (
+                            scatter_mode == "Auto" and len(df) > charts.SCATTER_MAX_POINTS)
+                        numeric_xy = all(pd.api.types.is_numeric_dtype(df[c]) for c in (x_col, y_col))
+                        if use_density and not numeric_xy:
+                            st.warning("Density mode needs numeric X and Y columns.")
+                        else:
+                            build = charts.density_scatter if use_density else charts.scatter_chart
+                            image = render_chart((data_version, "scatter", x_col, y_col, hue_col, use_density),
+                                                 lambda: build(df, x_col, y_col, hue_col), chart_format)
+                            show_chart(image, "scatter_plot", chart_format)
+                    else:
+                        st.warning("Please select both X and Y axes.")
+
+            elif viz_type == "Heatmap":
+                numeric_cols = [c for c in df.select_dtypes(include='number').columns
+                                if not pd.api.types.is_bool_dtype(df[c])]
+                if len(numeric_cols) >= 2:
+                    heatmap_view = st.radio("Show", ["Full matrix", "Top-k strongest pairs", "Clustered subset"],
+                                            horizontal=True)
+                    if heatmap_view == "Top-k strongest pairs":
+                        top_k = st.slider("Number of pairs", 5, 100, 20)
+                    elif heatmap_view == "Clustered subset":
+                        max_columns = st.slider("Columns in subset", 2, min(40, len(numeric_cols)),
+                                                min(15, len(numeric_cols)))
+
+                    if st.button("Generate Heatmap"):
+                        # Computed once per dataset version; only the view below is drawn
+                        corr = jobs.run("corr", (data_version, tuple(numeric_cols)), stats.correlation_matrix,
+                                        df, numeric_cols, data_version, label="Computing correlations...")
+                        if heatmap_view == "Top-k strongest pairs":
+                            st.dataframe(stats.strongest_pairs(corr, top_k))
+                        else:
+                            view_key = len(numeric_cols) if heatmap_view == "Full matrix" else max_columns
+                            image = render_chart(
+                                (data_version, "heatmap", tuple(numeric_cols), heatmap_view, view_key),
+                                lambda: charts.heatmap(corr if heatmap_view == "Full matrix"
+                                                       else stats.clustered_subset(corr, max_columns)),
+                                chart_format)
+                            show_chart(image, "heatmap", chart_format)
+                else:
+                    st.warning("Need at least 2 numeric columns for heatmap.")
+
+        if st.button(f"Hide {viz_type} Section"):
+            try:
+                st.session_state.hidden_charts[viz_type] = True
+                st.experimental_rerun()
+            except Exception:
+                pass
+    with v2:
+        if viz_type=="Bar Chart":
+            st.header("Description of Bar Chart")
+            st.write("""A bar chart is a graphical representation of data using rectangular bars, where the length of each bar is proportional to the value it represents. Bar charts are used to compare different categories or groups and visualize discrete data.
+
+                        --The x-axis typically shows the categories.
+
+                        --The y-axis represents the numerical values or frequency.
+
+                        --Bars can be displayed vertically or horizontally.
+
+                        --Useful for showing comparisons among categories or tracking changes over time when categories are ordered."""
+                        )
+        elif viz_type=="Pie Chart":
+            st.header("Description of Pie Chart")
+            st.write("""A pie chart is a circular statistical graphic divided into slices to illustrate numerical proportions. Each slice represents a category's contribution to the whole, making it easy to visualize relative sizes.
+
+                        --Each slice's angle is proportional to the quantity it represents.
+
+                        --Best for showing parts of a whole, especially when there are few categories.
+
+                        --Not ideal for comparing similar-sized categories or showing changes over time."""
+                        )
+        elif viz_type=="Histogram":
+            st.header("Description of Histogram")
+            st.write("""A histogram is a graphical representation of the distribution of numerical data, showing the frequency of data points within specified ranges (bins).
+
+                        --The x-axis represents the bins or intervals.
+
+                        --The y-axis shows the frequency or count of data points in each bin.
+
+                        --Useful for understanding the distribution, central tendency, and variability of continuous data."""
+                        )
+        elif viz_type=="Box Plot":
+            st.header("Description of Box Plot")
+            st.write("""A box plot (or whisker plot) is a standardized way of displaying the distribution of data based on a five-number summary: minimum, first quartile (Q1), median, third quartile (Q3), and maximum.
+
+                        --The box represents the interquartile range (IQR) between Q1 and Q3.
+
+                        --The line inside the box indicates the median.
+
+                        --Whiskers extend to the minimum and maximum values within 1.5 times the IQR.
+
+                        --Useful for identifying outliers and understanding data spread."""
+                        )
+        elif viz_type=="Scatter Plot":
+            st.header("Description of Scatter Plot")
+            st.write("""A scatter plot is a type of data visualization that uses dots to represent the values obtained for two different variables, allowing for the observation of relationships or correlations between them.
+
+                        --The x-axis represents one variable, while the y-axis represents another.
+
+                        --Each point corresponds to an observation in the dataset.
+
+                        --Useful for identifying trends, clusters, and outliers in data."""
+                        )
+        elif viz_type=="Heatmap":
+            st.header("Description of Heatmap")
+            st.write("""A heatmap is a data visualization technique that uses color to represent the values of a matrix or table, allowing for quick identification of patterns and correlations.
+
+                        --Each cell's color intensity corresponds to its value.
+
+                        --Useful for visualizing complex data relationships, especially in correlation matrices.
+
+                        --Can highlight areas of high or low values effectively."""
+                        )
+        else:
+            st.write("Select a visualization type to see its description here.")    
+
 
 st.set_page_config(page_title="Analyze Data With Clicks", page_icon="🔍", layout="wide")
 page_bg_img = """
@@ -14,47 +734,71 @@ page_bg_img = """
     background-position: center;
     background-repeat: no-repeat;
 }
+.my-plot-container {
+    max-width: 700px;
+    margin-left: auto;
+    margin-right: auto;
+}
 </style>
 """
-
-st.markdown(page_bg_img, unsafe_allow_html=True)
-# Paste this once at the top of your app (or before any plotting)
-st.markdown(
-    """
-    <style>
-    .my-plot-container {
-        max-width: 700px;
-        margin-left: auto;
-        margin-right: auto;
-    }
-    </style>
-    """,
-    unsafe_allow_html=True
-)
 marquee_html = """
 <marquee behavior="scroll" direction="left" scrollamount="10" style="font-size:24px; color:blue;">
   📊 Welcome to the Streamlit web App! 
 </marquee>
 """
 
-st.markdown(marquee_html, unsafe_allow_html=True)
+# One element for the page styles and the banner
+st.markdown(page_bg_img + marquee_html, unsafe_allow_html=True)
 st.title("🔍 Analyze Data With Clicks")
 st.write("This app allows you to perform  EDA, data cleaning, and visualization on your data without writing any code. Just upload your CSV file or connect to a SQL Server database and start exploring!")
 st.sidebar.subheader("Choose Source")
 source=st.sidebar.selectbox("Choose Source",["SQL Server", "CSV File"])
+compact_mode = st.sidebar.checkbox("Compact memory mode", value=False,
+                                   help="Downcast numbers and store repeated text as categories when loading.")
+perf = instrumentation.recorder()
+perf.start_run(st.sidebar.checkbox("Performance panel", value=False,
+                                   help="Record time, peak memory and data sent to the browser per section."))
+perf.mark("ingest")
+df = None
+sql_ref = conn_str = sql_dialect = None
+data_version = None  # identifies the loaded data; cache key for everything derived from it
 # --- SQL Server connection ---
 if source == "CSV File":
-    
+    out_of_core = st.sidebar.checkbox("Out-of-core mode", value=False, disabled=not ingest.HAS_PYARROW,
+                                      help="For files larger than memory: stream the CSV into an on-disk "
+                                           "Parquet store and explore it from there.")
+    # Streamlit holds uploads in memory, so files larger than RAM are read from a path
+    csv_path = st.sidebar.text_input("CSV path on the server (optional)") if out_of_core else ""
     file_uploaded = st.sidebar.file_uploader("Choose a CSV file", type="csv")
 
+    if csv_path:
+        try:
+            path_version = outofcore.path_fingerprint(csv_path)
+            data_version = f"{path_version}:ooc"
+            df = spool_dataset(csv_path, path_version)
+        except Exception as e:
+            st.sidebar.error(f"Could not read {csv_path}: {e}")
     # Only proceed if a file is uploaded
-    if file_uploaded is not None:
+    elif file_uploaded is not None:
         st.sidebar.success('File uploaded successfully')
-
-        # Read CSV into DataFrame
-        df = pd.read_csv(file_uploaded)
+        if not out_of_core:
+            csv_engine = st.sidebar.selectbox("CSV parser", ingest.ENGINES, index=0)
+
+        # Fingerprint the upload once, then reuse the parsed frame on every rerun
+        upload_key = getattr(file_uploaded, "file_id", None) or (file_uploaded.name, file_uploaded.size)
+        if st.session_state.get("_upload_key_") != upload_key:
+            st.session_state._upload_key_ = upload_key
+            st.session_state.data_version = ingest.fingerprint(file_uploaded)
+        if out_of_core:
+            data_version = f"{st.session_state.data_version}:ooc"
+            df = spool_dataset(file_uploaded, st.session_state.data_version)
+        else:
+            df = ingest.load_csv(file_uploaded, st.session_state.data_version, engine=csv_engine,
+                                 compact=compact_mode, holder=holder())
+            data_version = ingest.csv_version(st.session_state.data_version, csv_engine, compact_mode)
 if source == "SQL Server":
-    server = st.sidebar.text_input('Server name', value='localhost\\SQLEXPRESS')
+    server = st.sidebar.text_input('Server name', value='localhost\\SQLEXPRESS',
+                                   help="Use sqlite:///path/to/file.db to work against a local SQLite database.")
     use_sql_auth = st.sidebar.checkbox("Use SQL Authentication (username/password)", value=False)
 
     if use_sql_auth:
@@ -63,100 +807,122 @@ if source == "SQL Server":
     else:
         username = password = None
 
-    conn = None
     connect_btn = st.sidebar.button("Connect to SQL Server")
 
     if connect_btn:
         if use_sql_auth and (not username or not password):
             st.sidebar.warning("Please enter username and password.")
         else:
+            conn_str = sql_source.build_conn_str(server, username, password)
             try:
-                if use_sql_auth:
-                    conn_str = (
-                        f"DRIVER={{ODBC Driver 17 for SQL Server}};"
-                        f"SERVER={server};"
-                        f"UID={username};"
-                        f"PWD={password};"
-                    )
-                else:
-                    conn_str = (
-                        f"DRIVER={{ODBC Driver 17 for SQL Server}};"
-                        f"SERVER={server};"
-                        f"Trusted_Connection=yes;"
-                    )
-                conn = pyodbc.connect(conn_str)
+                # Connections come from a pool shared across reruns and sessions
+                with sql_source.get_pool(conn_str).connection() as conn:
+                    st.session_state.sql_databases = sql_source.list_databases(conn, sql_source.dialect(conn_str))
+                st.session_state.sql_conn_str = conn_str
                 st.sidebar.success("Connected to SQL Server!")
             except Exception as e:
                 st.sidebar.error(f"Connection failed: {e}")
 
-    if conn:
+    conn_str = st.session_state.get("sql_conn_str")
+    if conn_str:
+        pool = sql_source.get_pool(conn_str)
+        database = st.sidebar.selectbox('Choose database', st.session_state.sql_databases)
+        if st.sidebar.button("Disconnect"):
+            del st.session_state.sql_conn_str
+            st.rerun()
+
+        sql_dialect = sql_source.dialect(conn_str)
+        load_from = st.sidebar.radio("Load from", ["Table", "Query"], horizontal=True)
         try:
-            dbs = pd.read_sql("SELECT name FROM sys.databases", conn)
-            database = st.sidebar.selectbox('Choose database', dbs['name'].tolist())
-            # Further steps...
+            if load_from == "Table":
+                tables_key = (conn_str, database)
+                if st.session_state.get("_sql_tables_key_") != tables_key:
+                    with pool.connection() as conn:
+                        st.session_state.sql_tables = sql_source.list_tables(conn, database, sql_dialect)
+                    st.session_state._sql_tables_key_ = tables_key
+                schema_table = st.sidebar.selectbox("Choose table", st.session_state.sql_tables,
+                                                    format_func=lambda t: f"{t[0]}.{t[1]}")
+                sql_ref = sql_source.table_ref(database, *schema_table, sql_dialect) if schema_table else None
+            else:
+                sql_query = st.sidebar.text_area("SQL query", placeholder="SELECT ...")
+                sql_ref = sql_source.query_ref(sql_query) if sql_query.strip() else None
+
+            load_mode = st.sidebar.radio("Load mode", ["Preview pages", "Full load"], horizontal=True)
+            if sql_ref and load_mode == "Preview pages":
+                # Only one page of rows crosses the wire per rerun
+                page_size = int(st.sidebar.number_input("Rows per page", 100, 50_000, sql_source.PAGE_SIZE, step=100))
+                page = int(st.sidebar.number_input("Page", 1, None, 1)) - 1
+                # OFFSET paging needs a unique order, or pages may repeat or skip rows
+                keys = sql_primary_key(conn_str, database, *schema_table, sql_dialect) if load_from == "Table" else ()
+                order_options = ([keys] if keys else []) + [(c,) for c in sql_sample(conn_str, sql_ref, sql_dialect).columns
+                                                            if (c,) != keys] + [()]
+                order_by = st.sidebar.selectbox(
+                    "Order pages by", order_options,
+                    format_func=lambda o: "Unordered" if not o else
+                    f"Primary key ({', '.join(map(str, o))})" if o == keys else str(o[0]))
+                if not order_by:
+                    st.sidebar.caption("Pages are unordered: the database may repeat or skip rows between pages.")
+                elif order_by != keys:
+                    st.sidebar.caption(f"Rows with equal {order_by[0]} values may move between pages.")
+                page_key = (conn_str, sql_ref, page, page_size, order_by, compact_mode)
+                data_version = ingest.fingerprint(repr(page_key).encode())
+                df = datastore.get(data_version)
+                if df is None:
+                    with pool.connection() as conn:
+                        page_df = sql_source.read_page(conn, sql_ref, page, page_size, sql_dialect, order_by)
+                    df = datastore.put(data_version, ingest.compact_frame(page_df) if compact_mode else page_df,
+                                       holder())
+                st.session_state._sql_page_key_ = page_key
+            elif sql_ref:
+                # The load runs on the job pool and is remembered until it finishes,
+                # so interacting with the page meanwhile does not lose it
+                if st.sidebar.button("Load data"):
+                    st.session_state._sql_load_key_ = (conn_str, sql_ref, compact_mode, time.time())
+                load_key = st.session_state.get("_sql_load_key_")
+                if load_key and load_key[:3] != (conn_str, sql_ref, compact_mode):
+                    jobs.runner().cancel("sql_load")
+                    del st.session_state._sql_load_key_
+                elif load_key:
+                    try:
+                        sql_version = jobs.run("sql_load", load_key, load_sql_frame, pool, sql_ref, compact_mode,
+                                               holder(), label="Streaming rows from SQL Server...",
+                                               where=st.sidebar)
+                    except Exception:
+                        # A failed load is not retried; a rerun interrupting the wait is not an Exception
+                        del st.session_state._sql_load_key_
+                        raise
+                    del st.session_state._sql_load_key_
+                    st.session_state._sql_page_key_ = None
+                    st.session_state.sql_version = sql_version
+                    st.session_state._sql_loaded_ = load_key[:3]
+                    st.sidebar.success(f"Loaded {len(datastore.get(sql_version)):,} rows")
+                if st.session_state.get("_sql_page_key_") is None and "sql_version" in st.session_state:
+                    # Only the version is kept in the session; the frame is shared in the store
+                    data_version = st.session_state.sql_version
+                    df = datastore.get(data_version)
+                    if df is None:
+                        # Evicted while this session was idle: load it again
+                        st.session_state._sql_load_key_ = (*st.session_state._sql_loaded_, time.time())
+                        del st.session_state.sql_version
+                        st.rerun()
         except Exception as e:
-            st.sidebar.error(f"Error fetching databases: {e}")
-st.subheader("🔍EDA")
-st.write("Perform basic EDA on your uploaded CSV file")
-c1, c2, c3, c4, c5, c6 ,c7= st.columns([1,1,1,1,1,1.5,1])
-
-    # Track which button is clicked
-head_btn = c1.button('Head')
-tail_btn = c2.button('Tail')
-shape_btn = c3.button('Shape')
-describe_btn = c4.button('Describe')
-info_btn = c5.button('Info')
-missing_btn = c6.button('Missing Values')
-view_btn = c7.button("View Data")
-
-# Show output in full width below
-try:
-    
-    if head_btn:
-        st.subheader("First 5 Rows:")
-        st.write(df.head())
-        if st.button("clear"):
-            st.session_state.show_data = False
-
-    if tail_btn:
-        st.subheader("Last 5 Rows:")
-        st.write(df.tail())
-        if st.button("clear"):
-            st.session_state.show_data = False
-
-    if shape_btn:
-        st.subheader("Shape of the DataFrame:")
-        st.write(df.shape)
-        if st.button("clear"):
-            st.session_state.show_data = False
-
-    if describe_btn:
-        st.subheader("Statistical Summary:")
-        st.write(df.describe())
-        if st.button("clear"):
-            st.session_state.show_data = False
-
-    if info_btn:
-        st.subheader("Info:")
-        # Capture the output of df.info()
-        buffer = st.empty()
-        import io
-        info_buf = io.StringIO()
-        df.info(buf=info_buf)
-        st.text(info_buf.getvalue())
-        if st.button("clear"):
-            st.session_state.show_data = False
-    if missing_btn:
-        st.subheader("Missing Values:")
-        missing_values = df.isnull().sum()
-        st.write(missing_values[missing_values > 0])
-    if view_btn:
-        st.subheader("Data")
-        st.dataframe(df)
-        if st.button("clear"):
-            st.session_state.show_data = False
-except Exception:
-    st.error("Please choose Data....")
+            st.sidebar.error(f"Error loading data: {e}")
+perf.mark("replay")
+# Replay the cleaning log on top of the loaded data; unchanged prefixes come
+# from the snapshot cache, so only newly added steps are computed
+if "clean_log" not in st.session_state:
+    st.session_state.clean_log = cleaning.OperationLog()
+clean_error = None
+is_out_of_core = data_version is not None and isinstance(df, outofcore.Dataset)
+if data_version is not None and st.session_state.clean_log.steps and not is_out_of_core:
+    df, data_version, clean_error = apply_cleaning(df, list(st.session_state.clean_log.steps), data_version)
+else:
+    # Release whatever this session showed before (a previous upload, other pages)
+    hold_data(data_version)
+# Zero-row frame with the data's columns and dtypes, for widgets that only need the schema
+schema_df = df.head(0) if data_version is not None else None
+
+eda_section(data_version, is_out_of_core)
 b1,b2=st.columns([1,1])
 with b1:
     st.subheader("🔽Filter Data")
@@ -173,381 +939,11 @@ if "_show_filter_" not in st.session_state:
 if filter_:
     st.session_state._show_filter_ = not st.session_state._show_filter_
 
-# ✅ Show Filters
-if st.session_state._show_filter_:
-    filter_type = st.selectbox("Choose Filter Type", ["Basic", "Custom"], index=0)
-
-    if filter_type == "Basic":
-        st.markdown("### Basic Filter")
-        col = st.selectbox("Select column", df.columns)
-        val = st.selectbox("Select value", df[col].unique())
-        filtered_df = df[df[col] == val]
-        st.dataframe(filtered_df)
-
-    elif filter_type == "Custom":
-        st.markdown("### Custom Filter")
-        selected_cols = st.multiselect("Select columns to display", df.columns, default=df.columns)
-
-        filters = {}
-        for col in selected_cols:
-            if df[col].dtype == 'object':
-                options = df[col].unique().tolist()
-                filters[col] = st.multiselect(f"Filter by {col}", options, default=options)
-            elif np.issubdtype(df[col].dtype, np.number):
-                min_val, max_val = df[col].min(), df[col].max()
-                filters[col] = st.slider(f"Range for {col}", float(min_val), float(max_val), (float(min_val), float(max_val)))
-
-        filtered_df = df.copy()
-        for col, val in filters.items():
-            if isinstance(val, list):
-                filtered_df = filtered_df[filtered_df[col].isin(val)]
-            elif isinstance(val, tuple):
-                filtered_df = filtered_df[(filtered_df[col] >= val[0]) & (filtered_df[col] <= val[1])]
-
-        st.dataframe(filtered_df[selected_cols])
-    if st.button("hide"):
-            st.session_state._show_filter_ = False
-
+filter_section(data_version, schema_df, sql_ref, conn_str, sql_dialect)
 
 if clean_:
-    
-    #if st.button("clean"):
-        st.session_state.show_cleaning = True
-        
-        if 'show_cleaning_miss' not in st.session_state:
-            st.session_state.show_cleaning_miss = True
-        if st.session_state.show_cleaning_miss:
-        
-            missing_cols = df.columns[df.isnull().any()].tolist()
-            try:
-                if missing_cols:
-                    col_to_fill = st.selectbox("Select column with missing values", missing_cols)
-                    method = st.radio("Choose fill method", ["Mean", "Median", "Mode", "Custom Value"])
-                    if method == "Mean":
-                        df[col_to_fill].fillna(df[col_to_fill].mean(), inplace=True)
-                    elif method == "Median":
-                        df[col_to_fill].fillna(df[col_to_fill].median(), inplace=True)
-                    elif method == "Mode":
-                        df[col_to_fill].fillna(df[col_to_fill].mode()[0], inplace=True)
-                    elif method == "Custom Value":
-                        custom_val = st.text_input("Enter custom value")
-                        if custom_val:
-                          df[col_to_fill].fillna(custom_val, inplace=True)
-                    st.success(f"Missing values in `{col_to_fill}` filled using {method}")
-                    st.write(df.head())
+    st.session_state._show_cleaning_ = not st.session_state.get("_show_cleaning_", False)
+cleaning_section(data_version, is_out_of_core, clean_error)
+visualization_section(data_version, schema_df, is_out_of_core)
 
-                else:
-                  st.info("No missing values in your data.")
-            except Exception as e:
-                st.error(f"Error in missing data imputation: {e}")
-            
-            st.markdown("---")
-            st.markdown("## 2. Data Type Conversion")
-            col_dtype = st.selectbox("Select column to convert", df.columns)
-            dtype_choice = st.selectbox("Convert to type", ["int", "float", "str", "datetime", "category"])
-            if st.button("Convert Type"):
-                try:
-                    if dtype_choice == "datetime":
-                        df[col_dtype] = pd.to_datetime(df[col_dtype], errors='coerce')
-                    else:
-                        df[col_dtype] = df[col_dtype].astype(dtype_choice)
-                    st.success(f"Converted `{col_dtype}` to `{dtype_choice}`")
-                except Exception as e:
-                    st.error(f"Conversion failed: {e}")
-
-            st.markdown("---")
-            st.markdown("## 3. Filter Rows")
-            filter_col = st.selectbox("Select column to filter", df.columns)
-            if df[filter_col].dtype == 'object':
-                filter_val = st.selectbox("Select value", df[filter_col].unique())
-                filtered_df = df[df[filter_col] == filter_val]
-            else:
-                min_val, max_val = float(df[filter_col].min()), float(df[filter_col].max())
-                selected_range = st.slider("Select range", min_val, max_val, (min_val, max_val))
-                filtered_df = df[(df[filter_col] >= selected_range[0]) & (df[filter_col] <= selected_range[1])]
-            st.dataframe(filtered_df)
-
-            st.markdown("---")
-            st.markdown("## 4. Drop Columns / Rows")
-            drop_cols = st.multiselect("Select columns to drop", df.columns)
-            drop_rows = st.multiselect("Select row indices to drop", df.index.tolist())
-            if st.button("Drop Selected"):
-                df.drop(columns=drop_cols, inplace=True)
-                df.drop(index=drop_rows, inplace=True)
-                st.success("Selected columns and rows dropped.")
-
-            st.markdown("---")
-            st.markdown("## 5. Rename Columns")
-            rename_col = st.selectbox("Select column to rename", df.columns)
-            new_name = st.text_input("Enter new column name")
-            if st.button("Rename Column"):
-                df.rename(columns={rename_col: new_name}, inplace=True)
-                st.success(f"Renamed `{rename_col}` to `{new_name}`")
-
-            st.markdown("---")
-            st.markdown("## 6. Reset or Set Index")
-            index_action = st.radio("Choose Index Action", ["Reset Index", "Set Index"])
-            if index_action == "Reset Index":
-                df.reset_index(drop=True, inplace=True)
-                st.success("Index reset.")
-            else:
-                idx_col = st.selectbox("Select column to set as index", df.columns)
-                df.set_index(idx_col, inplace=True)
-                st.success(f"Set `{idx_col}` as index.")
-
-            st.markdown("---")
-            st.subheader("🧾 Cleaned Data")
-            st.dataframe(df)
-            if st.button("hide"):
-                #st.session_state.show_cleaning = False
-                st.session_state.show_cleaning_miss = False
-if "hidden_charts" not in st.session_state:
-    st.session_state.hidden_charts = {v: False for v in [
-        "Bar Chart", "Line Chart", "Pie Chart", "Histogram",
-        "Box Plot", "Scatter Plot", "Heatmap"
-    ]}
-
-st.subheader("📊 Visualization")
-viz_type = st.selectbox(
-    "Select Visualization",
-    ["None", "Bar Chart", "Pie Chart", "Histogram", "Box Plot", "Scatter Plot", "Heatmap"],
-    index=0
-)
-v1,v2=st.columns([1,1])
-with v1:
-    if viz_type != "None" and not st.session_state.hidden_charts[viz_type]:
-        st.markdown(f"### {viz_type}")
-
-
-        if viz_type == "Bar Chart":
-            categorical_col = st.selectbox(
-                "Select categorical column (X-axis)",
-                df.select_dtypes(include=['object', 'category']).columns  # only categorical/text columns
-            )
-
-            numeric_cols = st.multiselect(
-                "Select numeric columns for clustered bars",
-                df.select_dtypes(include='number').columns  # only numeric columns
-            )
-
-            if categorical_col and numeric_cols:
-                if st.button("Generate Chart"):
-                    fig, ax = plt.subplots(figsize=(7, 5), dpi=100)
-
-                    x = np.arange(len(df[categorical_col]))
-                    bar_width = 0.8 / len(numeric_cols)
-
-                    for i, col in enumerate(numeric_cols):
-                        ax.bar(
-                            x + i * bar_width,
-                            df[col],
-                            width=bar_width,
-                            label=col
-                        )
-
-                    ax.set_xticks(x + bar_width * (len(numeric_cols) - 1) / 2)
-                    ax.set_xticklabels(df[categorical_col], rotation=45, ha='right')
-
-                    ax.set_title(f"Clustered Column Chart: {categorical_col} vs {', '.join(numeric_cols)}", fontsize=12)
-                    ax.set_xlabel(categorical_col)
-                    ax.set_ylabel("Values")
-                    ax.legend()
-
-                    for i, col in enumerate(numeric_cols):
-                        for j, val in enumerate(df[col]):
-                            ax.text(j + i * bar_width, val, f"{val}", ha='center', va='bottom', fontsize=8)
-
-                    plt.tight_layout()
-                    st.pyplot(fig)
-            else:
-                st.info("Select one categorical column and at least one numeric column.")
-
-        elif viz_type == "Pie Chart":
-            cat_col = st.selectbox("Select categorical column", df.columns)
-            num_col = st.selectbox("Select numerical column for values", df.columns)
-
-            if cat_col and num_col:
-                if st.button("Generate Pie Chart"):
-                    fig, ax = plt.subplots(figsize=(7, 7), dpi=100)
-                    ax.pie(
-                        df[num_col],
-                        labels=df[cat_col].astype(str),
-                        autopct='%1.1f%%'
-                    )
-                    ax.axis('equal')
-                    st.pyplot(fig)
-
-                    buf = io.BytesIO()
-                    fig.savefig(buf, format="png", dpi=100, bbox_inches="tight")
-                    buf.seek(0)
-
-                    st.download_button("📥 Download Chart as PNG", data=buf.getvalue(),
-                                    file_name="pie_chart.png", mime="image/png")
-            else:
-                st.warning("Please select both categorical and numerical columns.")
-
-        elif viz_type == "Histogram":
-            selected_cols = st.multiselect("Select numeric columns", df.select_dtypes(include='number').columns)
-            bins = st.slider("Number of bins", 5, 50, 10)
-            if selected_cols:
-                if st.button("Generate Histogram"):
-                    fig, ax = plt.subplots(figsize=(7, 5), dpi=100)
-                    for col in selected_cols:
-                        ax.hist(df[col], bins=bins, alpha=0.5, label=col)
-                    ax.set_title("Histogram")
-                    ax.set_xlabel("Value")
-                    ax.set_ylabel("Frequency")
-                    ax.legend()
-                    plt.tight_layout()
-                    st.pyplot(fig)
-            else:
-                st.info("Select one or more numeric columns.")
-
-        elif viz_type == "Box Plot":
-            numeric_cols = df.select_dtypes(include=['int', 'float']).columns
-            selected_cols = st.multiselect("Select numeric columns", numeric_cols)
-
-            if selected_cols:
-                if st.button("Generate Box Plot"):
-                    fig, ax = plt.subplots(figsize=(7, 5), dpi=100)
-                    bp = ax.boxplot([df[col].dropna() for col in selected_cols],
-                                    labels=selected_cols,
-                                    patch_artist=True)
-
-                    for i, col in enumerate(selected_cols, start=1):
-                        data = df[col].dropna()
-                        min_val = data.min()
-                        q1 = data.quantile(0.25)
-                        median = data.median()
-                        q3 = data.quantile(0.75)
-                        max_val = data.max()
-
-                        ax.text(i, min_val, f"Min: {min_val:.2f}", ha='center', va='top', fontsize=8, color="blue")
-                        ax.text(i, q1, f"Q1: {q1:.2f}", ha='center', va='bottom', fontsize=8, color="green")
-                        ax.text(i, median, f"Median: {median:.2f}", ha='center', va='bottom', fontsize=8, color="red")
-                        ax.text(i, q3, f"Q3: {q3:.2f}", ha='center', va='bottom', fontsize=8, color="green")
-                        ax.text(i, max_val, f"Max: {max_val:.2f}", ha='center', va='bottom', fontsize=8, color="blue")
-
-                    ax.set_title("Box Plot with Stats")
-                    ax.set_ylabel("Values")
-                    plt.tight_layout()
-                    st.pyplot(fig)
-            else:
-                st.info("Select one or more numeric columns.")
-
-        elif viz_type == "Scatter Plot":
-            x_col = st.selectbox("Select X-axis", df.columns)
-            y_col = st.selectbox("Select Y-axis", df.columns)
-            hue_col = st.selectbox(
-                "Optional: Color by (categorical)",
-                [None] + list(df.select_dtypes(exclude='number').columns)
-            )
-
-            if st.button("Generate Scatter Plot"):
-                if x_col and y_col:
-                    fig, ax = plt.subplots(figsize=(4, 3), dpi=50)
-                    sns.scatterplot(
-                        data=df,
-                        x=x_col,
-                        y=y_col,
-                        hue=hue_col if hue_col else None,
-                        ax=ax
-                    )
-                    ax.set_title(f"Scatter Plot: {x_col} vs {y_col}", fontsize=10)
-                    plt.tight_layout()
-
-                    st.pyplot(fig)
-                else:
-                    st.warning("Please select both X and Y axes.")
-
-        elif viz_type == "Heatmap":
-            numeric_df = df.select_dtypes(include='number')
-            if numeric_df.shape[1] >= 2:
-                fig, ax = plt.subplots(figsize=(7, 5), dpi=100)
-                sns.heatmap(
-                    numeric_df.corr(numeric_only=True),
-                    annot=True,
-                    cmap="coolwarm",
-                    ax=ax,
-                    annot_kws={"size": 8}
-                )
-                ax.set_title("Correlation Heatmap", fontsize=10)
-                plt.tight_layout()
-                st.pyplot(fig)
-            else:
-                st.warning("Need at least 2 numeric columns for heatmap.")
-
-    if st.button(f"Hide {viz_type} Section"):
-        try:
-            st.session_state.hidden_charts[viz_type] = True
-            st.experimental_rerun()
-        except Exception:
-            pass
-with v2:
-    if viz_type=="Bar Chart":
-        st.header("Description of Bar Chart")
-        st.write("""A bar chart is a graphical representation of data using rectangular bars, where the length of each bar is proportional to the value it represents. Bar charts are used to compare different categories or groups and visualize discrete data.
-
-                    --The x-axis typically shows the categories.
-
-                    --The y-axis represents the numerical values or frequency.
-
-                    --Bars can be displayed vertically or horizontally.
-
-                    --Useful for showing comparisons among categories or tracking changes over time when categories are ordered."""
-                    )
-    elif viz_type=="Pie Chart":
-        st.header("Description of Pie Chart")
-        st.write("""A pie chart is a circular statistical graphic divided into slices to illustrate numerical proportions. Each slice represents a category's contribution to the whole, making it easy to visualize relative sizes.
-
-                    --Each slice's angle is proportional to the quantity it represents.
-
-                    --Best for showing parts of a whole, especially when there are few categories.
-
-                    --Not ideal for comparing similar-sized categories or showing changes over time."""
-                    )
-    elif viz_type=="Histogram":
-        st.header("Description of Histogram")
-        st.write("""A histogram is a graphical representation of the distribution of numerical data, showing the frequency of data points within specified ranges (bins).
-
-                    --The x-axis represents the bins or intervals.
-
-                    --The y-axis shows the frequency or count of data points in each bin.
-
-                    --Useful for understanding the distribution, central tendency, and variability of continuous data."""
-                    )
-    elif viz_type=="Box Plot":
-        st.header("Description of Box Plot")
-        st.write("""A box plot (or whisker plot) is a standardized way of displaying the distribution of data based on a five-number summary: minimum, first quartile (Q1), median, third quartile (Q3), and maximum.
-
-                    --The box represents the interquartile range (IQR) between Q1 and Q3.
-
-                    --The line inside the box indicates the median.
-
-                    --Whiskers extend to the minimum and maximum values within 1.5 times the IQR.
-
-                    --Useful for identifying outliers and understanding data spread."""
-                    )
-    elif viz_type=="Scatter Plot":
-        st.header("Description of Scatter Plot")
-        st.write("""A scatter plot is a type of data visualization that uses dots to represent the values obtained for two different variables, allowing for the observation of relationships or correlations between them.
-
-                    --The x-axis represents one variable, while the y-axis represents another.
-
-                    --Each point corresponds to an observation in the dataset.
-
-                    --Useful for identifying trends, clusters, and outliers in data."""
-                    )
-    elif viz_type=="Heatmap":
-        st.header("Description of Heatmap")
-        st.write("""A heatmap is a data visualization technique that uses color to represent the values of a matrix or table, allowing for quick identification of patterns and correlations.
-
-                    --Each cell's color intensity corresponds to its value.
-
-                    --Useful for visualizing complex data relationships, especially in correlation matrices.
-
-                    --Can highlight areas of high or low values effectively."""
-                    )
-    else:
-        st.write("Select a visualization type to see its description here.")    
-                            
+instrumentation.panel(perf)
@@ -0,0 +1,351 @@
+"""Headless benchmark of app.py with synthetic datasets.
+
+Drives the app through Streamlit's ``AppTest`` harness the way a user would:
+load from the SQL source, click every EDA button, use the Basic and Custom
+filters, apply cleaning steps and draw each chart. The SQL source is a
+generated SQLite database (see ``sql_source.SQLITE_PREFIX``), so the run
+needs no server or network. The same rows are then exported to a CSV file
+and loaded in out-of-core mode through "CSV path on the server", which
+spools them to Parquet; the interactions that mode supports are run again
+with an "Out-of-core" prefix.
+
+For every interaction it reports the latency of the rerun and the process's
+maximum resident memory so far (plus, with ``--tracemalloc``, the peak memory
+traced during the interaction), and exits non-zero when an
+interaction exceeds its threshold in ``thresholds.json`` (or, with
+``--baseline``, is slower than a previous ``--output`` by more than
+``--max-slowdown``)::
+
+    python benchmarks/bench_app.py --sizes 10k,1M
+    python benchmarks/bench_app.py --sizes 1M --output bench.json
+    python benchmarks/bench_app.py --sizes 1M --baseline bench.json
+"""
+import argparse
+import json
+import os
+import resource
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+from streamlit.testing.v1 import AppTest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+APP = os.path.join(HERE, os.pardir, "app.py")
+THRESHOLDS = os.path.join(HERE, "thresholds.json")
+DATA_DIR = os.path.join(tempfile.gettempdir(), "eda_bench")
+TABLE = "bench"
+SIZES = {"10k": 10_000, "1M": 1_000_000, "10M": 10_000_000}
+INSERT_ROWS = 200_000
+RUN_TIMEOUT = 1800
+CITIES = ["Delhi", "Pune", "Agra", "Mumbai", "Chennai", "Kolkata", "Jaipur", "Surat",
+          "Lucknow", "Nagpur", "Indore", "Bhopal", "Patna", "Ranchi", "Goa", "Kochi"]
+
+
+# --- Data ---------------------------------------------------------------------
+
+def make_database(name, n):
+    """SQLite database with ``n`` rows of mixed numeric, text and missing values.
+
+    Built once per size and reused; rows are generated and inserted in chunks.
+    """
+    os.makedirs(DATA_DIR, exist_ok=True)
+    path = os.path.join(DATA_DIR, f"{name}.db")
+    if os.path.exists(path):
+        return path
+    tmp = path + ".tmp"
+    if os.path.exists(tmp):
+        os.remove(tmp)
+    rng = np.random.default_rng(0)
+    conn = sqlite3.connect(tmp)
+    try:
+        conn.execute(f"CREATE TABLE {TABLE} (id INTEGER, price REAL, qty REAL, score REAL, "
+                     "city TEXT, segment TEXT, name TEXT)")
+        for start in range(0, n, INSERT_ROWS):
+            m = min(INSERT_ROWS, n - start)
+            price = rng.lognormal(3, 1, m).round(2)
+            price[rng.random(m) < 0.05] = np.nan
+            qty = rng.integers(0, 50, m).astype(float)
+            qty[rng.random(m) < 0.02] = np.nan
+            city = rng.choice(np.array(CITIES + [None], dtype=object), m)
+            segment = rng.choice(np.array(["retail", "online", "wholesale"], dtype=object), m)
+            chunk = pd.DataFrame({
+                "id": np.arange(start, start + m),
+                "price": price,
+                "qty": qty,
+                "score": rng.normal(size=m),
+                "city": city,
+                "segment": segment,
+                "name": [f"customer {i}" for i in rng.integers(0, n, m)],
+            })
+            # NaN -> NULL so the database sees real missing values
+            rows = chunk.astype(object).where(chunk.notna(), None).itertuples(index=False, name=None)
+            conn.executemany(f"INSERT INTO {TABLE} VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            conn.commit()
+    finally:
+        conn.close()
+    os.replace(tmp, path)
+    return path
+
+
+def make_csv(name, db):
+    """CSV export of the database ``db``, built once per size and reused."""
+    path = os.path.join(DATA_DIR, f"{name}.csv")
+    if os.path.exists(path):
+        return path
+    tmp = path + ".tmp"
+    conn = sqlite3.connect(db)
+    try:
+        header = True
+        for chunk in pd.read_sql_query(f"SELECT * FROM {TABLE}", conn, chunksize=INSERT_ROWS):
+            chunk.to_csv(tmp, mode="w" if header else "a", header=header, index=False)
+            header = False
+    finally:
+        conn.close()
+    os.replace(tmp, path)
+    return path
+
+
+# --- AppTest helpers ------------------------------------------------------------
+
+def _find(widgets, label):
+    for w in widgets:
+        if w.label == label:
+            return w
+    raise LookupError(f"No widget labelled {label!r}")
+
+
+def _click(at, label):
+    _find(at.button, label).click()
+
+
+def _click_key(at, key):
+    next(b for b in at.button if b.key == key).click()
+
+
+def _select(at, label, value):
+    _find(at.selectbox, label).set_value(value)
+
+
+def _check_errors(at, name):
+    problems = [e.value for e in at.exception] + [e.value for e in at.error]
+    if problems:
+        raise RuntimeError(f"{name}: {problems[0]}")
+
+
+def interactions(pie=False):
+    """``(name, action)`` pairs; each action prepares widgets before a rerun."""
+    steps = [
+        ("Head", lambda at: _click(at, "Head")),
+        ("Tail", lambda at: _click(at, "Tail")),
+        ("Shape", lambda at: _click(at, "Shape")),
+        ("Describe", lambda at: _click(at, "Describe")),
+        ("Info", lambda at: _click(at, "Info")),
+        ("Missing Values", lambda at: _click(at, "Missing Values")),
+        ("View Data", lambda at: _click(at, "View Data")),
+        ("Hide View Data", lambda at: _click_key(at, "clear_view")),
+        ("Open filter", lambda at: _click(at, "Filter")),
+        ("Basic filter column", lambda at: _select(at, "Select column", "city")),
+        ("Basic filter value", lambda at: _select(at, "Select value", "Pune")),
+        ("Custom filter", lambda at: _select(at, "Choose Filter Type", "Custom")),
+        ("Custom filter range", lambda at: _find(at.slider, "Range for qty").set_value((10.0, 20.0))),
+        ("Custom filter values", lambda at: _find(at.multiselect, "Filter by segment").set_value(["online"])),
+        ("Hide filter", lambda at: _click(at, "hide")),
+        ("Open cleaning", lambda at: _click(at, "Clean")),
+        ("Fill missing", lambda at: _click(at, "Fill Missing Values")),
+        ("Convert type", lambda at: (_select(at, "Select column to convert", "qty"),
+                                     _select(at, "Convert to type", "float"),
+                                     _click(at, "Convert Type"))),
+        ("Rename column", lambda at: (_select(at, "Select column to rename", "score"),
+                                      _find(at.text_input, "Enter new column name").set_value("rating"),
+                                      _click(at, "Rename Column"))),
+        ("Undo", lambda at: _click(at, "Undo")),
+        ("Reset cleaning", lambda at: _click(at, "Reset")),
+        ("Hide cleaning", lambda at: _click_key(at, "hide_cleaning")),
+        ("Bar Chart", lambda at: _select(at, "Select Visualization", "Bar Chart")),
+        ("Bar Chart columns", lambda at: (_select(at, "Select categorical column (X-axis)", "city"),
+                                          _find(at.multiselect, "Select numeric columns for clustered bars")
+                                          .set_value(["price", "qty"]))),
+        ("Bar Chart render", lambda at: _click(at, "Generate Chart")),
+        ("Histogram", lambda at: _select(at, "Select Visualization", "Histogram")),
+        ("Histogram columns", lambda at: _find(at.multiselect, "Select numeric columns")
+         .set_value(["price", "score"])),
+        ("Histogram render", lambda at: _click(at, "Generate Histogram")),
+        ("Histogram bins", lambda at: (_find(at.slider, "Number of bins").set_value(30),
+                                       _click(at, "Generate Histogram"))),
+        ("Box Plot", lambda at: _select(at, "Select Visualization", "Box Plot")),
+        ("Box Plot columns", lambda at: _find(at.multiselect, "Select numeric columns")
+         .set_value(["price", "score"])),
+        ("Box Plot render", lambda at: _click(at, "Generate Box Plot")),
+        ("Scatter Plot", lambda at: _select(at, "Select Visualization", "Scatter Plot")),
+        ("Scatter Plot render", lambda at: (_select(at, "Select X-axis", "price"),
+                                            _select(at, "Select Y-axis", "score"),
+                                            _click(at, "Generate Scatter Plot"))),
+        ("Heatmap", lambda at: _select(at, "Select Visualization", "Heatmap")),
+        ("Heatmap render", lambda at: _click(at, "Generate Heatmap")),
+    ]
+    if pie:
+        steps += [
+            ("Pie Chart", lambda at: _select(at, "Select Visualization", "Pie Chart")),
+            ("Pie Chart render", lambda at: (_select(at, "Select categorical column", "city"),
+                                             _select(at, "Select numerical column for values", "id"),
+                                             _click(at, "Generate Pie Chart"))),
+        ]
+    return steps
+
+
+# Out-of-core mode has no cleaning and only draws histograms and box plots
+OUT_OF_CORE_SKIPPED = {"Open cleaning", "Fill missing", "Convert type", "Rename column", "Undo",
+                       "Reset cleaning", "Hide cleaning", "Bar Chart", "Bar Chart columns",
+                       "Bar Chart render", "Scatter Plot", "Scatter Plot render", "Heatmap",
+                       "Heatmap render", "Pie Chart", "Pie Chart render"}
+
+
+def out_of_core_interactions():
+    return [(name, action) for name, action in interactions() if name not in OUT_OF_CORE_SKIPPED]
+
+
+def _max_rss_mb():
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return rss / 1e6 if sys.platform == "darwin" else rss / 1e3
+
+
+def _measure(at, name, action):
+    action(at)
+    tracing = tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    at.run()
+    row = {"interaction": name, "seconds": time.perf_counter() - start, "rss_mb": _max_rss_mb()}
+    if tracing:
+        row["peak_mb"] = (tracemalloc.get_traced_memory()[1] - base) / 1e6
+    _check_errors(at, name)
+    return row
+
+
+def bench_size(size_name, n, pie=False):
+    db = make_database(size_name, n)
+    at = AppTest.from_file(APP, default_timeout=RUN_TIMEOUT)
+    at.run()
+    results = []
+
+    def connect(at):
+        _find(at.sidebar.text_input, "Server name").set_value(f"sqlite:///{db}")
+        _find(at.sidebar.button, "Connect to SQL Server").click()
+
+    def full_load(at):
+        _find(at.sidebar.radio, "Load mode").set_value("Full load")
+        at.run()
+        _find(at.sidebar.button, "Load data").click()
+
+    results.append(_measure(at, "Connect", connect))
+    results.append(_measure(at, "Full load", full_load))
+    for name, action in interactions(pie):
+        results.append(_measure(at, name, action))
+    results += bench_out_of_core(make_csv(size_name, db))
+    for row in results:
+        row["size"] = size_name
+    return results
+
+
+def bench_out_of_core(csv):
+    import outofcore
+    # Spool from scratch on every run, not from an earlier run's Parquet file
+    spooled = os.path.join(outofcore.SPOOL_DIR, f"{outofcore.path_fingerprint(csv)}.parquet")
+    if os.path.exists(spooled):
+        os.remove(spooled)
+    at = AppTest.from_file(APP, default_timeout=RUN_TIMEOUT)
+    at.run()
+    _select(at.sidebar, "Choose Source", "CSV File")
+    at.run()
+    _find(at.sidebar.checkbox, "Out-of-core mode").check()
+    at.run()
+
+    def spool(at):
+        _find(at.sidebar.text_input, "CSV path on the server (optional)").set_value(csv)
+
+    results = [_measure(at, "Out-of-core spool", spool)]
+    for name, action in out_of_core_interactions():
+        results.append(_measure(at, f"Out-of-core {name}", action))
+    return results
+
+
+# --- Checks and report ----------------------------------------------------------
+
+def check(results, thresholds, baseline=None, max_slowdown=1.5):
+    """Messages for every interaction over its threshold or slower than the baseline."""
+    failures = []
+    base = {(r["size"], r["interaction"]): r for r in baseline or []}
+    for r in results:
+        limits = thresholds.get(r["size"], {})
+        limit = {**limits.get("default", {}), **limits.get(r["interaction"], {})}
+        for metric in ("seconds", "rss_mb", "peak_mb"):
+            if metric in limit and metric in r and r[metric] > limit[metric]:
+                failures.append(f"{r['size']} {r['interaction']}: {metric} {r[metric]:.2f} > {limit[metric]}")
+        previous = base.get((r["size"], r["interaction"]))
+        # Sub-50ms interactions are too noisy to compare as ratios
+        if previous and previous["seconds"] > 0.05 and r["seconds"] > previous["seconds"] * max_slowdown:
+            failures.append(f"{r['size']} {r['interaction']}: {r['seconds']:.2f}s vs "
+                            f"{previous['seconds']:.2f}s in the baseline")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default=",".join(SIZES),
+                        help=f"comma separated dataset sizes out of {', '.join(SIZES)}")
+    parser.add_argument("--thresholds", default=THRESHOLDS, help="JSON file of per-interaction limits")
+    parser.add_argument("--baseline", help="results JSON of an earlier run to compare against")
+    parser.add_argument("--max-slowdown", type=float, default=1.5,
+                        help="allowed latency ratio against --baseline")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--tracemalloc", action="store_true",
+                        help="also record the traced peak memory of each interaction (slows the app down)")
+    parser.add_argument("--pie", action="store_true",
+                        help="also draw the pie chart, which has one labelled wedge per row "
+                             "and takes minutes from 10k rows up")
+    args = parser.parse_args(argv)
+
+    sizes = [s.strip() for s in args.sizes.split(",") if s.strip()]
+    unknown = [s for s in sizes if s not in SIZES]
+    if unknown:
+        parser.error(f"unknown sizes: {', '.join(unknown)}")
+    with open(args.thresholds) as f:
+        thresholds = json.load(f)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    # The app imports its modules from the repository root
+    sys.path.insert(0, os.path.dirname(os.path.abspath(APP)))
+    if args.tracemalloc:
+        tracemalloc.start()
+    results = []
+    for size in sizes:
+        print(f"== {size} rows ==", flush=True)
+        for row in bench_size(size, SIZES[size], args.pie):
+            peak = f" {row['peak_mb']:10.1f} MB peak" if "peak_mb" in row else ""
+            print(f"  {row['interaction']:<36} {row['seconds']:8.3f} s {row['rss_mb']:10.1f} MB max RSS{peak}",
+                  flush=True)
+            results.append(row)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    failures = check(results, thresholds, baseline, args.max_slowdown)
+    for failure in failures:
+        print(f"REGRESSION {failure}")
+    print(f"{len(results)} interactions, {len(failures)} over threshold")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,112 @@
+"""Small process-wide caches shared by every session of the app.
+
+Streamlit keeps imported modules alive between reruns, so module-level
+instances of these caches survive widget clicks and are shared by all
+sessions running in the same server process.
+"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# Number of values sampled per object column when estimating frame size.
+_SIZE_SAMPLE = 1000
+
+
+def column_nbytes(s):
+    """Estimate the in-memory size of a Series' values (see :func:`frame_nbytes`)."""
+    n = len(s)
+    if s.dtype == object and n > _SIZE_SAMPLE:
+        sample = s.iloc[np.linspace(0, n - 1, _SIZE_SAMPLE).astype(np.int64)]
+        per_row = sample.memory_usage(deep=True, index=False) / _SIZE_SAMPLE
+        return int(per_row * n)
+    return int(s.memory_usage(deep=True, index=False))
+
+
+def frame_nbytes(df):
+    """Estimate the in-memory size of a DataFrame without a full deep scan.
+
+    ``memory_usage(deep=True)`` touches every Python string, which takes
+    seconds on multi-GB frames. Object columns are estimated from a sample.
+    """
+    return int(df.index.memory_usage()) + sum(column_nbytes(df.iloc[:, i]) for i in range(df.shape[1]))
+
+
+def nbytes(value):
+    """Best-effort byte size of a cached value."""
+    if isinstance(value, pd.DataFrame):
+        return frame_nbytes(value)
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return len(value)
+    if isinstance(value, (tuple, list)):
+        return sum(nbytes(v) for v in value)
+    if isinstance(value, dict):
+        return sum(nbytes(v) for v in value.values())
+    return 64
+
+
+class ByteLRUCache:
+    """Thread-safe LRU cache bounded by the total byte size of its values."""
+
+    def __init__(self, max_bytes, sizeof=nbytes):
+        self.max_bytes = int(max_bytes)
+        self._sizeof = sizeof
+        self._items = OrderedDict()
+        self._sizes = {}
+        self._total = 0
+        self._lock = threading.Lock()
+
+    @property
+    def total_bytes(self):
+        return self._total
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._items:
+                return default
+            self._items.move_to_end(key)
+            return self._items[key]
+
+    def put(self, key, value, size=None):
+        """Insert ``value``; values larger than the whole budget are not kept."""
+        size = self._sizeof(value) if size is None else int(size)
+        with self._lock:
+            if key in self._items:
+                self._discard(key)
+            if size > self.max_bytes:
+                return value
+            self._items[key] = value
+            self._sizes[key] = size
+            self._total += size
+            while self._total > self.max_bytes:
+                self._discard(next(iter(self._items)))
+        return value
+
+    def pop(self, key, default=None):
+        with self._lock:
+            if key not in self._items:
+                return default
+            value = self._items[key]
+            self._discard(key)
+            return value
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._sizes.clear()
+            self._total = 0
+
+    def _discard(self, key):
+        del self._items[key]
+        self._total -= self._sizes.pop(key)
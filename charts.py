@@ -0,0 +1,283 @@
+"""Chart builders for the Visualization section.
+
+Each builder reduces the data first and then draws, so drawing cost depends
+on what is shown (categories, bins) rather than on the number of rows.
+:func:`render` rasterizes a builder's figure once per (dataset version,
+chart parameters) and serves the cached bytes to both display and download.
+Figures are built with the object-oriented API rather than pyplot, which
+keeps global state and is not safe to use from the background job threads.
+matplotlib is imported on the first draw, so the app starts without it.
+"""
+import io
+
+import numpy as np
+import pandas as pd
+
+import jobs
+from cache import ByteLRUCache
+
+FORMATS = {"png": "image/png", "svg": "image/svg+xml"}
+FIGURE_CACHE_BYTES = 128 * 1024 ** 2
+
+_figures = ByteLRUCache(FIGURE_CACHE_BYTES)
+
+AGGREGATIONS = ["sum", "mean", "count"]
+OTHER_LABEL = "Other"
+# Value labels are only drawn when there are at most this many bars.
+LABEL_MAX_BARS = 40
+
+
+def _subplots(figsize, dpi):
+    from matplotlib.figure import Figure
+    fig = Figure(figsize=figsize, dpi=dpi)
+    return fig, fig.subplots()
+
+
+def other_label(labels, folded):
+    """Label for ``folded`` categories grouped together, distinct from every one of ``labels``."""
+    label = f"{OTHER_LABEL} ({folded:,} more)"
+    taken = {str(x) for x in labels}
+    while label in taken:
+        label += "*"
+    return label
+
+
+def aggregate_bars(df, categorical_col, numeric_cols, how="sum", top_n=20):
+    """Aggregate ``numeric_cols`` per category, keeping the ``top_n`` largest.
+
+    Categories are ranked by the aggregate of the first numeric column; the
+    rest are folded into a single ``"Other (k more)"`` row (a weighted mean
+    for ``how="mean"``).
+    """
+    grouped = df.groupby(categorical_col, observed=True, sort=False)[list(numeric_cols)]
+    sums, counts = grouped.sum(), grouped.count()
+    values = {"sum": sums, "count": counts}.get(how)
+    if values is None:
+        values = sums / counts.where(counts > 0)
+    values = values.sort_values(numeric_cols[0], ascending=False)
+    if len(values) <= top_n:
+        return values
+
+    top, rest = values.index[:top_n], values.index[top_n:]
+    if how == "mean":
+        rest_counts = counts.loc[rest].sum()
+        other = sums.loc[rest].sum() / rest_counts.where(rest_counts > 0)
+    elif how == "count":
+        other = counts.loc[rest].sum()
+    else:
+        other = sums.loc[rest].sum()
+    result = values.loc[top]
+    result.index = result.index.astype(object)
+    result.loc[other_label(top, len(rest))] = other
+    return result
+
+
+def bar_chart(agg, categorical_col, numeric_cols, how="sum"):
+    """Clustered column chart of an :func:`aggregate_bars` result."""
+    fig, ax = _subplots(figsize=(7, 5), dpi=100)
+    x = np.arange(len(agg))
+    bar_width = 0.8 / len(numeric_cols)
+    label_bars = len(agg) * len(numeric_cols) <= LABEL_MAX_BARS
+
+    for i, col in enumerate(numeric_cols):
+        bars = ax.bar(x + i * bar_width, agg[col].to_numpy(dtype=float), width=bar_width, label=col)
+        if label_bars:
+            ax.bar_label(bars, fmt="%.4g", fontsize=8)
+
+    ax.set_xticks(x + bar_width * (len(numeric_cols) - 1) / 2)
+    ax.set_xticklabels([str(c) for c in agg.index], rotation=45, ha='right')
+    ax.set_title(f"{how.title()} of {', '.join(map(str, numeric_cols))} by {categorical_col}", fontsize=12)
+    ax.set_xlabel(categorical_col)
+    ax.set_ylabel(how.title())
+    ax.legend()
+    fig.tight_layout()
+    return fig
+
+
+# Above this many points the scatter plot is drawn as a density image.
+SCATTER_MAX_POINTS = 50_000
+DENSITY_BINS = 300
+MAX_HUES = 10
+
+
+def _hue_codes(s, max_hues=MAX_HUES):
+    """Factorize ``s`` keeping the ``max_hues - 1`` most common values; the rest share one code."""
+    codes, uniques = pd.factorize(s, use_na_sentinel=True)
+    labels = [str(u) for u in uniques]
+    if len(uniques) > max_hues:
+        counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+        keep = np.argsort(-counts, kind="stable")[:max_hues - 1]
+        remap = np.full(len(uniques), max_hues - 1)
+        remap[keep] = np.arange(len(keep))
+        codes = np.where(codes >= 0, remap[codes], -1)
+        kept = [labels[k] for k in keep]
+        labels = kept + [other_label(kept, len(uniques) - len(keep))]
+    return codes, labels
+
+
+def density_grid(x, y, bins=DENSITY_BINS, groups=None, n_groups=1):
+    """2D histogram of ``x``/``y`` from quantized coordinates and one ``bincount``.
+
+    With ``groups`` (integer codes in ``[0, n_groups)``), returns one grid per
+    group, shape ``(n_groups, bins, bins)``. Also returns the data extent.
+    """
+    xmin, xmax, ymin, ymax = x.min(), x.max(), y.min(), y.max()
+    xspan = (xmax - xmin) or 1.0
+    yspan = (ymax - ymin) or 1.0
+    xi = np.minimum(((x - xmin) * (bins / xspan)).astype(np.int64), bins - 1)
+    yi = np.minimum(((y - ymin) * (bins / yspan)).astype(np.int64), bins - 1)
+    cell = yi * bins + xi
+    if groups is not None:
+        cell += groups.astype(np.int64) * (bins * bins)
+    counts = np.bincount(cell, minlength=n_groups * bins * bins).reshape(n_groups, bins, bins)
+    return counts, (xmin, xmin + xspan, ymin, ymin + yspan)
+
+
+def density_scatter(df, x_col, y_col, hue_col=None, bins=DENSITY_BINS):
+    """Scatter plot rendered as a binned density image.
+
+    Without a hue, cell brightness is the log of the point count. With a hue,
+    each cell takes the count-weighted mix of the category colors.
+    """
+    x = df[x_col].to_numpy(dtype=np.float64, na_value=np.nan)
+    y = df[y_col].to_numpy(dtype=np.float64, na_value=np.nan)
+    valid = ~(np.isnan(x) | np.isnan(y))
+    codes, labels = (None, None)
+    if hue_col:
+        codes, labels = _hue_codes(df[hue_col])
+        valid &= codes >= 0
+        codes = codes[valid]
+    x, y = x[valid], y[valid]
+
+    fig, ax = _subplots(figsize=(6, 4.5), dpi=100)
+    if len(x) == 0:
+        ax.set_title("No points to plot")
+        return fig
+    if codes is None:
+        counts, extent = density_grid(x, y, bins)
+        image = ax.imshow(np.log1p(counts[0]), origin="lower", extent=extent, aspect="auto", cmap="viridis")
+        fig.colorbar(image, ax=ax, label="log(1 + points)")
+    else:
+        import matplotlib
+        from matplotlib.patches import Rectangle
+        counts, extent = density_grid(x, y, bins, codes, len(labels))
+        colors = matplotlib.colormaps["tab10"](np.arange(len(labels)) % 10)[:, :3]
+        total = counts.sum(axis=0)
+        mix = np.einsum("gij,gc->ijc", counts, colors) / np.maximum(total, 1)[..., None]
+        alpha = np.log1p(total) / np.log1p(total.max())
+        ax.imshow(np.dstack([mix, alpha]), origin="lower", extent=extent, aspect="auto")
+        handles = [Rectangle((0, 0), 1, 1, color=c) for c in colors]
+        ax.legend(handles, labels, title=hue_col, fontsize=7, loc="best")
+    ax.set_xlabel(x_col)
+    ax.set_ylabel(y_col)
+    ax.set_title(f"Density: {x_col} vs {y_col} ({len(x):,} points)", fontsize=10)
+    fig.tight_layout()
+    return fig
+
+
+def scatter_chart(df, x_col, y_col, hue_col=None):
+    """Plain marker scatter plot for small data."""
+    fig, ax = _subplots(figsize=(4, 3), dpi=50)
+    if hue_col:
+        codes, labels = _hue_codes(df[hue_col])
+        for code, label in enumerate(labels):
+            part = df[codes == code]
+            ax.scatter(part[x_col], part[y_col], s=10, label=label)
+        ax.legend(title=hue_col, fontsize=6)
+    else:
+        ax.scatter(df[x_col], df[y_col], s=10)
+    ax.set_xlabel(x_col)
+    ax.set_ylabel(y_col)
+    ax.set_title(f"Scatter Plot: {x_col} vs {y_col}", fontsize=10)
+    fig.tight_layout()
+    return fig
+
+
+# Heatmap cells are annotated with their value only up to this many columns.
+ANNOTATE_MAX_COLUMNS = 20
+
+
+def heatmap(corr, title="Correlation Heatmap"):
+    """Correlation heatmap; annotations only when the matrix is small enough to read."""
+    k = len(corr)
+    size = min(max(5, 0.35 * k + 2), 14)
+    fig, ax = _subplots(figsize=(size + 1.5, size), dpi=100)
+    image = ax.imshow(corr.to_numpy(dtype=float), cmap="coolwarm", vmin=-1, vmax=1)
+    fig.colorbar(image, ax=ax)
+    labels = [str(c) for c in corr.columns]
+    if k <= 60:
+        ax.set_xticks(np.arange(k), labels, rotation=90, fontsize=8)
+        ax.set_yticks(np.arange(k), labels, fontsize=8)
+    if k <= ANNOTATE_MAX_COLUMNS:
+        values = corr.to_numpy(dtype=float)
+        for i in range(k):
+            for j in range(k):
+                if not np.isnan(values[i, j]):
+                    ax.text(j, i, f"{values[i, j]:.2f}", ha="center", va="center", fontsize=8)
+    ax.set_title(title, fontsize=10)
+    fig.tight_layout()
+    return fig
+
+
+def pie_chart(df, cat_col, num_col):
+    fig, ax = _subplots(figsize=(7, 7), dpi=100)
+    ax.pie(
+        df[num_col],
+        labels=df[cat_col].astype(str),
+        autopct='%1.1f%%'
+    )
+    ax.axis('equal')
+    return fig
+
+
+def histogram(counts):
+    """Overlaid histograms from precomputed ``{column: (counts, edges)}``."""
+    fig, ax = _subplots(figsize=(7, 5), dpi=100)
+    for col, (col_counts, edges) in counts.items():
+        ax.stairs(col_counts, edges, fill=True, alpha=0.5, label=col)
+    ax.set_title("Histogram")
+    ax.set_xlabel("Value")
+    ax.set_ylabel("Frequency")
+    ax.legend()
+    fig.tight_layout()
+    return fig
+
+
+def box_plot(box_stats):
+    """Box plot drawn from precomputed stats (see ``stats.box_stats``), not raw rows."""
+    fig, ax = _subplots(figsize=(7, 5), dpi=100)
+    ax.bxp(box_stats, patch_artist=True)
+
+    for i, s in enumerate(box_stats, start=1):
+        ax.text(i, s["min"], f"Min: {s['min']:.2f}", ha='center', va='top', fontsize=8, color="blue")
+        ax.text(i, s["q1"], f"Q1: {s['q1']:.2f}", ha='center', va='bottom', fontsize=8, color="green")
+        ax.text(i, s["med"], f"Median: {s['med']:.2f}", ha='center', va='bottom', fontsize=8, color="red")
+        ax.text(i, s["q3"], f"Q3: {s['q3']:.2f}", ha='center', va='bottom', fontsize=8, color="green")
+        ax.text(i, s["max"], f"Max: {s['max']:.2f}", ha='center', va='bottom', fontsize=8, color="blue")
+
+    ax.set_title("Box Plot with Stats")
+    ax.set_ylabel("Values")
+    fig.tight_layout()
+    return fig
+
+
+def render(key, build, fmt="png"):
+    """Return the image bytes for ``build()``'s figure, cached under ``key``.
+
+    ``key`` starts with the dataset version (``None`` disables caching) and
+    should hold every parameter that changes the picture.
+    """
+    cache_key = (*key, fmt)
+    if key[0] is not None:
+        data = _figures.get(cache_key)
+        if data is not None:
+            return data
+    fig = build()
+    # Last chance to drop a superseded render before the costly rasterization
+    jobs.report(message="Rendering chart...")
+    buf = io.BytesIO()
+    fig.savefig(buf, format=fmt, bbox_inches="tight")
+    data = buf.getvalue()
+    if key[0] is not None:
+        _figures.put(cache_key, data)
+    return data
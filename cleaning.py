@@ -0,0 +1,177 @@
+"""Cleaning steps as a replayable operation log.
+
+Each cleaning action is recorded as a small JSON-serializable dict and kept in
+session state instead of mutating the frame. :func:`run` replays the log on
+top of a freshly loaded frame, reusing snapshots from the dataset store:
+every prefix of the log has its own version, so adding step N+1 only computes
+that step and undo/redo usually find the result stored. A step copies only
+the column it changes, so a snapshot shares the rest with its parent.
+"""
+import hashlib
+import json
+
+import pandas as pd
+
+import datastore
+import jobs
+
+FILL_METHODS = ["Mean", "Median", "Mode", "Custom Value"]
+DTYPES = ["int", "float", "str", "datetime", "category"]
+
+
+def fill_missing(column, method, value=None):
+    return {"op": "fillna", "column": column, "method": method, "value": value}
+
+
+def convert_type(column, dtype):
+    return {"op": "astype", "column": column, "dtype": dtype}
+
+
+def drop(columns=(), rows=()):
+    # Row labels from the index may be NumPy scalars; store plain Python values
+    rows = [r.item() if hasattr(r, "item") else r for r in rows]
+    return {"op": "drop", "columns": list(columns), "rows": rows}
+
+
+def rename(column, new_name):
+    return {"op": "rename", "column": column, "new_name": new_name}
+
+
+def reset_index():
+    return {"op": "reset_index"}
+
+
+def set_index(column):
+    return {"op": "set_index", "column": column}
+
+
+def describe(step):
+    """One-line, human readable summary of a step."""
+    op = step["op"]
+    if op == "fillna":
+        how = f"'{step['value']}'" if step["method"] == "Custom Value" else step["method"].lower()
+        return f"Fill missing `{step['column']}` with {how}"
+    if op == "astype":
+        return f"Convert `{step['column']}` to {step['dtype']}"
+    if op == "drop":
+        return f"Drop columns {step['columns']} and rows {step['rows']}"
+    if op == "rename":
+        return f"Rename `{step['column']}` to `{step['new_name']}`"
+    if op == "reset_index":
+        return "Reset index"
+    if op == "set_index":
+        return f"Set `{step['column']}` as index"
+    return op
+
+
+def apply_step(df, step):
+    """Return a new frame with ``step`` applied; ``df`` is left untouched."""
+    op = step["op"]
+    if op == "fillna":
+        col, method = step["column"], step["method"]
+        if method == "Mean":
+            value = df[col].mean()
+        elif method == "Median":
+            value = df[col].median()
+        elif method == "Mode":
+            value = df[col].mode()[0]
+        else:
+            value = step["value"]
+        values = df[col]
+        # Compact mode stores repeated text as categories, which only take known values
+        if isinstance(values.dtype, pd.CategoricalDtype) and pd.notna(value) and value not in values.cat.categories:
+            values = values.cat.add_categories([value])
+        return _set(df, col, values.fillna(value))
+    if op == "astype":
+        col, dtype = step["column"], step["dtype"]
+        if dtype == "datetime":
+            converted = pd.to_datetime(df[col], errors="coerce")
+        else:
+            converted = df[col].astype(dtype)
+        return _set(df, col, converted)
+    if op == "drop":
+        return df.drop(columns=step["columns"], index=step["rows"])
+    if op == "rename":
+        return df.rename(columns={step["column"]: step["new_name"]})
+    if op == "reset_index":
+        return df.reset_index(drop=True)
+    if op == "set_index":
+        return df.set_index(step["column"])
+    raise ValueError(f"Unknown cleaning step: {op}")
+
+
+def _set(df, col, values):
+    out = df.copy(deep=False)
+    out[col] = values
+    return out
+
+
+def step_versions(base_version, steps):
+    """Version of the frame after each prefix of ``steps`` (index 0 = no steps)."""
+    versions = [base_version]
+    for step in steps:
+        h = hashlib.blake2b(digest_size=16)
+        h.update(str(versions[-1]).encode())
+        h.update(json.dumps(step, sort_keys=True, default=str).encode())
+        versions.append(h.hexdigest())
+    return versions
+
+
+def run(df, steps, base_version):
+    """Apply ``steps`` to ``df`` reusing stored snapshots.
+
+    Returns ``(frame, version, error)``. If a step fails, the frame and
+    version after the last successful step are returned together with
+    ``(step_number, exception)``.
+    """
+    if not steps:
+        return df, base_version, None
+    versions = step_versions(base_version, steps)
+    start, frame = 0, df
+    for i in range(len(steps), 0, -1):
+        cached = datastore.get(versions[i])
+        if cached is not None:
+            start, frame = i, cached
+            break
+    for i in range(start, len(steps)):
+        jobs.report(i / len(steps), f"Applying step {i + 1}: {describe(steps[i])}")
+        try:
+            frame = apply_step(frame, steps[i])
+        except Exception as e:
+            return frame, versions[i], (i + 1, e)
+        frame = datastore.put(versions[i + 1], frame)
+    return frame, versions[-1], None
+
+
+class OperationLog:
+    """Ordered cleaning steps with undo/redo, stored in session state."""
+
+    def __init__(self, steps=None):
+        self.steps = list(steps or [])
+        self.undone = []
+
+    def add(self, step):
+        self.steps.append(step)
+        self.undone.clear()
+
+    def undo(self):
+        if self.steps:
+            self.undone.append(self.steps.pop())
+
+    def redo(self):
+        if self.undone:
+            self.steps.append(self.undone.pop())
+
+    def clear(self):
+        self.steps.clear()
+        self.undone.clear()
+
+    def to_json(self):
+        return json.dumps(self.steps, indent=2, default=str)
+
+    @classmethod
+    def from_json(cls, text):
+        steps = json.loads(text)
+        if not isinstance(steps, list) or not all(isinstance(s, dict) and "op" in s for s in steps):
+            raise ValueError("Not a cleaning log")
+        return cls(steps)
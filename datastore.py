@@ -0,0 +1,188 @@
+"""Process-wide store of loaded datasets, shared by every session.
+
+Parsed uploads, SQL loads and cleaning snapshots live here once, under their
+data version; SQL loads are versioned by content, so identical extracts
+loaded by different sessions are kept once. Sessions keep only the version
+and fetch the data on every rerun. :func:`get` hands out shallow copies:
+with copy-on-write a write to one copies just the written column, and the
+stored frame never changes.
+
+Memory is counted per column buffer rather than per frame, so a cleaning
+snapshot that shares all but one column with its parent costs one column.
+Each session holds (:func:`hold`) the versions it currently shows, which
+releases the ones it held before (a previous upload, older preview pages). When the
+total is over ``MEMORY_BUDGET_BYTES``, datasets no session holds are evicted,
+least recently used first. A session that has not rerun for
+``IDLE_SECONDS`` stops holding anything; when it comes back to an evicted
+dataset it loads it again from its source. Held datasets are never evicted,
+so the budget can be exceeded while live sessions need them.
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from cache import column_nbytes, nbytes
+
+MEMORY_BUDGET_BYTES = int(float(os.environ.get("EDA_MEMORY_BUDGET_MB", 4096)) * 1024 ** 2)
+IDLE_SECONDS = float(os.environ.get("EDA_IDLE_SECONDS", 15 * 60))
+
+
+def content_version(frame):
+    """Version of a frame from its columns, dtypes, index and values."""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(repr((list(frame.columns), [str(t) for t in frame.dtypes])).encode())
+    h.update(pd.util.hash_pandas_object(frame, index=True).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+def _buffer_key(s):
+    # Identifies the memory behind a column or index, the same for every shallow copy
+    values = s.array
+    if isinstance(s.dtype, np.dtype):
+        data = np.asarray(values)
+    elif isinstance(values, pd.Categorical):
+        data = values.codes
+    elif isinstance(getattr(values, "_data", None), np.ndarray):
+        # Masked arrays (Int64, boolean, ...)
+        data = values._data
+    elif hasattr(values, "__arrow_array__"):
+        chunks = getattr(values.__arrow_array__(), "chunks", None) or [values.__arrow_array__()]
+        return ("arrow", len(s), len(chunks)) + tuple(b.address for b in chunks[0].buffers() if b is not None)
+    else:
+        return ("object", id(values))
+    return ("numpy", len(s), data.__array_interface__["data"][0])
+
+
+def buffers(value):
+    """``{buffer key: bytes}`` of the memory held by a stored value."""
+    if not isinstance(value, pd.DataFrame):
+        return {("object", id(value)): nbytes(value)}
+    index = value.index
+    out = {("range",) if isinstance(index, pd.RangeIndex) else _buffer_key(index): int(index.memory_usage())}
+    for i in range(value.shape[1]):
+        s = value.iloc[:, i]
+        out[_buffer_key(s)] = column_nbytes(s)
+    return out
+
+
+class DatasetStore:
+    """Versioned datasets with shared-buffer accounting and eviction of unheld versions."""
+
+    def __init__(self, budget_bytes=MEMORY_BUDGET_BYTES, idle_seconds=IDLE_SECONDS):
+        self.budget_bytes = int(budget_bytes)
+        self.idle_seconds = idle_seconds
+        self._values = {}
+        self._buffers = {}
+        self._last_used = OrderedDict()
+        self._refs = Counter()
+        self._sizes = {}
+        self._holders = {}  # holder -> (held versions, time of its last hold)
+        self._total = 0
+        self._lock = threading.Lock()
+
+    @property
+    def total_bytes(self):
+        return self._total
+
+    def __len__(self):
+        return len(self._values)
+
+    def __contains__(self, version):
+        return version in self._values
+
+    def get(self, version):
+        """A read-only view of ``version``, or ``None`` if it is not stored."""
+        with self._lock:
+            value = self._values.get(version)
+            if value is None:
+                return None
+            self._touch(version)
+        return value.copy(deep=False) if isinstance(value, pd.DataFrame) else value
+
+    def put(self, version, value, holder=None):
+        """Store ``value`` under ``version`` unless it is there already; return a view of the stored one.
+
+        With ``holder`` the version is added to what that holder holds, so it
+        cannot be evicted before the holder's next :meth:`hold`.
+        """
+        held = buffers(value) if version not in self._values else None
+        with self._lock:
+            if holder is not None:
+                versions, _ = self._holders.get(holder, (frozenset(), None))
+                self._holders[holder] = (versions | {version}, time.monotonic())
+            if held is not None and version not in self._values:
+                self._values[version] = value
+                self._buffers[version] = held
+                for key, size in held.items():
+                    if self._refs[key] == 0:
+                        self._sizes[key] = size
+                        self._total += size
+                    self._refs[key] += 1
+                self._touch(version)
+                self._evict(keep=version)
+        view = self.get(version)
+        return value if view is None else view
+
+    def hold(self, holder, versions):
+        """Make ``versions`` the ones ``holder`` (e.g. a session) uses; the rest it held become evictable."""
+        with self._lock:
+            self._holders[holder] = (frozenset(v for v in versions if v is not None), time.monotonic())
+            self._evict()
+
+    def _touch(self, version):
+        self._last_used[version] = time.monotonic()
+        self._last_used.move_to_end(version)
+
+    def _held(self):
+        # Versions of the holders that were active in the last ``idle_seconds``
+        idle_before = time.monotonic() - self.idle_seconds
+        held = set()
+        for holder, (versions, last_hold) in list(self._holders.items()):
+            if last_hold < idle_before:
+                del self._holders[holder]
+            else:
+                held |= versions
+        return held
+
+    def _evict(self, keep=None):
+        if self._total <= self.budget_bytes:
+            return
+        held = self._held()
+        for version in list(self._last_used):
+            if self._total <= self.budget_bytes:
+                break
+            if version != keep and version not in held:
+                self._discard(version)
+
+    def _discard(self, version):
+        value = self._values.pop(version)
+        del self._last_used[version]
+        for key in self._buffers.pop(version):
+            self._refs[key] -= 1
+            if self._refs[key] == 0:
+                del self._refs[key]
+                self._total -= self._sizes.pop(key)
+        return value
+
+
+_store = DatasetStore()
+
+
+def get(version):
+    """A read-only view of dataset ``version`` from the shared store, or ``None``."""
+    return _store.get(version)
+
+
+def put(version, value, holder=None):
+    """Add a dataset to the shared store, held by ``holder``; returns a view of the stored copy."""
+    return _store.put(version, value, holder)
+
+
+def hold(holder, versions):
+    """Make ``versions`` the datasets ``holder`` keeps in the shared store."""
+    _store.hold(holder, versions)
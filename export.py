@@ -0,0 +1,192 @@
+"""Export of the filtered or cleaned data as Parquet, Feather or compressed CSV.
+
+Files are encoded ``CHUNK_ROWS`` rows at a time: each chunk is converted to
+Arrow (or CSV text) and appended to the output, so no full-size Arrow table
+or CSV string is built next to the frame. Out-of-core data is streamed from
+its Parquet store batch by batch. Finished files are kept under
+``EXPORT_DIR`` per (data version, format), so repeated downloads of the same
+data only read the file back.
+"""
+import hashlib
+import os
+import tempfile
+import threading
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+EXPORT_DIR = os.path.join(tempfile.gettempdir(), "eda_exports")
+EXPORT_CACHE_BYTES = 2 * 1024 ** 3
+CHUNK_ROWS = 100_000
+# Rows sampled to pick the Arrow type of an object column.
+TYPE_SAMPLE_ROWS = 1000
+
+FORMATS = {
+    "Parquet": (".parquet", "application/vnd.apache.parquet"),
+    "Feather": (".feather", "application/vnd.apache.arrow.file"),
+    "CSV (gzip)": (".csv.gz", "application/gzip"),
+    "CSV (zstd)": (".csv.zst", "application/zstd"),
+}
+
+
+# ``infer_dtype`` kinds of object columns that Arrow stores as they are
+_ARROW_KINDS = {"string", "bytes", "integer", "floating", "mixed-integer-float", "decimal", "boolean",
+                "datetime", "datetime64", "date", "timedelta", "timedelta64", "time"}
+
+
+def _object_type(s):
+    """Arrow type for object column ``s``, or ``None`` if it has to be written as text."""
+    kind = pd.api.types.infer_dtype(s, skipna=True)
+    if kind == "empty":
+        return pa.string()
+    if kind == "mixed-integer-float":
+        return pa.float64()
+    if kind not in _ARROW_KINDS:
+        return None
+    # The whole column is of one kind, so any of its values tell the Arrow type
+    sample = s.dropna().iloc[:TYPE_SAMPLE_ROWS]
+    try:
+        return pa.array(sample.tolist()).type
+    except (pa.ArrowInvalid, pa.ArrowTypeError, OverflowError):
+        return None
+
+
+def _frame_tables(df, index):
+    """Arrow schema and a generator of per-chunk tables for a DataFrame.
+
+    Object columns holding values of several types (e.g. numbers next to a
+    text fill value) are written as text, like the data viewer shows them.
+    """
+    schema = pa.Schema.from_pandas(df.head(0), preserve_index=index)
+    as_text = []
+    for col in df.columns[df.dtypes == object]:
+        i = schema.get_field_index(str(col))
+        kind = _object_type(df[col])
+        if kind is None:
+            as_text.append(col)
+        schema = schema.set(i, pa.field(str(col), kind or pa.string()))
+
+    def tables():
+        for chunk in _chunks(df):
+            if as_text:
+                chunk = chunk.copy(deep=False)
+                for col in as_text:
+                    chunk[col] = chunk[col].map(str, na_action="ignore")
+            yield pa.Table.from_pandas(chunk, schema=schema, preserve_index=index)
+    return schema, tables()
+
+
+def _chunks(df):
+    return (df.iloc[i:i + CHUNK_ROWS] for i in range(0, len(df), CHUNK_ROWS))
+
+
+def _write_arrow(data, fmt, path):
+    if isinstance(data, pd.DataFrame):
+        # A named index (e.g. from "Set Index") is data; unnamed row labels are not
+        schema, tables = _frame_tables(data, _keeps_index(data))
+    else:
+        # An Arrow scanner (see outofcore.Dataset.scanner)
+        schema = data.projected_schema
+        tables = (pa.Table.from_batches([b]) for b in data.to_batches() if b.num_rows)
+    if fmt == "Parquet":
+        with pq.ParquetWriter(path, schema) as writer:
+            for table in tables:
+                writer.write_table(table)
+    else:
+        # Feather V2 is the Arrow IPC file format
+        options = pa.ipc.IpcWriteOptions(compression="lz4")
+        with pa.OSFile(path, "wb") as sink, pa.ipc.new_file(sink, schema, options=options) as writer:
+            for table in tables:
+                writer.write_table(table)
+
+
+def _write_csv(data, codec, path):
+    # pandas writes any mix of values as text, so CSV needs no Arrow schema
+    if isinstance(data, pd.DataFrame):
+        index = _keeps_index(data)
+        frames, columns = _chunks(data), list(data.columns)
+    else:
+        index = False
+        frames = (b.to_pandas() for b in data.to_batches() if b.num_rows)
+        columns = data.projected_schema.names
+    with pa.CompressedOutputStream(path, codec) as out:
+        header = True
+        for frame in frames:
+            out.write(frame.to_csv(index=index, header=header).encode())
+            header = False
+        if header:
+            # No rows: still write the column names
+            empty = data.head(0) if isinstance(data, pd.DataFrame) else pd.DataFrame(columns=columns)
+            out.write(empty.to_csv(index=index).encode())
+
+
+def _keeps_index(df):
+    return any(name is not None for name in df.index.names)
+
+
+def write(data, fmt, path):
+    """Write ``data`` (a DataFrame or an Arrow scanner) to ``path`` in ``fmt``, chunk by chunk."""
+    if pa is None:
+        raise RuntimeError("Export needs pyarrow")
+    if fmt in ("Parquet", "Feather"):
+        _write_arrow(data, fmt, path)
+    elif fmt in ("CSV (gzip)", "CSV (zstd)"):
+        _write_csv(data, "gzip" if fmt == "CSV (gzip)" else "zstd", path)
+    else:
+        raise ValueError(f"Unknown export format: {fmt}")
+
+
+def _prune(keep):
+    # Drop the least recently used exports until the directory fits the budget
+    entries = []
+    for name in os.listdir(EXPORT_DIR):
+        path = os.path.join(EXPORT_DIR, name)
+        if path != keep and not name.endswith(".tmp"):
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+    total = sum(size for _, size, _ in entries) + os.path.getsize(keep)
+    for _, size, path in sorted(entries):
+        if total <= EXPORT_CACHE_BYTES:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+
+
+def export(version, build, fmt):
+    """Return the file bytes of ``build()``'s data in ``fmt``, encoding once per ``version``.
+
+    ``version`` should hold everything that changes the data (``None``
+    disables caching); ``build`` returns a DataFrame or an Arrow scanner and is
+    only called when the file is not cached.
+    """
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    name = hashlib.blake2b(repr((version, fmt)).encode(), digest_size=16).hexdigest()
+    path = os.path.join(EXPORT_DIR, name + FORMATS[fmt][0])
+    if version is None or not os.path.exists(path):
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            write(build(), fmt, tmp)
+            if version is None:
+                with open(tmp, "rb") as f:
+                    return f.read()
+            # Concurrent exports of the same data write their own tmp file; the last rename wins
+            os.replace(tmp, path)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        _prune(path)
+    else:
+        os.utime(path)
+    with open(path, "rb") as f:
+        return f.read()
@@ -0,0 +1,233 @@
+"""Indexed row filtering for the Basic and Custom filters.
+
+Per-column indexes are built the first time a column is filtered and cached
+by dataset version:
+
+* label columns get a factorized code array plus a code -> row-position map
+  (row positions grouped by code, CSR style), so equality and small ``isin``
+  predicates read their rows directly and large ones become one lookup;
+* numeric columns get their non-null values sorted once, so a range predicate
+  is two ``searchsorted`` calls.
+
+Value counts for the filter widgets are a ``bincount`` over the same codes.
+All predicates are combined into a single boolean mask and the result is
+taken from the frame once, without copying it or building intermediate frames.
+
+Out-of-core datasets have no in-memory indexes: their value counts and ranges
+come from :class:`outofcore.Dataset` (row-group scans and statistics), cached
+here the same way, and filtering them is ``Dataset.filter``.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+import outofcore
+from cache import ByteLRUCache, nbytes
+
+CACHE_BUDGET_BYTES = 1024 ** 3
+# isin predicates with at most this many values gather rows from the
+# position map instead of scanning the code array.
+GATHER_MAX_VALUES = 16
+# Columns with more distinct values than this get a top-k + search widget
+# instead of a multiselect listing every value.
+SMALL_CARDINALITY = 100
+TOP_K = 100
+
+_indexes = ByteLRUCache(CACHE_BUDGET_BYTES, sizeof=lambda idx: idx.nbytes)
+
+
+@dataclass
+class CodeIndex:
+    codes: np.ndarray  # per-row code, -1 for missing
+    uniques: pd.Index
+    order: np.ndarray  # row positions sorted by code (missing rows first)
+    offsets: np.ndarray  # rows with code c are order[offsets[c + 1]:offsets[c + 2]]
+
+    @property
+    def nbytes(self):
+        return self.codes.nbytes + self.order.nbytes + self.offsets.nbytes + nbytes(self.uniques.to_numpy())
+
+    def positions(self, code):
+        return self.order[self.offsets[code + 1]:self.offsets[code + 2]]
+
+
+@dataclass
+class SortedIndex:
+    values: np.ndarray  # non-null values, ascending
+    order: np.ndarray  # row position of each entry in ``values``
+
+    @property
+    def nbytes(self):
+        return self.values.nbytes + self.order.nbytes
+
+
+def _build_code_index(s):
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        codes, uniques = s.cat.codes.to_numpy(), s.cat.categories
+    else:
+        codes, uniques = pd.factorize(s, use_na_sentinel=True)
+        uniques = pd.Index(uniques)
+    codes = codes.astype(np.int32 if len(uniques) < 2 ** 31 - 1 else np.int64, copy=False)
+    order = np.argsort(codes, kind="stable")
+    offsets = np.searchsorted(codes[order], np.arange(-1, len(uniques) + 1), side="left")
+    return CodeIndex(codes, uniques, order, offsets)
+
+
+def _build_sorted_index(s):
+    values = s.to_numpy(dtype=np.float64, na_value=np.nan)
+    order = np.argsort(values, kind="stable")
+    # argsort puts NaN last; drop them so searchsorted only sees real values
+    valid = len(values) - int(np.isnan(values).sum())
+    order = order[:valid]
+    return SortedIndex(values[order], order)
+
+
+def _cached(df, col, version, kind, build):
+    if version is None:
+        return build(df[col])
+    key = (version, col, kind)
+    idx = _indexes.get(key)
+    if idx is None:
+        idx = _indexes.put(key, build(df[col]))
+    return idx
+
+
+def _cached_dataset(ds, col, version, kind, build):
+    if version is None:
+        return build(col)
+    key = (version, col, kind)
+    value = _indexes.get(key)
+    if value is None:
+        value = build(col)
+        value = _indexes.put(key, value, size=nbytes(value))
+    return value
+
+
+def code_index(df, col, version=None):
+    return _cached(df, col, version, "codes", _build_code_index)
+
+
+def sorted_index(df, col, version=None):
+    return _cached(df, col, version, "sorted", _build_sorted_index)
+
+
+def column_values(df, col, version=None):
+    """Distinct non-null values of ``col`` in order of first appearance."""
+    if isinstance(df, outofcore.Dataset):
+        return value_counts(df, col, version).index
+    return code_index(df, col, version).uniques
+
+
+def value_counts(df, col, version=None):
+    """Counts of each distinct non-null value of ``col``, most frequent first."""
+    if isinstance(df, outofcore.Dataset):
+        return _cached_dataset(df, col, version, "counts", df.value_counts)
+
+    def build(s):
+        idx = code_index(df, col, version)
+        counts = np.bincount(idx.codes[idx.codes >= 0], minlength=len(idx.uniques))
+        order = np.argsort(-counts, kind="stable")
+        return pd.Series(counts[order], index=idx.uniques[order], name="count")
+    return _cached(df, col, version, "counts", build)
+
+
+def candidate_values(counts, search="", keep=(), limit=TOP_K):
+    """Values to offer in a filter widget for a high-cardinality column.
+
+    The ``limit`` most frequent values (or the most frequent ones containing
+    ``search``, case-insensitively), plus the already chosen ``keep`` values
+    so a new search does not drop the current selection.
+    """
+    values = counts.index
+    if search:
+        values = values[values.astype(str).str.contains(search, case=False, regex=False)]
+    options = list(keep)
+    seen = set(options)
+    options.extend(v for v in values[:limit] if v not in seen)
+    return options
+
+
+def index_candidates(index, search="", keep=(), limit=TOP_K):
+    """Row labels to offer for ``index`` without listing all of them.
+
+    The first ``limit`` labels, or those matching ``search``: the label equal
+    to it for a numeric index, labels containing it (case-insensitively)
+    otherwise. Already chosen ``keep`` labels come first.
+    """
+    if not search:
+        labels = index[:limit]
+    elif pd.api.types.is_numeric_dtype(index.dtype):
+        try:
+            labels = index[index == float(search)][:limit]
+        except ValueError:
+            labels = index[:0]
+    else:
+        labels = index[index.astype(str).str.contains(search, case=False, regex=False)][:limit]
+    options = list(keep)
+    seen = set(options)
+    options.extend(v for v in labels if v not in seen)
+    return options
+
+
+def column_range(df, col, version=None):
+    """``(min, max)`` of a numeric column, or ``None`` if it has no values."""
+    if isinstance(df, outofcore.Dataset):
+        return df.column_range(col)
+    idx = sorted_index(df, col, version)
+    if len(idx.values) == 0:
+        return None
+    return idx.values[0], idx.values[-1]
+
+
+def _isin_mask(idx, values, n):
+    values = list(values)
+    want_na = any(pd.isna(v) for v in values)
+    codes = idx.uniques.get_indexer([v for v in values if not pd.isna(v)])
+    codes = np.unique(codes[codes >= 0])
+    if want_na:
+        codes = np.concatenate([[-1], codes])
+    mask = np.zeros(n, dtype=bool)
+    if len(codes) <= GATHER_MAX_VALUES:
+        for code in codes:
+            mask[idx.positions(code)] = True
+        return mask
+    # Lookup table over codes; the extra last slot catches code -1 (missing)
+    lookup = np.zeros(len(idx.uniques) + 1, dtype=bool)
+    lookup[codes] = True
+    return lookup[idx.codes]
+
+
+def _range_mask(idx, low, high, n):
+    start = np.searchsorted(idx.values, low, side="left")
+    stop = np.searchsorted(idx.values, high, side="right")
+    mask = np.zeros(n, dtype=bool)
+    mask[idx.order[start:stop]] = True
+    return mask
+
+
+def filter_positions(df, predicates, version=None):
+    """Row positions of ``df`` matching every predicate.
+
+    ``predicates`` maps a column to a list of accepted values (``isin``) or a
+    ``(low, high)`` tuple (inclusive range; missing values never match).
+    """
+    n = len(df)
+    mask = None
+    for col, val in predicates.items():
+        if isinstance(val, tuple):
+            col_mask = _range_mask(sorted_index(df, col, version), val[0], val[1], n)
+        else:
+            col_mask = _isin_mask(code_index(df, col, version), val, n)
+        mask = col_mask if mask is None else np.logical_and(mask, col_mask, out=mask)
+    if mask is None:
+        return np.arange(n)
+    return np.flatnonzero(mask)
+
+
+def apply_filters(df, predicates, version=None, columns=None):
+    """Return the rows of ``df`` matching ``predicates`` (see :func:`filter_positions`)."""
+    frame = df if columns is None else df[list(columns)]
+    if not predicates:
+        return frame
+    return frame.take(filter_positions(df, predicates, version))
@@ -0,0 +1,182 @@
+"""CSV ingestion: content fingerprints, typed chunked parsing and a parsed-frame cache.
+
+Every widget interaction reruns ``app.py``; parsing the upload again on each
+rerun is what made large files unusable. Frames are parsed once per distinct
+upload content and kept in the dataset store shared by all sessions.
+"""
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+import datastore
+
+try:
+    import pyarrow  # noqa: F401
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+HASH_BLOCK = 8 * 1024 * 1024
+CHUNK_ROWS = 250_000
+SAMPLE_ROWS = 20_000
+
+ENGINES = ["auto", "pyarrow", "c"]
+
+
+def fingerprint(source):
+    """Return a hex digest of the bytes in ``source`` (bytes or a binary file)."""
+    h = hashlib.blake2b(digest_size=16)
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        h.update(source)
+        return h.hexdigest()
+    if hasattr(source, "getbuffer"):
+        h.update(source.getbuffer())
+        return h.hexdigest()
+    pos = source.tell()
+    source.seek(0)
+    for block in iter(lambda: source.read(HASH_BLOCK), b""):
+        h.update(block)
+    source.seek(pos)
+    return h.hexdigest()
+
+
+def infer_dtypes(source, sample_rows=SAMPLE_ROWS):
+    """Infer column dtypes from the first ``sample_rows`` rows.
+
+    Numeric columns are pinned to ``int64``/``float64`` and text columns to
+    ``str``: it keeps every chunk on the same dtype, so a text column whose
+    later rows only hold digits does not come back as a mix of ``str`` and
+    ``int``. Other columns (booleans, all-empty ones) are left to the parser.
+    """
+    source.seek(0)
+    sample = pd.read_csv(source, nrows=sample_rows)
+    source.seek(0)
+    dtypes = {}
+    for col, dtype in sample.dtypes.items():
+        if dtype.kind in "iuf":
+            dtypes[col] = np.float64 if dtype.kind == "f" else np.int64
+        elif is_text(sample[col]) and sample[col].notna().any():
+            dtypes[col] = str
+    return dtypes
+
+
+def _read_chunked(source, dtypes, chunksize):
+    source.seek(0)
+    chunks = list(pd.read_csv(source, dtype=dtypes, chunksize=chunksize))
+    if not chunks:
+        source.seek(0)
+        return pd.read_csv(source)
+    if len(chunks) == 1:
+        return chunks[0]
+    return pd.concat(chunks, ignore_index=True)
+
+
+def read_csv(source, engine="auto", chunksize=CHUNK_ROWS):
+    """Parse a CSV file-like object into a DataFrame.
+
+    ``engine="pyarrow"`` uses the multithreaded Arrow parser when installed;
+    otherwise the C parser reads ``chunksize`` rows at a time with dtypes
+    pinned from a sample. If a later chunk contradicts the sample (e.g. text
+    in a column that looked numeric) the file is re-read in one pass with
+    only the text columns pinned, so each column gets one type for the whole
+    file.
+    """
+    if engine == "auto":
+        engine = "pyarrow" if HAS_PYARROW else "c"
+    if engine == "pyarrow" and HAS_PYARROW:
+        source.seek(0)
+        return pd.read_csv(source, engine="pyarrow")
+
+    dtypes = infer_dtypes(source)
+    try:
+        return _read_chunked(source, dtypes, chunksize)
+    except (ValueError, TypeError, OverflowError):
+        source.seek(0)
+        text = {col: dtype for col, dtype in dtypes.items() if dtype is str}
+        return pd.read_csv(source, dtype=text, low_memory=False)
+
+
+def csv_version(version, engine="auto", compact=False):
+    """Data version of an upload with content fingerprint ``version`` parsed with these options."""
+    return f"{version}:{engine}:{int(compact)}"
+
+
+def load_csv(source, version, engine="auto", compact=False, holder=None):
+    """Return the parsed frame for ``source``, parsing only if it is not in the store.
+
+    ``version`` is the content fingerprint of the upload; the frame is stored
+    under :func:`csv_version`. With ``compact`` the frame is passed through
+    :func:`compact_frame`. The returned frame is a view of the one shared with
+    other sessions; ``holder`` is passed on to :func:`datastore.put`.
+    """
+    key = csv_version(version, engine, compact)
+    df = datastore.get(key)
+    if df is None:
+        df = read_csv(source, engine=engine)
+        if compact:
+            df = compact_frame(df)
+        df = datastore.put(key, df, holder)
+    return df
+
+
+CATEGORY_RATIO = 0.5
+
+
+def _arrow_string_dtype():
+    # Arrow-backed strings with NaN as the missing value, so boolean masks
+    # built from comparisons stay plain bool like they are for object columns.
+    if not HAS_PYARROW:
+        return None
+    try:
+        return pd.StringDtype("pyarrow", na_value=np.nan)
+    except TypeError:
+        pass
+    try:
+        return pd.StringDtype("pyarrow_numpy")
+    except (TypeError, ValueError):
+        return None
+
+
+_ARROW_STRING = _arrow_string_dtype()
+
+
+def is_text(s):
+    """True for columns that hold labels: object, string or categorical."""
+    return (pd.api.types.is_object_dtype(s.dtype)
+            or pd.api.types.is_string_dtype(s.dtype)
+            or isinstance(s.dtype, pd.CategoricalDtype))
+
+
+def _compact_column(s):
+    kind = s.dtype.kind
+    if kind in "iu":
+        return pd.to_numeric(s, downcast="unsigned" if kind == "u" else "integer")
+    if kind == "f":
+        small = s.astype(np.float32)
+        # Only keep float32 when it round-trips, so values shown to users don't change
+        if np.array_equal(small.to_numpy(np.float64), s.to_numpy(np.float64), equal_nan=True):
+            return small
+        return s
+    if is_text(s) and not isinstance(s.dtype, pd.CategoricalDtype):
+        if pd.api.types.is_object_dtype(s.dtype) and pd.api.types.infer_dtype(s, skipna=True) != "string":
+            return s
+        if len(s) and s.nunique(dropna=True) <= CATEGORY_RATIO * len(s):
+            return s.astype("category")
+        if pd.api.types.is_object_dtype(s.dtype) and _ARROW_STRING is not None:
+            return s.astype(_ARROW_STRING)
+    return s
+
+
+def compact_frame(df):
+    """Return a copy of ``df`` using the smallest dtypes that hold its values.
+
+    Integers are downcast, floats become float32 when that is lossless,
+    low-cardinality text becomes ``category`` and other text uses Arrow-backed
+    strings. The deep memory size before compaction is kept in
+    ``attrs["memory_before"]`` for the Info panel.
+    """
+    before = int(df.memory_usage(deep=True).sum())
+    out = pd.DataFrame({col: _compact_column(df[col]) for col in df.columns}, index=df.index)
+    out.attrs["memory_before"] = before
+    return out
@@ -0,0 +1,209 @@
+"""Per-rerun performance instrumentation.
+
+``app.py`` marks where each section of the script begins
+(``perf.mark("ingest")``, or :func:`section` on an ``st.fragment`` body); a
+section ends where the next one starts. For every
+section of every rerun the recorder keeps the wall time, the peak memory
+``tracemalloc`` traced while it ran (above what was allocated when it
+started) and the bytes of the messages it sent to the browser. A rolling
+history of the last ``HISTORY_RUNS`` reruns is kept in session state and
+shown in a sidebar panel, with JSON/CSV export. When only a fragment reruns,
+its section is recorded as a rerun of its own (scope ``"fragment"``); the
+panel shows it on the next full rerun.
+
+tracemalloc is process-wide and slows allocation-heavy code down, so it only
+runs while at least one session has the panel on (a session that stops
+rerunning stops counting after ``TRACING_EXPIRY_SECONDS``); with several such
+sessions the peaks include each other's work. Payload counts cover the websocket
+messages; images are served separately and count as their URL only.
+"""
+import functools
+import json
+import threading
+import time
+import tracemalloc
+from collections import deque
+
+import pandas as pd
+import streamlit as st
+
+HISTORY_RUNS = 50
+FIELDS = ["run", "scope", "started", "section", "wall_ms", "peak_mb", "payload_kb"]
+
+# A session that goes away with the panel on never reruns to turn it off, so
+# sessions count as tracing only until TRACING_EXPIRY_SECONDS after their last rerun.
+TRACING_EXPIRY_SECONDS = 15 * 60
+
+_tracing_sessions = {}  # session id -> time of its last rerun with the panel on
+_tracing_lock = threading.Lock()
+_started_tracing = False
+
+
+def _script_ctx():
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+    except ImportError:
+        return None
+    return get_script_run_ctx()
+
+
+def _fragment_rerun():
+    ctx = _script_ctx()
+    return bool(getattr(ctx, "fragment_ids_this_run", None))
+
+
+def _set_tracing(session_id, on, now=None):
+    # Only stop tracing this module started (a profiler or benchmark may own it)
+    global _started_tracing
+    now = time.monotonic() if now is None else now
+    with _tracing_lock:
+        if on:
+            _tracing_sessions[session_id] = now
+        else:
+            _tracing_sessions.pop(session_id, None)
+        for sid, seen in list(_tracing_sessions.items()):
+            if now - seen > TRACING_EXPIRY_SECONDS:
+                del _tracing_sessions[sid]
+        if _tracing_sessions and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _started_tracing = True
+        elif not _tracing_sessions and _started_tracing:
+            tracemalloc.stop()
+            _started_tracing = False
+
+
+class Recorder:
+    """Section timings of one session's reruns."""
+
+    def __init__(self, history_runs=HISTORY_RUNS):
+        self.history = deque(maxlen=history_runs)
+        self.enabled = False
+        self.runs = 0
+        self.sent_bytes = 0
+        self._rows = None
+        self._scope = "app"
+        self._open = None
+
+    def _count(self, nbytes):
+        self.sent_bytes += nbytes
+
+    def _hook_payload(self):
+        # Streamlit has no public hook for outgoing messages; wrap the
+        # session's enqueue callback and skip payload counts if it moves.
+        ctx = _script_ctx()
+        enqueue = getattr(ctx, "_enqueue", None)
+        if enqueue is None or getattr(enqueue, "_recorder", None) is self:
+            return
+
+        def counting(msg):
+            self._count(msg.ByteSize())
+            enqueue(msg)
+        counting._recorder = self
+        ctx._enqueue = counting
+
+    def start_run(self, enabled):
+        self.enabled = enabled
+        ctx = _script_ctx()
+        _set_tracing(ctx.session_id if ctx else None, enabled)
+        self._open = None
+        if enabled:
+            self._new_run("app")
+
+    def _new_run(self, scope):
+        self._hook_payload()
+        self.runs += 1
+        self._scope = scope
+        self._rows = []
+        self.history.append(self._rows)
+
+    def mark(self, section):
+        """End the current section (if any) and start ``section``."""
+        if not self.enabled:
+            return
+        if self._open is None and _fragment_rerun():
+            ctx = _script_ctx()
+            _set_tracing(ctx.session_id if ctx else None, True)
+            self._new_run("fragment")
+        self._close()
+        base = 0
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+        self._open = (section, time.time(), time.perf_counter(), self.sent_bytes, base)
+
+    def _close(self):
+        if self._open is None:
+            return
+        section, started, t0, sent0, base = self._open
+        peak = tracemalloc.get_traced_memory()[1] - base if tracemalloc.is_tracing() else 0
+        self._rows.append({
+            "run": self.runs,
+            "scope": self._scope,
+            "started": started,
+            "section": section,
+            "wall_ms": (time.perf_counter() - t0) * 1000,
+            "peak_mb": peak / 1e6,
+            "payload_kb": (self.sent_bytes - sent0) / 1e3,
+        })
+        self._open = None
+
+    def finish(self):
+        if self.enabled:
+            self._close()
+
+    def frame(self):
+        return pd.DataFrame([row for run in self.history for row in run], columns=FIELDS)
+
+    def to_json(self):
+        return json.dumps([row for run in self.history for row in run], indent=2)
+
+
+def recorder():
+    """This session's :class:`Recorder`."""
+    if "_perf_" not in st.session_state:
+        st.session_state._perf_ = Recorder()
+    return st.session_state._perf_
+
+
+def section(name):
+    """Decorator recording each call of the decorated function as section ``name``.
+
+    Put it under ``@st.fragment`` so fragment-only reruns are recorded too.
+    """
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            perf = recorder()
+            perf.mark(name)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                perf.finish()
+        return wrapper
+    return decorate
+
+
+def panel(perf):
+    """Close the last section and show the history in the sidebar."""
+    perf.finish()
+    if not perf.enabled:
+        return
+    with st.sidebar.expander("⏱️ Performance", expanded=True):
+        history = perf.frame()
+        if history.empty:
+            st.write("No reruns recorded yet.")
+            return
+        last = history[history["run"] == history["run"].max()].set_index("section")
+        st.caption(f"Rerun {perf.runs}: {last['wall_ms'].sum():,.0f} ms, "
+                   f"{last['payload_kb'].sum():,.1f} KB sent")
+        st.dataframe(last[["wall_ms", "peak_mb", "payload_kb"]].round(1))
+        st.caption(f"Wall time (ms) over the last {history['run'].nunique()} reruns")
+        st.line_chart(history.pivot_table(index="run", columns="section", values="wall_ms"), height=160)
+        summary = history.groupby("section")[["wall_ms", "peak_mb", "payload_kb"]].agg(["median", "max"])
+        summary.columns = [f"{col} {stat}" for col, stat in summary.columns]
+        st.dataframe(summary.round(1))
+        c1, c2 = st.columns(2)
+        c1.download_button("JSON", perf.to_json(), file_name="performance.json",
+                           mime="application/json", on_click="ignore")
+        c2.download_button("CSV", history.to_csv(index=False), file_name="performance.csv",
+                           mime="text/csv", on_click="ignore")
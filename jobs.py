@@ -0,0 +1,129 @@
+"""Background jobs for heavy operations.
+
+Profiling, chart renders, cleaning replays and SQL loads run on a shared
+thread pool instead of the Streamlit script thread. The script waits for a
+job behind a progress bar; a widget interaction stops the script at the next
+progress update (Streamlit interrupts at element updates), so it never queues
+behind the work. The job keeps running and the next rerun picks it up again.
+
+Each session has a :class:`JobRunner` with one job per *slot* (``"chart"``,
+``"profile"``, ...). Submitting a different key to a slot cancels the job it
+replaces: queued jobs are dropped, running ones stop at their next
+:func:`report` call.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait as wait_futures
+
+# NumPy, pandas, pyarrow and the database drivers release the GIL in their
+# heavy loops, so threads give real overlap without pickling frames.
+MAX_WORKERS = 4
+POLL_SECONDS = 0.1
+
+_pool = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="job")
+_local = threading.local()
+
+
+class Cancelled(Exception):
+    """Raised inside a job that was superseded by a newer one."""
+
+
+class Job:
+    def __init__(self, key, fn, args, kwargs):
+        self.key = key
+        self.progress = 0.0
+        self.message = ""
+        self._cancel = threading.Event()
+        self.future = _pool.submit(self._run, fn, args, kwargs)
+
+    def _run(self, fn, args, kwargs):
+        _local.job = self
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _local.job = None
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def cancel(self):
+        self._cancel.set()
+        self.future.cancel()
+
+    def done(self):
+        return self.future.done()
+
+    def failed(self):
+        return self.future.done() and not self.future.cancelled() and self.future.exception() is not None
+
+    def result(self):
+        return self.future.result()
+
+
+def report(fraction=None, message=None):
+    """Record progress of the calling job and stop it if it was cancelled.
+
+    ``fraction`` is in ``[0, 1]`` (``None`` leaves it unchanged). Does nothing
+    outside a job, so library code can call it unconditionally.
+    """
+    job = getattr(_local, "job", None)
+    if job is None:
+        return
+    if job.cancelled:
+        raise Cancelled()
+    if fraction is not None:
+        job.progress = min(max(float(fraction), 0.0), 1.0)
+    if message is not None:
+        job.message = message
+
+
+class JobRunner:
+    """The jobs of one session, one per slot; kept in session state."""
+
+    def __init__(self):
+        self.jobs = {}
+
+    def submit(self, slot, key, fn, *args, **kwargs):
+        """Run ``fn(*args, **kwargs)`` in ``slot``, reusing the slot's job if it has the same ``key``.
+
+        A job that raised is not reused: its error was shown once, and asking
+        again retries it.
+        """
+        job = self.jobs.get(slot)
+        if job is not None and job.key == key and not job.cancelled and not job.failed():
+            return job
+        if job is not None:
+            job.cancel()
+        job = self.jobs[slot] = Job(key, fn, args, kwargs)
+        return job
+
+    def cancel(self, slot):
+        job = self.jobs.pop(slot, None)
+        if job is not None:
+            job.cancel()
+
+
+def runner():
+    """The current session's :class:`JobRunner`."""
+    # Streamlit is imported here so compute modules can use report() without it
+    import streamlit as st
+    if "_jobs_" not in st.session_state:
+        st.session_state._jobs_ = JobRunner()
+    return st.session_state._jobs_
+
+
+def wait(job, label="Working...", where=None):
+    """Wait for ``job`` behind a progress bar (in ``where``, e.g. the sidebar) and return its result."""
+    import streamlit as st
+    if not job.done():
+        bar = (where or st).progress(0.0, text=label)
+        while not job.done():
+            wait_futures([job.future], timeout=POLL_SECONDS)
+            bar.progress(job.progress, text=job.message or label)
+        bar.empty()
+    return job.result()
+
+
+def run(slot, key, fn, *args, label="Working...", where=None, **kwargs):
+    """Submit ``fn`` to ``slot`` of this session's runner and wait for the result."""
+    return wait(runner().submit(slot, key, fn, *args, **kwargs), label, where)
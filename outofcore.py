@@ -0,0 +1,323 @@
+"""Out-of-core datasets for CSV files larger than memory.
+
+The CSV is streamed once, block by block, into a Parquet file under
+``SPOOL_DIR`` (one row group per ~``ROW_GROUP_ROWS`` rows), keyed by content
+fingerprint so every session reuses it; the least recently read files are
+removed to keep the directory under ``SPOOL_BUDGET_BYTES``. A
+:class:`Dataset` is a read-only handle on that file and never reads it whole:
+Head/Tail read the first/last row groups, column ranges come from the
+row-group statistics, and profiles, value counts, histograms and filters are
+streaming aggregations over row groups that decode only the columns they need.
+"""
+import hashlib
+import os
+import re
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+import jobs
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+    import pyarrow.dataset as pads
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+SPOOL_DIR = os.path.join(tempfile.gettempdir(), "eda_spool")
+# Spooled files are pruned, least recently used first, down to this size; files
+# read in the last SPOOL_IDLE_SECONDS are kept, as a session may still use them.
+SPOOL_BUDGET_BYTES = int(float(os.environ.get("EDA_SPOOL_BUDGET_MB", 20 * 1024)) * 1024 ** 2)
+SPOOL_IDLE_SECONDS = 15 * 60
+READ_BLOCK_BYTES = 64 * 1024 ** 2
+ROW_GROUP_ROWS = 1_000_000
+# Filter results are capped so a broad filter cannot pull the file back into memory.
+MAX_RESULT_ROWS = 100_000
+# Distinct values tracked per text column; beyond this only the most frequent
+# half is kept after each row group, so counts of rare values become approximate.
+MAX_TRACKED_VALUES = 1_000_000
+
+
+def path_fingerprint(path):
+    """Cheap fingerprint of a file on the server: its path, size and mtime."""
+    st = os.stat(path)
+    h = hashlib.blake2b(digest_size=16)
+    h.update(repr((os.path.realpath(path), st.st_size, st.st_mtime_ns)).encode())
+    return h.hexdigest()
+
+
+def merge_counts(total, counts):
+    """Add the value counts ``counts`` to ``total`` (either may be ``None``)."""
+    if total is None:
+        total = counts
+    elif counts is not None:
+        total = total.add(counts, fill_value=0)
+    if total is not None and len(total) > MAX_TRACKED_VALUES:
+        total = total.nlargest(MAX_TRACKED_VALUES // 2)
+    return total
+
+
+_CONVERSION_ERROR = re.compile(r"In CSV column #(\d+): .*invalid value '(.*)'", re.S)
+
+
+def _relaxed_type(schema, column_types, error):
+    """``(column, type)`` that gets past the conversion ``error``, or ``None``.
+
+    A number in a column inferred as integer (a later "1.5") relaxes the
+    column to float64; anything else relaxes it to text. Other columns keep
+    the types inferred from the first block.
+    """
+    match = _CONVERSION_ERROR.search(str(error))
+    if match is None:
+        return None
+    field = schema.field(int(match.group(1)))
+    current = column_types.get(field.name, field.type)
+    try:
+        float(match.group(2))
+        relaxed = pa.string() if pa.types.is_floating(current) else pa.float64()
+    except ValueError:
+        relaxed = pa.string()
+    if current == relaxed:
+        return None
+    return field.name, relaxed
+
+
+def _open(source):
+    if isinstance(source, (str, os.PathLike)):
+        return open(source, "rb")
+    source.seek(0)
+    return source
+
+
+def _inferred_schema(source):
+    f = _open(source)
+    try:
+        return pacsv.open_csv(f, read_options=pacsv.ReadOptions(block_size=READ_BLOCK_BYTES)).schema
+    finally:
+        if f is not source:
+            f.close()
+
+
+def _write_parquet(source, out_path, column_types, total_bytes):
+    f = _open(source)
+    try:
+        reader = pacsv.open_csv(f, read_options=pacsv.ReadOptions(block_size=READ_BLOCK_BYTES),
+                                convert_options=pacsv.ConvertOptions(column_types=column_types,
+                                                                     strings_can_be_null=True))
+        with pq.ParquetWriter(out_path, reader.schema) as writer:
+            pending, rows = [], 0
+            for batch in reader:
+                pending.append(batch)
+                rows += batch.num_rows
+                if rows >= ROW_GROUP_ROWS:
+                    writer.write_table(pa.Table.from_batches(pending), row_group_size=rows)
+                    pending, rows = [], 0
+                    jobs.report(f.tell() / total_bytes if total_bytes else None,
+                                f"Spooled {f.tell() / 1e6:,.0f} MB")
+            if pending:
+                writer.write_table(pa.Table.from_batches(pending), row_group_size=rows)
+    finally:
+        if f is not source:
+            f.close()
+
+
+def spool_csv(source, version):
+    """Stream ``source`` (a path or binary file) into Parquet once per ``version``.
+
+    The column types are inferred from the first block. If a later block
+    contradicts them, the failing column is relaxed (to float64, or to text)
+    and the file is spooled again.
+    """
+    if pa is None:
+        raise RuntimeError("Out-of-core mode needs pyarrow")
+    os.makedirs(SPOOL_DIR, exist_ok=True)
+    path = os.path.join(SPOOL_DIR, f"{version}.parquet")
+    if not os.path.exists(path):
+        if isinstance(source, (str, os.PathLike)):
+            total_bytes = os.path.getsize(source)
+        else:
+            total_bytes = len(source.getbuffer()) if hasattr(source, "getbuffer") else None
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        column_types, schema = {}, None
+        try:
+            while True:
+                try:
+                    _write_parquet(source, tmp, column_types, total_bytes)
+                    break
+                except pa.ArrowInvalid as e:
+                    schema = schema or _inferred_schema(source)
+                    relaxed = _relaxed_type(schema, column_types, e)
+                    if relaxed is None:
+                        raise
+                    column_types[relaxed[0]] = relaxed[1]
+            # Concurrent spools of the same file write their own tmp file; the last rename wins
+            os.replace(tmp, path)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        _prune(path)
+    else:
+        os.utime(path)
+    return Dataset(path)
+
+
+def _prune(keep):
+    # Drop the least recently read spools until the directory fits the budget
+    entries = []
+    for name in os.listdir(SPOOL_DIR):
+        path = os.path.join(SPOOL_DIR, name)
+        if path != keep and not name.endswith(".tmp"):
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+    total = sum(size for _, size, _ in entries) + os.path.getsize(keep)
+    in_use_after = time.time() - SPOOL_IDLE_SECONDS
+    for mtime, size, path in sorted(entries):
+        if total <= SPOOL_BUDGET_BYTES or mtime > in_use_after:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+
+
+class Dataset:
+    """Read-only, row-group-at-a-time access to a spooled Parquet file."""
+
+    def __init__(self, path):
+        self.path = path
+        self.metadata = pq.read_metadata(path)
+        self.schema = self.metadata.schema.to_arrow_schema()
+        self._empty = self.schema.empty_table().to_pandas()
+        self.columns = self._empty.columns
+        self.dtypes = self._empty.dtypes
+        self.num_row_groups = self.metadata.num_row_groups
+        self._offsets = np.cumsum([0] + [self.metadata.row_group(i).num_rows
+                                         for i in range(self.num_row_groups)])
+
+    def __len__(self):
+        return self.metadata.num_rows
+
+    @property
+    def shape(self):
+        return (len(self), len(self.columns))
+
+    @property
+    def disk_bytes(self):
+        return os.path.getsize(self.path)
+
+    def exists(self):
+        """False once the spooled file was pruned (see ``SPOOL_BUDGET_BYTES``)."""
+        return os.path.exists(self.path)
+
+    def _touch(self):
+        # Reads count as use, so the pruning keeps this file
+        try:
+            os.utime(self.path)
+        except OSError:
+            pass
+
+    def _file(self):
+        # A handle per call: ParquetFile is not meant to be shared between threads
+        self._touch()
+        return pq.ParquetFile(self.path)
+
+    def read_rows(self, start, stop, columns=None):
+        """Rows ``start:stop`` as an Arrow table, reading only the row groups that hold them."""
+        stop = min(stop, len(self))
+        if start >= stop:
+            return self.schema.empty_table() if columns is None else self.schema.empty_table().select(columns)
+        first = int(np.searchsorted(self._offsets, start, side="right")) - 1
+        last = int(np.searchsorted(self._offsets, stop, side="left")) - 1
+        table = self._file().read_row_groups(list(range(first, last + 1)), columns=columns)
+        return table.slice(int(start - self._offsets[first]), stop - start)
+
+    def head(self, n=5):
+        if n <= 0:
+            return self._empty
+        return self.read_rows(0, n).to_pandas()
+
+    def tail(self, n=5):
+        start = max(len(self) - n, 0)
+        frame = self.read_rows(start, len(self)).to_pandas()
+        frame.index = pd.RangeIndex(start, len(self))
+        return frame
+
+    def iter_frames(self, columns=None):
+        """Yield each row group as a DataFrame, reporting progress to the running job."""
+        f = self._file()
+        for i in range(self.num_row_groups):
+            jobs.report(i / self.num_row_groups, f"Reading row group {i + 1:,} of {self.num_row_groups:,}")
+            yield f.read_row_group(i, columns=columns).to_pandas()
+
+    def column_range(self, col):
+        """``(min, max)`` of a numeric column from the row-group statistics."""
+        j = self.schema.get_field_index(col)
+        low = high = None
+        for i in range(self.num_row_groups):
+            stats = self.metadata.row_group(i).column(j).statistics
+            if stats is None or not stats.has_min_max:
+                return self._scan_range(col)
+            low = stats.min if low is None else min(low, stats.min)
+            high = stats.max if high is None else max(high, stats.max)
+        return None if low is None else (low, high)
+
+    def _scan_range(self, col):
+        low = high = None
+        for frame in self.iter_frames([col]):
+            s = frame[col]
+            if s.notna().any():
+                low = s.min() if low is None else min(low, s.min())
+                high = s.max() if high is None else max(high, s.max())
+        return None if low is None else (low, high)
+
+    def value_counts(self, col):
+        """Counts of each distinct non-null value of ``col``, most frequent first."""
+        total = None
+        for frame in self.iter_frames([col]):
+            total = merge_counts(total, frame[col].value_counts(dropna=True))
+        if total is None:
+            return pd.Series(dtype=np.int64, name="count")
+        return total.astype(np.int64).sort_values(ascending=False, kind="stable").rename("count")
+
+    def filter(self, predicates, columns=None, limit=MAX_RESULT_ROWS):
+        """First ``limit`` rows matching ``predicates`` and the total number of matches.
+
+        ``predicates`` has the same form as in :func:`filters.filter_positions`.
+        They are pushed into the Parquet scan, which skips row groups whose
+        statistics rule them out.
+        """
+        self._touch()
+        dataset = pads.dataset(self.path, format="parquet")
+        expr = _expression(predicates)
+        columns = None if columns is None else list(columns)
+        total = dataset.count_rows(filter=expr)
+        return dataset.head(limit, columns=columns, filter=expr).to_pandas(), total
+
+    def scanner(self, predicates=None, columns=None):
+        """Arrow scanner over every row matching ``predicates``, for streaming them out in batches."""
+        self._touch()
+        return pads.dataset(self.path, format="parquet").scanner(
+            columns=None if columns is None else list(columns), filter=_expression(predicates or {}))
+
+
+def _expression(predicates):
+    expr = None
+    for col, val in predicates.items():
+        field = pads.field(col)
+        if isinstance(val, tuple):
+            cond = (field >= val[0]) & (field <= val[1])
+        else:
+            cond = field.isin([v for v in val if not pd.isna(v)])
+            if any(pd.isna(v) for v in val):
+                cond = cond | field.is_null()
+        expr = cond if expr is None else expr & cond
+    return expr
@@ -0,0 +1,197 @@
+"""Dataset profile behind the EDA buttons.
+
+All statistics the Head/Tail/Shape/Describe/Info/Missing Values buttons show
+are computed together, one pass per column, and cached by dataset version so
+repeated clicks (and other sessions on the same data) only read the result.
+Out-of-core datasets get the same profile from one streaming pass over their
+row groups, with quartiles from mergeable sketches.
+"""
+import numpy as np
+import pandas as pd
+
+import jobs
+import outofcore
+from cache import ByteLRUCache
+from ingest import is_text
+from stats import QuantileSketch
+
+PREVIEW_ROWS = 5
+CACHE_BUDGET_BYTES = 512 * 1024 ** 2
+
+_profiles = ByteLRUCache(CACHE_BUDGET_BYTES)
+
+_DESCRIBE_ROWS = ["count", "mean", "std", "min", "25%", "50%", "75%", "max"]
+
+
+def _is_numeric(s):
+    return pd.api.types.is_numeric_dtype(s.dtype) and not pd.api.types.is_bool_dtype(s.dtype)
+
+
+def _numeric_stats(s):
+    values = s.to_numpy(dtype=np.float64, na_value=np.nan)
+    valid = values[~np.isnan(values)]
+    if valid.size == 0:
+        return dict.fromkeys(_DESCRIBE_ROWS[1:], np.nan)
+    # One partition pass yields all three quartiles (and min/max for free)
+    q0, q1, q2, q3, q4 = np.percentile(valid, [0, 25, 50, 75, 100])
+    return {
+        "mean": valid.mean(),
+        "std": valid.std(ddof=1) if valid.size > 1 else np.nan,
+        "min": q0, "25%": q1, "50%": q2, "75%": q3, "max": q4,
+    }
+
+
+def preview(df):
+    """Shape, head and tail only; cheap for out-of-core datasets too."""
+    return {"shape": df.shape, "head": df.head(PREVIEW_ROWS), "tail": df.tail(PREVIEW_ROWS)}
+
+
+def _describe(columns, numeric, value_counts):
+    if numeric:
+        return pd.DataFrame(numeric, index=_DESCRIBE_ROWS)
+    if value_counts:
+        # Same fallback as DataFrame.describe(): summarize text columns
+        describe = columns.loc[list(value_counts), ["non_null", "unique", "top", "freq"]].T
+        describe.index = ["count", "unique", "top", "freq"]
+        return describe
+    return pd.DataFrame()
+
+
+def compute_profile(df):
+    """Compute every EDA statistic for ``df`` in a single pass over its columns."""
+    n = len(df)
+    memory = df.memory_usage(deep=True, index=False)
+    rows = []
+    numeric = {}
+    value_counts = {}
+    for i, col in enumerate(df.columns):
+        jobs.report(i / max(len(df.columns), 1), f"Profiling {col}...")
+        s = df[col]
+        nulls = int(s.isna().sum())
+        row = {"column": col, "dtype": str(s.dtype), "non_null": n - nulls,
+               "nulls": nulls, "memory": int(memory[col])}
+        if _is_numeric(s):
+            stats = _numeric_stats(s)
+            numeric[col] = {"count": float(n - nulls), **stats}
+            row["unique"] = int(s.nunique())
+            row.update(stats)
+        elif is_text(s):
+            counts = s.value_counts(dropna=True)
+            value_counts[col] = counts
+            row["unique"] = len(counts)
+            if len(counts):
+                row["top"], row["freq"] = counts.index[0], int(counts.iloc[0])
+        else:
+            row["unique"] = int(s.nunique())
+        rows.append(row)
+
+    columns = pd.DataFrame(rows).set_index("column") if rows else pd.DataFrame()
+    return {
+        **preview(df),
+        "columns": columns,
+        "describe": _describe(columns, numeric, value_counts),
+        "missing": columns["nulls"] if rows else pd.Series(dtype=np.int64),
+        "value_counts": value_counts,
+        "memory": int(memory.sum() + df.index.memory_usage()),
+    }
+
+
+class _Moments:
+    """Count, mean and sum of squared deviations, merged chunk by chunk (Chan et al.)."""
+
+    def __init__(self):
+        self.n, self.mean, self.m2 = 0, 0.0, 0.0
+
+    def add(self, values):
+        n = values.size
+        if n == 0:
+            return
+        mean = values.mean()
+        m2 = ((values - mean) ** 2).sum()
+        delta = mean - self.mean
+        total = self.n + n
+        self.m2 += m2 + delta * delta * self.n * n / total
+        self.mean += delta * n / total
+        self.n = total
+
+
+def compute_dataset_profile(ds):
+    """Profile of an out-of-core dataset from one streaming pass over its row groups.
+
+    Means and standard deviations are exact, quartiles come from merged
+    :class:`stats.QuantileSketch` summaries and numeric columns report no
+    distinct count. Memory is the decoded (in-memory) size of the data.
+    """
+    empty = ds.head(0)
+    numeric_cols = [c for c in ds.columns if _is_numeric(empty[c])]
+    text_cols = [c for c in ds.columns if c not in numeric_cols and is_text(empty[c])]
+    nulls = dict.fromkeys(ds.columns, 0)
+    memory = dict.fromkeys(ds.columns, 0)
+    moments = {c: _Moments() for c in numeric_cols}
+    sketches = {c: QuantileSketch() for c in numeric_cols}
+    counts = dict.fromkeys(text_cols)
+    for frame in ds.iter_frames():
+        usage = frame.memory_usage(deep=True, index=False)
+        for col in ds.columns:
+            s = frame[col]
+            nulls[col] += int(s.isna().sum())
+            memory[col] += int(usage[col])
+            if col in moments:
+                values = s.to_numpy(dtype=np.float64, na_value=np.nan)
+                values = values[~np.isnan(values)]
+                moments[col].add(values)
+                sketches[col].add(values)
+            elif col in counts:
+                counts[col] = outofcore.merge_counts(counts[col], s.value_counts(dropna=True))
+
+    n = len(ds)
+    rows = []
+    numeric = {}
+    value_counts = {}
+    for col in ds.columns:
+        row = {"column": col, "dtype": str(ds.dtypes[col]), "non_null": n - nulls[col],
+               "nulls": nulls[col], "memory": memory[col]}
+        if col in moments:
+            m, sk = moments[col], sketches[col]
+            col_stats = {"mean": m.mean if m.n else np.nan,
+                         "std": np.sqrt(m.m2 / (m.n - 1)) if m.n > 1 else np.nan,
+                         "min": sk.quantile(0), "25%": sk.quantile(0.25), "50%": sk.quantile(0.5),
+                         "75%": sk.quantile(0.75), "max": sk.quantile(1)}
+            numeric[col] = {"count": float(m.n), **col_stats}
+            row.update(col_stats)
+        elif col in counts:
+            vc = counts[col] if counts[col] is not None else pd.Series(dtype=np.int64)
+            vc = vc.astype(np.int64).sort_values(ascending=False, kind="stable")
+            value_counts[col] = vc
+            row["unique"] = len(vc)
+            if len(vc):
+                row["top"], row["freq"] = vc.index[0], int(vc.iloc[0])
+        rows.append(row)
+
+    columns = pd.DataFrame(rows).set_index("column") if rows else pd.DataFrame()
+    return {
+        **preview(ds),
+        "columns": columns,
+        "describe": _describe(columns, numeric, value_counts),
+        "missing": columns["nulls"] if rows else pd.Series(dtype=np.int64),
+        "value_counts": value_counts,
+        "memory": sum(memory.values()),
+    }
+
+
+def get_profile(df, version):
+    """Return the cached profile for dataset ``version``, computing it on a miss."""
+    compute = compute_dataset_profile if isinstance(df, outofcore.Dataset) else compute_profile
+    if version is None:
+        return compute(df)
+    profile = _profiles.get(version)
+    if profile is None:
+        profile = _profiles.put(version, compute(df))
+    return profile
+
+
+def info_table(profile):
+    """Per-column table shown by the Info button (the df.info() fields)."""
+    table = profile["columns"][["non_null", "dtype", "memory"]].copy()
+    table.columns = ["Non-Null Count", "Dtype", "Memory (bytes)"]
+    return table
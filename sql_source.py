@@ -0,0 +1,523 @@
+"""SQL Server access: pooled connections and streaming table/query loading.
+
+Opening a SQL Server connection costs a TCP/TLS handshake and a login on every
+call. Connections are kept in a pool shared by all sessions, checked with a
+cheap ping on checkout, closed after sitting idle and replaced transparently
+when they have gone bad.
+
+Connection strings of the form ``sqlite:///path/to.db`` open a local SQLite
+database instead, which stands in for SQL Server when no ODBC driver is around.
+"""
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+import jobs
+
+SQLITE_PREFIX = "sqlite:///"
+ODBC_DRIVER = "ODBC Driver 17 for SQL Server"
+
+POOL_SIZE = 8
+IDLE_TIMEOUT = 300  # seconds
+CHECKOUT_TIMEOUT = 30  # seconds
+FETCH_BATCH = 50_000
+PAGE_SIZE = 1000
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def build_conn_str(server, username=None, password=None):
+    """Build an ODBC connection string, or pass a ``sqlite:///`` URL through."""
+    if server.startswith(SQLITE_PREFIX):
+        return server
+    if username:
+        return (
+            f"DRIVER={{{ODBC_DRIVER}}};"
+            f"SERVER={server};"
+            f"UID={username};"
+            f"PWD={password};"
+        )
+    return (
+        f"DRIVER={{{ODBC_DRIVER}}};"
+        f"SERVER={server};"
+        f"Trusted_Connection=yes;"
+    )
+
+
+def dialect(conn_str):
+    return "sqlite" if conn_str.startswith(SQLITE_PREFIX) else "mssql"
+
+
+def connect(conn_str):
+    """Open a new DB-API connection for ``conn_str``."""
+    if dialect(conn_str) == "sqlite":
+        return sqlite3.connect(conn_str[len(SQLITE_PREFIX):], check_same_thread=False)
+    import pyodbc
+    return pyodbc.connect(conn_str)
+
+
+def _ping(conn):
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT 1")
+        cur.fetchall()
+    finally:
+        cur.close()
+
+
+def _close_quietly(conn):
+    try:
+        conn.close()
+    except Exception:
+        pass
+
+
+class ConnectionPool:
+    """A bounded pool of DB-API connections created by ``factory``.
+
+    Idle connections are stored with the time they were returned. On checkout
+    the most recently used one is pinged; if the ping fails it is closed and
+    the next one (or a brand-new connection) is tried instead.
+    """
+
+    def __init__(self, factory, max_size=POOL_SIZE, idle_timeout=IDLE_TIMEOUT,
+                 ping=_ping, checkout_timeout=CHECKOUT_TIMEOUT):
+        self._factory = factory
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.checkout_timeout = checkout_timeout
+        self._ping = ping
+        self._idle = []  # (conn, returned_at), most recently used last
+        self._in_use = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+    @property
+    def size(self):
+        return len(self._idle) + self._in_use
+
+    def evict_idle(self, now=None):
+        """Close connections that have been idle longer than ``idle_timeout``."""
+        now = time.monotonic() if now is None else now
+        with self._cond:
+            stale = [c for c, t in self._idle if now - t > self.idle_timeout]
+            self._idle = [(c, t) for c, t in self._idle if now - t <= self.idle_timeout]
+        for conn in stale:
+            _close_quietly(conn)
+
+    def acquire(self):
+        self.evict_idle()
+        deadline = time.monotonic() + self.checkout_timeout
+        with self._cond:
+            while not self._idle and self._in_use >= self.max_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError("No free database connection in the pool")
+                self._cond.wait(remaining)
+            self._in_use += 1
+            candidates = [c for c, _ in reversed(self._idle)]
+            self._idle = []
+        try:
+            conn = self._checkout(candidates)
+        except Exception:
+            with self._cond:
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+        return conn
+
+    def _checkout(self, candidates):
+        # Keep the first healthy connection; hand the untested rest back.
+        for i, conn in enumerate(candidates):
+            try:
+                self._ping(conn)
+            except Exception:
+                _close_quietly(conn)
+                continue
+            rest = candidates[i + 1:]
+            if rest:
+                now = time.monotonic()
+                with self._cond:
+                    self._idle[:0] = [(c, now) for c in reversed(rest)]
+                    self._cond.notify(len(rest))
+            return conn
+        return self._factory()
+
+    def release(self, conn, broken=False):
+        with self._cond:
+            self._in_use -= 1
+            # A closed pool is no longer shared, so nothing would reuse or evict the connection
+            keep = not broken and not self._closed
+            if keep:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+        if not keep:
+            _close_quietly(conn)
+
+    @contextmanager
+    def connection(self):
+        """Check a connection out for the duration of a ``with`` block.
+
+        A connection left by an error (or an interrupted rerun) is discarded
+        instead of going back into the pool.
+        """
+        conn = self.acquire()
+        broken = True
+        try:
+            yield conn
+            broken = False
+        finally:
+            self.release(conn, broken=broken)
+
+    def close(self):
+        """Close the idle connections; ones in use are closed when released."""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for conn, _ in idle:
+            _close_quietly(conn)
+
+
+def sweep_pools(now=None):
+    """Close idle connections in every pool and drop the pools left empty.
+
+    Pools are only swept on their own checkouts otherwise, so a connection
+    string nobody uses any more (after "Disconnect", or a closed session)
+    would keep its connections open on the server.
+    """
+    with _pools_lock:
+        pools = list(_pools.items())
+    for conn_str, pool in pools:
+        pool.evict_idle(now)
+        with _pools_lock, pool._cond:
+            if pool.size == 0 and _pools.get(conn_str) is pool:
+                del _pools[conn_str]
+                pool._closed = True
+
+
+def _sweep_forever():
+    while True:
+        time.sleep(IDLE_TIMEOUT)
+        sweep_pools()
+
+
+_sweeper = None
+
+
+def get_pool(conn_str, factory=None):
+    """Return the shared pool for ``conn_str``, creating it on first use."""
+    global _sweeper
+    with _pools_lock:
+        if _sweeper is None:
+            _sweeper = threading.Thread(target=_sweep_forever, name="pool-sweeper", daemon=True)
+            _sweeper.start()
+        pool = _pools.get(conn_str)
+        if pool is None:
+            pool = ConnectionPool(factory or (lambda: connect(conn_str)))
+            _pools[conn_str] = pool
+        return pool
+
+
+def list_databases(conn, dialect_name="mssql"):
+    cur = conn.cursor()
+    try:
+        if dialect_name == "sqlite":
+            cur.execute("PRAGMA database_list")
+            return [row[1] for row in cur.fetchall()]
+        cur.execute("SELECT name FROM sys.databases")
+        return [row[0] for row in cur.fetchall()]
+    finally:
+        cur.close()
+
+
+def quote_ident(name, dialect_name="mssql"):
+    if dialect_name == "sqlite":
+        return '"' + str(name).replace('"', '""') + '"'
+    return "[" + str(name).replace("]", "]]") + "]"
+
+
+def list_tables(conn, database, dialect_name="mssql"):
+    """Return ``(schema, table)`` pairs for the base tables and views in ``database``."""
+    cur = conn.cursor()
+    try:
+        if dialect_name == "sqlite":
+            cur.execute(
+                f"SELECT name FROM {quote_ident(database, dialect_name)}.sqlite_master "
+                "WHERE type IN ('table', 'view') AND name NOT LIKE 'sqlite_%' ORDER BY name"
+            )
+            return [(database, row[0]) for row in cur.fetchall()]
+        cur.execute(
+            f"SELECT TABLE_SCHEMA, TABLE_NAME FROM {quote_ident(database)}.INFORMATION_SCHEMA.TABLES "
+            "ORDER BY TABLE_SCHEMA, TABLE_NAME"
+        )
+        return [(row[0], row[1]) for row in cur.fetchall()]
+    finally:
+        cur.close()
+
+
+def primary_key(conn, database, schema, table, dialect_name="mssql"):
+    """Primary key columns of a table in key order (empty for views and heaps)."""
+    cur = conn.cursor()
+    try:
+        if dialect_name == "sqlite":
+            cur.execute("SELECT name FROM pragma_table_info(?, ?) WHERE pk > 0 ORDER BY pk", (table, schema))
+        else:
+            db = quote_ident(database)
+            cur.execute(
+                f"SELECT k.COLUMN_NAME FROM {db}.INFORMATION_SCHEMA.TABLE_CONSTRAINTS c "
+                f"JOIN {db}.INFORMATION_SCHEMA.KEY_COLUMN_USAGE k ON k.CONSTRAINT_NAME = c.CONSTRAINT_NAME "
+                "AND k.TABLE_SCHEMA = c.TABLE_SCHEMA AND k.TABLE_NAME = c.TABLE_NAME "
+                "WHERE c.CONSTRAINT_TYPE = 'PRIMARY KEY' AND c.TABLE_SCHEMA = ? AND c.TABLE_NAME = ? "
+                "ORDER BY k.ORDINAL_POSITION",
+                (schema, table),
+            )
+        return [row[0] for row in cur.fetchall()]
+    finally:
+        cur.close()
+
+
+def table_ref(database, schema, table, dialect_name="mssql"):
+    """Fully qualified table name; SQL Server uses three-part names so pooled
+    connections never need a ``USE`` that would leak to other sessions."""
+    parts = [schema, table] if dialect_name == "sqlite" else [database, schema, table]
+    return ".".join(quote_ident(p, dialect_name) for p in parts)
+
+
+def query_ref(query):
+    """Wrap a user query so it can be used wherever a table reference is."""
+    return f"({query.strip().rstrip(';')}) AS q"
+
+
+def _to_arrow_column(chunks):
+    types = {c.type for c in chunks if not pa.types.is_null(c.type)}
+    if not types:
+        target = pa.null()
+    elif len(types) == 1:
+        target = types.pop()
+    elif all(pa.types.is_integer(t) or pa.types.is_floating(t) or pa.types.is_decimal(t) for t in types):
+        target = pa.float64()
+    else:
+        target = pa.large_string()
+    if pa.types.is_decimal(target):
+        target = pa.float64()
+    return pa.chunked_array([c.cast(target) for c in chunks], type=target)
+
+
+def _batch_array(values):
+    """Arrow array of one fetched batch of a column.
+
+    SQLite columns and SQL Server ``sql_variant`` can hold several Python
+    types in one batch, which Arrow cannot put in one array; such a batch is
+    kept as text (``_to_arrow_column`` then makes the whole column text).
+    """
+    try:
+        return pa.array(values, from_pandas=True)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        return pa.array([None if v is None or v != v else str(v) for v in values], pa.large_string())
+
+
+def _to_numpy_column(chunks):
+    values = np.concatenate(chunks) if chunks else np.empty(0, dtype=object)
+    s = pd.Series(values, dtype=object).infer_objects()
+    if s.dtype == object:
+        numeric = pd.to_numeric(s, errors="coerce")
+        if numeric.notna().sum() == s.notna().sum():
+            return numeric
+    return s
+
+
+def fetch_frame(cursor, batch_size=FETCH_BATCH, max_rows=None):
+    """Stream the pending result set of ``cursor`` into a DataFrame.
+
+    Rows are pulled ``batch_size`` at a time and each batch is immediately
+    split into per-column buffers (Arrow arrays when pyarrow is installed,
+    NumPy object arrays otherwise), so only one batch of row tuples is ever
+    alive at once.
+    """
+    names = [d[0] for d in cursor.description]
+    columns = [[] for _ in names]
+    fetched = 0
+    while max_rows is None or fetched < max_rows:
+        n = batch_size if max_rows is None else min(batch_size, max_rows - fetched)
+        rows = cursor.fetchmany(n)
+        if not rows:
+            break
+        fetched += len(rows)
+        jobs.report(None if max_rows is None else fetched / max_rows, f"Fetched {fetched:,} rows")
+        for i, values in enumerate(zip(*rows)):
+            if pa is not None:
+                columns[i].append(_batch_array(values))
+            else:
+                columns[i].append(np.array(values, dtype=object))
+        del rows
+
+    if pa is not None:
+        table = pa.table([_to_arrow_column(c) if c else pa.array([], pa.null()) for c in columns], names=names)
+        return table.to_pandas(split_blocks=True, self_destruct=True)
+    return pd.DataFrame({name: _to_numpy_column(c) for name, c in zip(names, columns)})
+
+
+def read_query(conn, query, params=(), batch_size=FETCH_BATCH, max_rows=None):
+    cur = conn.cursor()
+    try:
+        cur.arraysize = batch_size
+        cur.execute(query, params)
+        return fetch_frame(cur, batch_size=batch_size, max_rows=max_rows)
+    finally:
+        cur.close()
+
+
+def load_table(conn, ref, batch_size=FETCH_BATCH, max_rows=None):
+    """Stream every row of ``ref`` (a table or :func:`query_ref`) into a DataFrame."""
+    return read_query(conn, f"SELECT * FROM {ref}", batch_size=batch_size, max_rows=max_rows)
+
+
+def page_query(ref, dialect_name="mssql", order_by=()):
+    """SQL for one page of ``ref``; parameters are ``(offset, page_size)``.
+
+    Pages are only stable when ``order_by`` (a column or list of columns) is
+    unique, e.g. the primary key: SQL Server does not promise the same row
+    order to two OFFSET queries otherwise.
+    """
+    if isinstance(order_by, str):
+        order_by = [order_by]
+    order = ", ".join(quote_ident(c, dialect_name) for c in order_by or ())
+    if dialect_name == "sqlite":
+        order = f" ORDER BY {order}" if order else ""
+        return f"SELECT * FROM {ref}{order} LIMIT ? OFFSET ?", True
+    return f"SELECT * FROM {ref} ORDER BY {order or '(SELECT NULL)'} OFFSET ? ROWS FETCH NEXT ? ROWS ONLY", False
+
+
+def read_page(conn, ref, page, page_size=PAGE_SIZE, dialect_name="mssql", order_by=()):
+    """Fetch page ``page`` (0-based) of ``ref`` without reading the rows before it."""
+    query, limit_first = page_query(ref, dialect_name, order_by)
+    offset = int(page) * int(page_size)
+    params = (int(page_size), offset) if limit_first else (offset, int(page_size))
+    return read_query(conn, query, params, batch_size=int(page_size))
+
+
+# --- Filter push-down -------------------------------------------------------
+# The Custom filter is compiled into a parameterized WHERE clause so only the
+# matching rows are sent back. The same builder serves SQL Server and the
+# SQLite stand-in; only TOP/LIMIT placement differs.
+
+DISTINCT_LIMIT = 1000
+SAMPLE_ROWS = 1000
+
+
+def limit_query(select_list, ref, dialect_name="mssql", where="", limit=None, distinct=False):
+    """Build ``SELECT [DISTINCT] [TOP n] ... FROM ref [WHERE ...] [LIMIT n]``.
+
+    Returns ``(sql, params)``; ``limit`` is passed as a parameter.
+    """
+    head = "SELECT DISTINCT" if distinct else "SELECT"
+    where_sql = f" WHERE {where}" if where else ""
+    if limit is None:
+        return f"{head} {select_list} FROM {ref}{where_sql}", []
+    if dialect_name == "sqlite":
+        return f"{head} {select_list} FROM {ref}{where_sql} LIMIT ?", [int(limit)]
+    return f"{head} TOP (?) {select_list} FROM {ref}{where_sql}", [int(limit)]
+
+
+def build_where(filters, dialect_name="mssql"):
+    """Compile ``{column: [values]}`` / ``{column: (low, high)}`` into SQL.
+
+    Lists become ``IN (?, ...)`` and tuples become ``BETWEEN ? AND ?``;
+    an empty list matches nothing. Returns ``(clause, params)``.
+    """
+    clauses, params = [], []
+    for col, val in filters.items():
+        ident = quote_ident(col, dialect_name)
+        if isinstance(val, tuple):
+            clauses.append(f"{ident} BETWEEN ? AND ?")
+            params.extend([val[0], val[1]])
+        elif len(val) == 0:
+            clauses.append("1 = 0")
+        else:
+            clauses.append(f"{ident} IN ({', '.join('?' * len(val))})")
+            params.extend(val)
+    return " AND ".join(clauses), params
+
+
+def sample_frame(conn, ref, dialect_name="mssql", rows=SAMPLE_ROWS):
+    """A few rows of ``ref``, used to learn column names and dtypes."""
+    sql, params = limit_query("*", ref, dialect_name, limit=rows)
+    return read_query(conn, sql, params, batch_size=rows)
+
+
+def like_pattern(text, dialect_name="mssql"):
+    """``LIKE`` pattern (escape character ``\\``) matching values that contain ``text``."""
+    specials = "\\%_[" if dialect_name == "mssql" else "\\%_"
+    return "%" + "".join("\\" + ch if ch in specials else ch for ch in text) + "%"
+
+
+def distinct_values(conn, ref, column, dialect_name="mssql", limit=DISTINCT_LIMIT, search=None):
+    """Up to ``limit`` distinct non-null values of ``column``, optionally only those containing ``search``."""
+    ident = quote_ident(column, dialect_name)
+    where, params = f"{ident} IS NOT NULL", []
+    if search:
+        where += f" AND {ident} LIKE ? ESCAPE '\\'"
+        params.append(like_pattern(search, dialect_name))
+    sql, limit_params = limit_query(ident, ref, dialect_name, where=where, limit=limit, distinct=True)
+    params = params + limit_params if dialect_name == "sqlite" else limit_params + params
+    cur = conn.cursor()
+    try:
+        cur.execute(sql, params)
+        return [row[0] for row in cur.fetchall()]
+    finally:
+        cur.close()
+
+
+def column_bounds(conn, ref, columns, dialect_name="mssql"):
+    """``{column: (min, max)}`` for all ``columns`` in one aggregate query."""
+    if not columns:
+        return {}
+    aggs = []
+    for col in columns:
+        ident = quote_ident(col, dialect_name)
+        aggs.append(f"MIN({ident}), MAX({ident})")
+    cur = conn.cursor()
+    try:
+        cur.execute(f"SELECT {', '.join(aggs)} FROM {ref}")
+        row = cur.fetchone()
+    finally:
+        cur.close()
+    return {col: (row[2 * i], row[2 * i + 1]) for i, col in enumerate(columns)}
+
+
+def filtered_query(ref, columns, filters, dialect_name="mssql", limit=None):
+    select_list = ", ".join(quote_ident(c, dialect_name) for c in columns) or "*"
+    where, params = build_where(filters, dialect_name)
+    sql, limit_params = limit_query(select_list, ref, dialect_name, where=where, limit=limit)
+    # TOP's parameter precedes the WHERE parameters; LIMIT's follows them.
+    if dialect_name == "sqlite":
+        return sql, params + limit_params
+    return sql, limit_params + params
+
+
+def count_filtered(conn, ref, filters, dialect_name="mssql"):
+    where, params = build_where(filters, dialect_name)
+    count = "COUNT(*)" if dialect_name == "sqlite" else "COUNT_BIG(*)"
+    where_sql = f" WHERE {where}" if where else ""
+    cur = conn.cursor()
+    try:
+        cur.execute(f"SELECT {count} FROM {ref}{where_sql}", params)
+        return int(cur.fetchone()[0])
+    finally:
+        cur.close()
+
+
+def read_filtered(conn, ref, columns, filters, dialect_name="mssql", limit=None):
+    """Run the pushed-down filter and stream back only the matching rows."""
+    sql, params = filtered_query(ref, columns, filters, dialect_name, limit)
+    return read_query(conn, sql, params)
@@ -0,0 +1,321 @@
+"""Cached numeric statistics for the charts.
+
+Results are cached per dataset version (see ``data_version`` in ``app.py``)
+so charts that are redrawn on every interaction do not recompute them.
+"""
+import numpy as np
+import pandas as pd
+
+import jobs
+import outofcore
+from cache import ByteLRUCache
+
+CACHE_BUDGET_BYTES = 256 * 1024 ** 2
+# Rows per block when accumulating correlation sums.
+CORR_BLOCK_ROWS = 262_144
+
+_results = ByteLRUCache(CACHE_BUDGET_BYTES)
+
+
+def _cached(key, compute):
+    if key[0] is None:
+        return compute()
+    value = _results.get(key)
+    if value is None:
+        value = _results.put(key, compute())
+    return value
+
+
+def _pairwise_corr(df, columns, block_rows=CORR_BLOCK_ROWS):
+    """Pearson correlation with pairwise-complete rows, like ``DataFrame.corr``.
+
+    Columns are centered on their means (which keeps float32 sums accurate)
+    and the five sum matrices the pairwise formula needs are accumulated
+    block by block with float32 matrix products into float64 totals, so a
+    wide frame is never copied whole.
+    """
+    k = len(columns)
+    means = np.array([df[c].mean() for c in columns], dtype=np.float64)
+    n_sum = np.zeros((k, k))
+    sx = np.zeros((k, k))
+    sxx = np.zeros((k, k))
+    sxy = np.zeros((k, k))
+    for start in range(0, len(df), block_rows):
+        jobs.report(start / len(df), "Correlating columns...")
+        block = np.empty((min(block_rows, len(df) - start), k), dtype=np.float32)
+        for j, col in enumerate(columns):
+            values = df[col].iloc[start:start + block_rows].to_numpy(dtype=np.float64, na_value=np.nan)
+            block[:, j] = values - means[j]
+        valid = ~np.isnan(block)
+        if not valid.all():
+            block[~valid] = 0.0
+            m = valid.astype(np.float32)
+            n_sum += m.T @ m
+            sx += block.T @ m
+            sxx += (block * block).T @ m
+        else:
+            # Complete block: the per-pair sums reduce to column sums
+            n_sum += len(block)
+            sx += block.sum(axis=0)[:, None]
+            sxx += (block * block).sum(axis=0)[:, None]
+        sxy += block.T @ block
+    sy, syy = sx.T, sxx.T
+    with np.errstate(invalid="ignore", divide="ignore"):
+        r = (n_sum * sxy - sx * sy) / np.sqrt((n_sum * sxx - sx * sx) * (n_sum * syy - sy * sy))
+    r = np.clip(r, -1.0, 1.0)
+    np.fill_diagonal(r, np.where(np.diag(n_sum) > 1, 1.0, np.nan))
+    return pd.DataFrame(r, index=columns, columns=columns)
+
+
+def correlation_matrix(df, columns=None, version=None):
+    """Correlation matrix of the numeric ``columns``, cached per dataset version."""
+    if columns is None:
+        columns = [c for c in df.columns
+                   if pd.api.types.is_numeric_dtype(df[c]) and not pd.api.types.is_bool_dtype(df[c])]
+    columns = list(columns)
+    return _cached((version, "corr", tuple(columns)), lambda: _pairwise_corr(df, columns))
+
+
+def strongest_pairs(corr, k=20):
+    """The ``k`` column pairs with the largest absolute correlation."""
+    values = corr.to_numpy()
+    i, j = np.triu_indices(len(values), k=1)
+    r = values[i, j]
+    keep = ~np.isnan(r)
+    i, j, r = i[keep], j[keep], r[keep]
+    top = np.argsort(-np.abs(r), kind="stable")[:k]
+    return pd.DataFrame({
+        "column 1": corr.index[i[top]],
+        "column 2": corr.columns[j[top]],
+        "correlation": r[top],
+    })
+
+
+def clustered_subset(corr, max_columns=20):
+    """Columns from the strongest pairs, ordered so correlated columns sit together.
+
+    Columns are picked from the strongest pairs until ``max_columns`` are
+    chosen, then ordered by the leading eigenvector of the absolute
+    correlation matrix (a spectral seriation), which groups related columns
+    into blocks along the diagonal.
+    """
+    chosen = []
+    for _, row in strongest_pairs(corr, k=len(corr) ** 2).iterrows():
+        for col in (row["column 1"], row["column 2"]):
+            if col not in chosen and len(chosen) < max_columns:
+                chosen.append(col)
+        if len(chosen) >= max_columns:
+            break
+    if len(chosen) < 2:
+        return corr
+    sub = corr.loc[chosen, chosen]
+    _, vectors = np.linalg.eigh(np.nan_to_num(np.abs(sub.to_numpy())))
+    order = np.argsort(vectors[:, -1])
+    ordered = [chosen[o] for o in order]
+    return sub.loc[ordered, ordered]
+
+
+# --- Quantiles and histograms ------------------------------------------------
+# Frames longer than this (and out-of-core datasets) use mergeable quantile
+# sketches built chunk by chunk instead of exact quantiles over a full float64
+# copy of the columns.
+SKETCH_MIN_ROWS = 10_000_000
+SKETCH_CHUNK_ROWS = 1_000_000
+SKETCH_ACCURACY = 0.005
+# At most this many outliers per column are drawn by the box plot.
+MAX_FLIERS = 1000
+
+QUANTILES = [0.0, 0.25, 0.5, 0.75, 1.0]
+
+
+class QuantileSketch:
+    """Relative-error quantile sketch (DDSketch-style log buckets).
+
+    Values go into buckets whose bounds grow geometrically, so any quantile
+    is returned within ``relative_accuracy`` of a true value. Adding is fully
+    vectorized and two sketches merge by adding bucket counts, which lets
+    chunks (or row groups) be summarized independently.
+    """
+
+    _MIN_MAGNITUDE = 1e-12
+
+    def __init__(self, relative_accuracy=SKETCH_ACCURACY):
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = np.log(self.gamma)
+        self.positive = {}
+        self.negative = {}
+        self.zero = 0
+        self.count = 0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def _bucket(self, store, magnitudes):
+        keys, counts = np.unique(np.ceil(np.log(magnitudes) / self._log_gamma).astype(np.int64),
+                                 return_counts=True)
+        for key, count in zip(keys.tolist(), counts.tolist()):
+            store[key] = store.get(key, 0) + count
+
+    def add(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if values.size == 0:
+            return self
+        self.count += values.size
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+        small = np.abs(values) < self._MIN_MAGNITUDE
+        self.zero += int(small.sum())
+        self._bucket(self.positive, values[(values > 0) & ~small])
+        self._bucket(self.negative, -values[(values < 0) & ~small])
+        return self
+
+    def merge(self, other):
+        for store, other_store in ((self.positive, other.positive), (self.negative, other.negative)):
+            for key, count in other_store.items():
+                store[key] = store.get(key, 0) + count
+        self.zero += other.zero
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def _value(self, key):
+        return 2 * self.gamma ** key / (self.gamma + 1)
+
+    def quantile(self, q):
+        if self.count == 0:
+            return np.nan
+        if q <= 0:
+            return self.min
+        if q >= 1:
+            return self.max
+        rank = q * (self.count - 1)
+        seen = 0
+        for key in sorted(self.negative, reverse=True):
+            seen += self.negative[key]
+            if seen > rank:
+                return max(-self._value(key), self.min)
+        seen += self.zero
+        if seen > rank:
+            return 0.0
+        for key in sorted(self.positive):
+            seen += self.positive[key]
+            if seen > rank:
+                return min(self._value(key), self.max)
+        return self.max
+
+
+def _column_values(df, col):
+    return df[col].to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+def _chunks(df, col, chunk_rows=SKETCH_CHUNK_ROWS):
+    """``col`` as float64 arrays: row slices of a frame, row groups of an out-of-core dataset."""
+    if isinstance(df, outofcore.Dataset):
+        for frame in df.iter_frames([col]):
+            yield _column_values(frame, col)
+        return
+    for start in range(0, len(df), chunk_rows):
+        jobs.report(start / len(df), f"Reading {col}...")
+        yield df[col].iloc[start:start + chunk_rows].to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+def _sketched(df):
+    return isinstance(df, outofcore.Dataset) or len(df) > SKETCH_MIN_ROWS
+
+
+def sketch_column(df, col, chunk_rows=SKETCH_CHUNK_ROWS):
+    """Build a :class:`QuantileSketch` of ``col`` one chunk at a time."""
+    sketch = QuantileSketch()
+    for values in _chunks(df, col, chunk_rows):
+        sketch.add(values)
+    return sketch
+
+
+def _exact_quantiles(df, columns):
+    # One nanquantile call over a 2D block covers every selected column
+    block = np.column_stack([_column_values(df, c) for c in columns])
+    return pd.DataFrame(np.nanquantile(block, QUANTILES, axis=0), index=QUANTILES, columns=columns), block
+
+
+def quantiles(df, columns, version=None):
+    """Min, quartiles and max of ``columns`` as a frame indexed by ``QUANTILES``.
+
+    Exact for frames up to ``SKETCH_MIN_ROWS`` rows, sketched beyond that.
+    """
+    columns = list(columns)
+
+    def compute():
+        if not _sketched(df):
+            return _exact_quantiles(df, columns)[0]
+        sketches = [sketch_column(df, c) for c in columns]
+        return pd.DataFrame([[s.quantile(q) for s in sketches] for q in QUANTILES],
+                            index=QUANTILES, columns=columns)
+    return _cached((version, "quantiles", tuple(columns)), compute)
+
+
+def _fliers(values, low, high):
+    out = values[(values < low) | (values > high)]
+    if out.size <= MAX_FLIERS:
+        return out
+    # Keep the most extreme ones on each side
+    half = MAX_FLIERS // 2
+    out = np.partition(out, (half, out.size - half - 1))
+    return np.concatenate([out[:half], out[-half:]])
+
+
+def box_stats(df, columns, version=None):
+    """Per-column stats in the form ``Axes.bxp`` draws, plus the raw quartiles.
+
+    Whiskers follow matplotlib's 1.5 x IQR rule. Sketched frames clamp the
+    whiskers to min/max and draw only the extremes as fliers.
+    """
+    columns = list(columns)
+
+    def compute():
+        if not _sketched(df):
+            q, block = _exact_quantiles(df, columns)
+        else:
+            q, block = quantiles(df, columns, version), None
+        result = []
+        for j, col in enumerate(columns):
+            vmin, q1, med, q3, vmax = q[col].to_numpy()
+            iqr = q3 - q1
+            low, high = q1 - 1.5 * iqr, q3 + 1.5 * iqr
+            if block is not None:
+                values = block[:, j]
+                values = values[~np.isnan(values)]
+                inside = values[(values >= low) & (values <= high)]
+                whislo, whishi = (inside.min(), inside.max()) if inside.size else (q1, q3)
+                fliers = _fliers(values, whislo, whishi)
+            else:
+                whislo, whishi = max(vmin, low), min(vmax, high)
+                fliers = np.array([v for v in (vmin, vmax) if v < whislo or v > whishi])
+            result.append({"label": str(col), "med": med, "q1": q1, "q3": q3, "whislo": whislo,
+                           "whishi": whishi, "fliers": fliers, "min": vmin, "max": vmax})
+        return result
+    return _cached((version, "box", tuple(columns)), compute)
+
+
+def histogram_counts(df, col, bins, version=None, chunk_rows=SKETCH_CHUNK_ROWS):
+    """``(counts, edges)`` of ``col`` over ``bins`` equal-width bins, cached per (column, bins).
+
+    Counts are accumulated chunk by chunk, so no full copy of the column is made.
+    """
+    def compute():
+        if isinstance(df, outofcore.Dataset):
+            bounds = df.column_range(col)
+        else:
+            vmin = df[col].min()
+            bounds = None if pd.isna(vmin) else (vmin, df[col].max())
+        if bounds is None:
+            return np.zeros(bins, dtype=np.int64), np.linspace(0.0, 1.0, bins + 1)
+        vmin, vmax = bounds
+        if vmin == vmax:
+            vmin, vmax = vmin - 0.5, vmax + 0.5
+        edges = np.linspace(float(vmin), float(vmax), bins + 1)
+        counts = np.zeros(bins, dtype=np.int64)
+        for values in _chunks(df, col, chunk_rows):
+            counts += np.histogram(values[~np.isnan(values)], bins=edges)[0]
+        return counts, edges
+    return _cached((version, "histogram", col, bins), compute)
@@ -0,0 +1,67 @@
+import os
+import sqlite3
+import time
+
+import pandas as pd
+import pytest
+from streamlit.testing.v1 import AppTest
+
+import datastore
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+
+
+def find(widgets, label):
+    return next(w for w in widgets if w.label == label)
+
+
+@pytest.fixture
+def database(tmp_path):
+    path = tmp_path / "app.db"
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, name TEXT, score REAL)")
+        conn.executemany("INSERT INTO t VALUES (?, ?, ?)",
+                         [(i, f"name{i % 7}", None if i % 5 == 0 else i / 2) for i in range(500)])
+    return path
+
+
+@pytest.fixture
+def tiny_store(monkeypatch):
+    # As with EDA_MEMORY_BUDGET_MB=0 and a one-second EDA_IDLE_SECONDS
+    store = datastore.DatasetStore(budget_bytes=1, idle_seconds=1)
+    monkeypatch.setattr(datastore, "_store", store)
+    return store
+
+
+def full_load(at, database):
+    at.run()
+    find(at.sidebar.text_input, "Server name").set_value(f"sqlite:///{database}")
+    find(at.sidebar.button, "Connect to SQL Server").click()
+    at.run()
+    find(at.sidebar.radio, "Load mode").set_value("Full load")
+    at.run()
+    find(at.sidebar.button, "Load data").click()
+    at.run()
+    assert not at.exception
+
+
+def test_cleaning_survives_eviction(database, tiny_store):
+    at = AppTest.from_file(APP, default_timeout=60)
+    full_load(at, database)
+    find(at.button, "Clean").click()
+    at.run()
+    find(at.radio, "Choose fill method").set_value("Median")
+    find(at.button, "Fill Missing Values").click()
+    at.run()
+    assert not at.exception
+    assert "No missing values in your data." in [i.value for i in at.info]
+
+    # Another session's load pushes this session's idle datasets out
+    time.sleep(1.1)
+    datastore.put("other session", pd.DataFrame({"x": [1]}))
+    assert len(tiny_store) == 1
+    for _ in range(2):
+        at.run()
+        assert not at.exception
+        assert not at.error
+    assert "No missing values in your data." in [i.value for i in at.info]
@@ -0,0 +1,19 @@
+import pandas as pd
+
+import charts
+
+
+def test_other_row_does_not_overwrite_a_real_other_category():
+    df = pd.DataFrame({"cat": ["Other", "x", "y", "z"], "v": [50, 30, 10, 5]})
+    agg = charts.aggregate_bars(df, "cat", ["v"], top_n=2)
+    assert agg["v"].to_dict() == {"Other": 50, "x": 30, "Other (2 more)": 15}
+
+
+def test_other_label_avoids_collisions():
+    assert charts.other_label(["a", "Other (3 more)"], 3) == "Other (3 more)*"
+
+
+def test_hue_codes_fold_rare_values():
+    codes, labels = charts._hue_codes(pd.Series(["a", "a", "b", "c", None]), max_hues=2)
+    assert labels == ["a", "Other (2 more)"]
+    assert codes.tolist() == [0, 0, 1, 1, -1]
@@ -0,0 +1,16 @@
+import pandas as pd
+
+import cleaning
+import ingest
+
+
+def test_custom_fill_on_compact_text_column():
+    df = pd.DataFrame({"c": ["a", "b", "a", None] * 10})
+    compact = ingest.compact_frame(df)
+    assert isinstance(compact["c"].dtype, pd.CategoricalDtype)
+    step = cleaning.fill_missing("c", "Custom Value", "unknown")
+    for frame in (df, compact):
+        out = cleaning.apply_step(frame, step)
+        assert out["c"].isna().sum() == 0
+        assert out["c"].iloc[3] == "unknown"
+    assert compact["c"].isna().sum() == 10  # the input frame is left untouched
@@ -0,0 +1,54 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+import datastore
+
+
+def frame(n=1000, seed=0):
+    return pd.DataFrame({"a": np.random.default_rng(seed).random(n), "b": np.arange(n)})
+
+
+def test_shared_columns_are_counted_once():
+    store = datastore.DatasetStore()
+    base = store.put("base", frame())
+    single = store.total_bytes
+    derived = base.copy(deep=False)
+    derived["a"] = derived["a"] * 2
+    store.put("derived", derived)
+    assert store.total_bytes == single + derived["a"].nbytes
+
+
+def test_released_versions_are_evicted_over_budget():
+    store = datastore.DatasetStore(budget_bytes=30_000, idle_seconds=60)
+    store.put("upload 1", frame(seed=1), holder="session")
+    store.hold("session", ["upload 1"])
+    store.put("upload 2", frame(seed=2), holder="session")
+    assert "upload 1" in store and "upload 2" in store  # both held, over budget
+    store.hold("session", ["upload 2"])
+    assert "upload 1" not in store and "upload 2" in store
+
+
+def test_unheld_versions_go_least_recently_used_first():
+    store = datastore.DatasetStore(budget_bytes=40_000, idle_seconds=60)
+    store.put("old page", frame(seed=1))
+    store.put("other page", frame(seed=2))
+    store.get("old page")
+    store.put("new page", frame(seed=3))
+    assert list(store._values) == ["old page", "new page"]
+
+
+def test_idle_holders_stop_holding():
+    store = datastore.DatasetStore(budget_bytes=1, idle_seconds=0.05)
+    store.put("a", frame(), holder="closed tab")
+    store.put("b", frame(seed=1), holder="active")
+    assert "a" in store
+    time.sleep(0.1)
+    store.hold("active", ["b"])
+    assert "a" not in store and "b" in store
+
+
+def test_content_version_ignores_identity():
+    assert datastore.content_version(frame()) == datastore.content_version(frame())
+    assert datastore.content_version(frame()) != datastore.content_version(frame(seed=1))
@@ -0,0 +1,54 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+import pytest
+
+import cleaning
+import export
+
+
+def read(path, fmt):
+    if fmt == "Parquet":
+        return pq.read_table(path).to_pandas()
+    if fmt == "Feather":
+        return feather.read_feather(path)
+    codec = "gzip" if fmt == "CSV (gzip)" else "zstd"
+    with pa.CompressedInputStream(pa.OSFile(str(path)), codec) as f:
+        return pd.read_csv(io.BytesIO(f.read()))
+
+
+@pytest.mark.parametrize("fmt", list(export.FORMATS))
+def test_custom_fill_on_numeric_column_exports(tmp_path, fmt):
+    df = pd.DataFrame({"score": [1.5, np.nan, 2.0], "name": ["a", "b", None]})
+    cleaned = cleaning.apply_step(df, cleaning.fill_missing("score", "Custom Value", "unknown"))
+    path = tmp_path / f"out{export.FORMATS[fmt][0]}"
+    export.write(cleaned, fmt, str(path))
+    out = read(path, fmt)
+    assert out["score"].astype(str).tolist() == ["1.5", "unknown", "2.0"]
+    assert out["name"].isna().tolist() == [False, False, True]
+
+
+@pytest.mark.parametrize("fmt", ["Parquet", "Feather"])
+def test_object_column_typed_from_values_past_the_sample(tmp_path, fmt, monkeypatch):
+    monkeypatch.setattr(export, "TYPE_SAMPLE_ROWS", 2)
+    monkeypatch.setattr(export, "CHUNK_ROWS", 3)
+    df = pd.DataFrame({"late": pd.Series([None] * 5 + [pd.Timestamp("2024-01-02")], dtype=object),
+                       "mixed": pd.Series([None] * 5 + [3], dtype=object)})
+    df.loc[4, "mixed"] = "x"
+    path = tmp_path / "out"
+    export.write(df, fmt, str(path))
+    out = read(path, fmt)
+    assert out["late"].iloc[-1] == pd.Timestamp("2024-01-02")
+    assert out["mixed"].tolist()[-2:] == ["x", "3"]
+
+
+def test_named_index_and_empty_frame(tmp_path):
+    df = pd.DataFrame({"v": [1, 2]}, index=pd.Index([10, 20], name="id"))
+    export.write(df, "CSV (gzip)", tmp_path / "a.csv.gz")
+    assert read(tmp_path / "a.csv.gz", "CSV (gzip)").columns.tolist() == ["id", "v"]
+    export.write(df.iloc[:0], "Parquet", tmp_path / "b.parquet")
+    assert read(tmp_path / "b.parquet", "Parquet").index.name == "id"
@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import filters
+
+
+@pytest.fixture
+def df():
+    rng = np.random.default_rng(0)
+    n = 2000
+    labels = np.array([f"v{i}" for i in range(40)], dtype=object)
+    frame = pd.DataFrame({
+        "label": labels[rng.integers(0, 40, n)],
+        "cat": pd.Categorical(rng.choice(["a", "b", "c"], n)),
+        "x": rng.normal(size=n),
+        "k": rng.integers(0, 10, n),
+    })
+    frame.loc[rng.choice(n, 100, replace=False), "label"] = None
+    frame.loc[rng.choice(n, 100, replace=False), "x"] = np.nan
+    return frame
+
+
+@pytest.mark.parametrize("values", [
+    ["v1"],
+    ["v1", "v2", None],  # gather path with missing values
+    [f"v{i}" for i in range(30)],  # lookup path
+    [f"v{i}" for i in range(30)] + [np.nan],  # lookup path with missing values
+    ["not there"],
+    [],
+])
+def test_isin_matches_pandas(df, values):
+    mask = filters._isin_mask(filters.code_index(df, "label"), values, len(df))
+    np.testing.assert_array_equal(mask, df["label"].isin(values).to_numpy())
+
+
+def test_isin_on_categorical(df):
+    mask = filters._isin_mask(filters.code_index(df, "cat"), ["a", "c"], len(df))
+    np.testing.assert_array_equal(mask, df["cat"].isin(["a", "c"]).to_numpy())
+
+
+@pytest.mark.parametrize("low, high", [(-0.5, 0.5), (-10, 10), (0.25, 0.25), (3, 4), (1, -1)])
+def test_range_matches_pandas(df, low, high):
+    mask = filters._range_mask(filters.sorted_index(df, "x"), low, high, len(df))
+    np.testing.assert_array_equal(mask, df["x"].between(low, high).to_numpy())
+
+
+def test_value_counts_most_frequent_first(df):
+    counts = filters.value_counts(df, "label")
+    expected = df["label"].value_counts()
+    assert counts.to_dict() == expected.to_dict()
+    assert counts.is_monotonic_decreasing
+    # Ties keep the order of first appearance
+    ties = filters.value_counts(pd.DataFrame({"c": ["b", "a", "a", "b", "c"]}), "c")
+    assert ties.index.tolist() == ["b", "a", "c"]
+
+
+def test_apply_filters_matches_chained_masks(df):
+    predicates = {"label": ["v1", "v2", "v3"], "x": (-1.0, 1.0), "k": (2, 7)}
+    out = filters.apply_filters(df, predicates, version="test", columns=["k", "label"])
+    mask = df["label"].isin(predicates["label"]) & df["x"].between(-1, 1) & df["k"].between(2, 7)
+    pd.testing.assert_frame_equal(out, df.loc[mask, ["k", "label"]])
+
+
+def test_apply_filters_without_predicates(df):
+    assert filters.apply_filters(df, {}) is df
+    assert filters.apply_filters(df, {}, columns=["x"]).columns.tolist() == ["x"]
+    assert filters.column_range(pd.DataFrame({"x": [np.nan]}), "x") is None
+
+
+def test_index_candidates():
+    numeric = pd.RangeIndex(1_000_000)
+    assert filters.index_candidates(numeric)[:3] == [0, 1, 2]
+    assert len(filters.index_candidates(numeric)) == filters.TOP_K
+    assert filters.index_candidates(numeric, "123456", keep=[5]) == [5, 123456]
+    assert filters.index_candidates(numeric, "abc") == []
+    labels = pd.Index(["Alpha", "beta", "ALPINE"])
+    assert filters.index_candidates(labels, "alp") == ["Alpha", "ALPINE"]
@@ -0,0 +1,59 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import ingest
+
+
+def csv(rows):
+    return io.BytesIO(("a,b,n\n" + "".join(f"{a},{b},{n}\n" for a, b, n in rows)).encode())
+
+
+def test_text_after_the_sample_gives_one_type():
+    source = csv([(i, f"x{i}", i % 3) for i in range(200)] + [(f"s{i}", f"y{i}", i % 3) for i in range(100)])
+    df = ingest.read_csv(source, engine="c", chunksize=50)
+    expected = pd.read_csv(io.BytesIO(source.getvalue()))
+    pd.testing.assert_frame_equal(df, expected)
+    assert set(df["a"].map(type)) == {str}
+    assert df["n"].dtype == np.int64
+
+
+def test_digits_after_text_stay_text():
+    # Chunks of only digits in a text column would otherwise parse as numbers
+    source = csv([(i, f"x{i}" if i < 60 else str(i), 0.5) for i in range(200)])
+    df = ingest.read_csv(source, engine="c", chunksize=50)
+    assert set(df["b"].map(type)) == {str}
+    assert df["b"].iloc[-1] == "199"
+
+
+@pytest.mark.skipif(not ingest.HAS_PYARROW, reason="needs pyarrow")
+def test_engines_agree():
+    source = csv([(i, f"x{i % 7}", i / 4) for i in range(500)])
+    c = ingest.read_csv(source, engine="c", chunksize=100)
+    arrow = ingest.read_csv(source, engine="pyarrow")
+    pd.testing.assert_frame_equal(c, arrow, check_dtype=False)
+
+
+def test_compact_frame():
+    n = 1000
+    df = pd.DataFrame({
+        "small": np.arange(n) % 100,
+        "halves": np.arange(n) / 2,
+        "thirds": np.arange(n) / 3,
+        "label": pd.Series([f"c{i % 4}" for i in range(n)], dtype=object),
+        "unique": pd.Series([f"u{i}" for i in range(n)], dtype=object),
+        "mixed": pd.Series([1, "a"] * (n // 2), dtype=object),
+    })
+    out = ingest.compact_frame(df)
+    assert out["small"].dtype == np.int8
+    assert out["halves"].dtype == np.float32
+    assert out["thirds"].dtype == np.float64  # float32 would change the values
+    assert isinstance(out["label"].dtype, pd.CategoricalDtype)
+    assert out["unique"].dtype != object or ingest._ARROW_STRING is None
+    assert out["mixed"].dtype == object
+    assert out.attrs["memory_before"] == df.memory_usage(deep=True).sum()
+    assert out.memory_usage(deep=True).sum() < out.attrs["memory_before"]
+    for col in df.columns:
+        assert out[col].astype(object).tolist() == df[col].tolist()
@@ -0,0 +1,38 @@
+import tracemalloc
+
+import pytest
+
+import instrumentation
+
+
+@pytest.fixture(autouse=True)
+def no_tracing():
+    assert not tracemalloc.is_tracing()
+    yield
+    instrumentation._tracing_sessions.clear()
+    instrumentation._started_tracing = False
+    tracemalloc.stop()
+
+
+def test_tracing_follows_sessions_with_the_panel_on():
+    instrumentation._set_tracing("a", True, now=0)
+    instrumentation._set_tracing("b", True, now=0)
+    instrumentation._set_tracing("a", False, now=1)
+    assert tracemalloc.is_tracing()
+    instrumentation._set_tracing("b", False, now=2)
+    assert not tracemalloc.is_tracing()
+
+
+def test_abandoned_session_stops_tracing():
+    instrumentation._set_tracing("closed tab", True, now=0)
+    later = instrumentation.TRACING_EXPIRY_SECONDS + 1
+    instrumentation._set_tracing("other", False, now=later)
+    assert not tracemalloc.is_tracing()
+    assert instrumentation._tracing_sessions == {}
+
+
+def test_tracing_started_elsewhere_is_left_on():
+    tracemalloc.start()
+    instrumentation._set_tracing("a", True, now=0)
+    instrumentation._set_tracing("a", False, now=1)
+    assert tracemalloc.is_tracing()
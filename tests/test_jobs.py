@@ -0,0 +1,47 @@
+import threading
+
+import pytest
+
+import jobs
+
+
+def test_failed_job_is_retried():
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) == 1:
+            raise ConnectionError("transient")
+        return "ok"
+
+    runner = jobs.JobRunner()
+    job = runner.submit("load", "key", flaky)
+    with pytest.raises(ConnectionError):
+        job.future.result(timeout=5)
+    retry = runner.submit("load", "key", flaky)
+    assert retry is not job
+    assert retry.future.result(timeout=5) == "ok"
+    assert runner.submit("load", "key", flaky) is retry
+
+
+def test_new_key_cancels_the_running_job():
+    started, release = threading.Event(), threading.Event()
+
+    def slow():
+        started.set()
+        release.wait(5)
+        jobs.report(1.0)
+        return "slow"
+
+    runner = jobs.JobRunner()
+    first = runner.submit("chart", 1, slow)
+    started.wait(5)
+    second = runner.submit("chart", 2, lambda: "fast")
+    release.set()
+    with pytest.raises(jobs.Cancelled):
+        first.future.result(timeout=5)
+    assert second.future.result(timeout=5) == "fast"
+
+
+def test_report_outside_a_job_does_nothing():
+    jobs.report(0.5, "ignored")
@@ -0,0 +1,66 @@
+import os
+import time
+
+import pyarrow as pa
+import pytest
+
+import outofcore
+
+
+@pytest.fixture
+def spool_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(outofcore, "SPOOL_DIR", str(tmp_path / "spool"))
+    # Small blocks so the types are inferred from the first rows only
+    monkeypatch.setattr(outofcore, "READ_BLOCK_BYTES", 64)
+    return tmp_path
+
+
+def write_csv(path, header, rows):
+    path.write_text("\n".join([header] + rows) + "\n")
+    return str(path)
+
+
+def test_bad_cell_relaxes_only_its_column(spool_dir):
+    rows = [f"{i},{i * 10},{i}.5" for i in range(50)] + ["oops,1.5,2.5"]
+    ds = outofcore.spool_csv(write_csv(spool_dir / "a.csv", "id,count,score", rows), "a")
+    assert ds.schema.field("id").type == pa.string()
+    assert ds.schema.field("count").type == pa.float64()
+    assert ds.schema.field("score").type == pa.float64()
+    assert len(ds) == 51
+    assert ds.tail(1)["count"].tolist() == [1.5]
+
+
+def test_float_then_text_ends_as_text(spool_dir):
+    rows = [f"{i}" for i in range(50)] + ["1.5", "x"]
+    ds = outofcore.spool_csv(write_csv(spool_dir / "b.csv", "n", rows), "b")
+    assert ds.schema.field("n").type == pa.string()
+    assert ds.tail(2)["n"].tolist() == ["1.5", "x"]
+
+
+def test_prune_removes_least_recently_read_files(spool_dir, monkeypatch):
+    os.makedirs(outofcore.SPOOL_DIR)
+    old = time.time() - 2 * outofcore.SPOOL_IDLE_SECONDS
+    paths = []
+    for name in ["oldest", "older", "recent"]:
+        path = os.path.join(outofcore.SPOOL_DIR, f"{name}.parquet")
+        with open(path, "wb") as f:
+            f.write(b"x" * 100)
+        paths.append(path)
+    os.utime(paths[0], (old - 10, old - 10))
+    os.utime(paths[1], (old, old))
+    monkeypatch.setattr(outofcore, "SPOOL_BUDGET_BYTES", 150)
+    ds = outofcore.spool_csv(write_csv(spool_dir / "c.csv", "n", ["1", "2"]), "c")
+    # Both idle files go; the recently read one stays even though it is over budget
+    assert sorted(os.listdir(outofcore.SPOOL_DIR)) == ["c.parquet", "recent.parquet"]
+    assert ds.exists()
+
+
+def test_cache_hit_marks_the_file_as_used(spool_dir):
+    source = write_csv(spool_dir / "d.csv", "n", ["1", "2"])
+    ds = outofcore.spool_csv(source, "d")
+    os.utime(ds.path, (0, 0))
+    outofcore.spool_csv(source, "d")
+    assert os.path.getmtime(ds.path) > 0
+    os.utime(ds.path, (0, 0))
+    ds.head()
+    assert os.path.getmtime(ds.path) > 0
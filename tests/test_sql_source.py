@@ -0,0 +1,239 @@
+import sqlite3
+import time
+
+import pytest
+
+import sql_source
+
+
+@pytest.fixture
+def conn_str(tmp_path):
+    path = tmp_path / "stand_in.db"
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE t (id INTEGER, name TEXT, score REAL)")
+        conn.executemany("INSERT INTO t VALUES (?, ?, ?)",
+                         [(i, f"name{i % 5}", i / 2) for i in range(20)])
+    return f"{sql_source.SQLITE_PREFIX}{path}"
+
+
+class Tracked:
+    """A connection wrapper that remembers whether it was closed."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.closed = False
+
+    def cursor(self):
+        return self.conn.cursor()
+
+    def close(self):
+        self.closed = True
+        self.conn.close()
+
+
+def make_pool(conn_str, **kwargs):
+    created = []
+
+    def factory():
+        conn = Tracked(sql_source.connect(conn_str))
+        created.append(conn)
+        return conn
+    return sql_source.ConnectionPool(factory, **kwargs), created
+
+
+def test_connection_is_reused(conn_str):
+    pool, created = make_pool(conn_str)
+    with pool.connection() as first:
+        pass
+    with pool.connection() as second:
+        assert second.cursor().execute("SELECT COUNT(*) FROM t").fetchone() == (20,)
+    assert first is second
+    assert len(created) == 1
+    assert pool.size == 1
+
+
+def test_failed_ping_replaces_connection(conn_str):
+    dead = set()
+
+    def ping(conn):
+        if conn in dead:
+            raise sqlite3.OperationalError("server has gone away")
+        sql_source._ping(conn)
+
+    pool, created = make_pool(conn_str, ping=ping)
+    with pool.connection() as first:
+        pass
+    dead.add(first)
+    with pool.connection() as second:
+        pass
+    assert second is not first
+    assert first.closed
+    assert len(created) == 2
+    assert pool.size == 1
+
+
+def test_failed_ping_falls_back_to_next_idle_connection(conn_str):
+    dead = set()
+
+    def ping(conn):
+        if conn in dead:
+            raise sqlite3.OperationalError("server has gone away")
+
+    pool, created = make_pool(conn_str, ping=ping)
+    a, b = pool.acquire(), pool.acquire()
+    pool.release(a)
+    pool.release(b)
+    dead.add(b)  # most recently used, so tried first
+    conn = pool.acquire()
+    assert conn is a
+    assert b.closed
+    assert len(created) == 2
+
+
+def test_broken_connection_is_not_returned(conn_str):
+    pool, created = make_pool(conn_str)
+    with pytest.raises(sqlite3.OperationalError):
+        with pool.connection() as conn:
+            conn.cursor().execute("SELECT * FROM missing_table")
+    assert conn.closed
+    assert pool.size == 0
+    with pool.connection() as fresh:
+        assert fresh is not conn
+    assert len(created) == 2
+
+
+def test_evict_idle_closes_only_stale_connections(conn_str):
+    pool, created = make_pool(conn_str, idle_timeout=60)
+    a, b = pool.acquire(), pool.acquire()
+    pool.release(a)
+    now = time.monotonic()
+    pool._idle = [(a, now - 120)]  # returned two minutes ago
+    pool.release(b)
+    pool.evict_idle(now=now)
+    assert a.closed and not b.closed
+    assert pool.size == 1
+    pool.evict_idle(now=now + 61)
+    assert b.closed
+    assert pool.size == 0
+
+
+def test_checkout_times_out_when_pool_is_full(conn_str):
+    pool, _ = make_pool(conn_str, max_size=1, checkout_timeout=0.05)
+    conn = pool.acquire()
+    with pytest.raises(TimeoutError):
+        pool.acquire()
+    pool.release(conn)
+    assert pool.acquire() is conn
+
+
+def test_get_pool_is_shared_per_connection_string(conn_str):
+    assert sql_source.get_pool(conn_str) is sql_source.get_pool(conn_str)
+
+
+def test_primary_key_and_ordered_pages(conn_str):
+    with sql_source.connect(conn_str) as conn:
+        conn.execute("CREATE TABLE keyed (a INTEGER, b TEXT, v REAL, PRIMARY KEY (b, a))")
+        conn.executemany("INSERT INTO keyed VALUES (?, ?, ?)", [(i % 3, f"k{i}", i) for i in range(10)])
+        assert sql_source.primary_key(conn, "main", "main", "keyed", "sqlite") == ["b", "a"]
+        assert sql_source.primary_key(conn, "main", "main", "t", "sqlite") == []
+        ref = sql_source.table_ref("main", "main", "keyed", "sqlite")
+        pages = [sql_source.read_page(conn, ref, p, 4, "sqlite", order_by=["b", "a"]) for p in range(3)]
+    assert [list(p["b"]) for p in pages] == [sorted(f"k{i}" for i in range(10))[i:i + 4] for i in (0, 4, 8)]
+
+
+def test_page_query_orders_sql_server_pages():
+    sql, limit_first = sql_source.page_query("[db].[dbo].[t]", "mssql", ["id", "part"])
+    assert sql == ("SELECT * FROM [db].[dbo].[t] ORDER BY [id], [part] "
+                   "OFFSET ? ROWS FETCH NEXT ? ROWS ONLY")
+    assert not limit_first
+    assert "ORDER BY (SELECT NULL)" in sql_source.page_query("[t]", "mssql")[0]
+
+
+def test_build_where():
+    where, params = sql_source.build_where({"name": ["a", "b"], "score": (1.5, 3.0), "empty": []})
+    assert where == "[name] IN (?, ?) AND [score] BETWEEN ? AND ? AND 1 = 0"
+    assert params == ["a", "b", 1.5, 3.0]
+    assert sql_source.build_where({}, "sqlite") == ("", [])
+
+
+@pytest.mark.parametrize("dialect_name, sql, params", [
+    ("mssql", "SELECT TOP (?) [id], [name] FROM [t] WHERE [name] IN (?, ?) AND [score] BETWEEN ? AND ?",
+     [5, "name1", "name2", 0, 4]),
+    ("sqlite", 'SELECT "id", "name" FROM "t" WHERE "name" IN (?, ?) AND "score" BETWEEN ? AND ? LIMIT ?',
+     ["name1", "name2", 0, 4, 5]),
+])
+def test_filtered_query_parameter_order(dialect_name, sql, params):
+    ref = sql_source.quote_ident("t", dialect_name)
+    filters = {"name": ["name1", "name2"], "score": (0, 4)}
+    assert sql_source.filtered_query(ref, ["id", "name"], filters, dialect_name, limit=5) == (sql, params)
+
+
+def test_limit_query_without_limit_or_where():
+    assert sql_source.limit_query("*", "[t]") == ("SELECT * FROM [t]", [])
+    assert sql_source.limit_query("[c]", "[t]", distinct=True, limit=3) == ("SELECT DISTINCT TOP (?) [c] FROM [t]", [3])
+
+
+def test_read_filtered_on_sqlite(conn_str):
+    filters = {"name": ["name1", "name2"], "score": (0, 4)}
+    with sql_source.connect(conn_str) as conn:
+        df = sql_source.read_filtered(conn, '"t"', ["id", "name"], filters, "sqlite", limit=3)
+        total = sql_source.count_filtered(conn, '"t"', filters, "sqlite")
+        none = sql_source.count_filtered(conn, '"t"', {"name": []}, "sqlite")
+    assert list(df.columns) == ["id", "name"]
+    assert df["id"].tolist() == [1, 2, 6]
+    assert (total, none) == (4, 0)
+
+
+def test_distinct_values_limit_and_search(conn_str):
+    with sql_source.connect(conn_str) as conn:
+        conn.execute("INSERT INTO t VALUES (100, 'odd_%name', 0)")
+        assert len(sql_source.distinct_values(conn, '"t"', "name", "sqlite", limit=3)) == 3
+        assert sql_source.distinct_values(conn, '"t"', "name", "sqlite", search="E3") == ["name3"]
+        # LIKE wildcards in the search text match literally
+        assert sql_source.distinct_values(conn, '"t"', "name", "sqlite", search="_%") == ["odd_%name"]
+    assert sql_source.like_pattern("a_[b", "mssql") == "%a\\_\\[b%"
+
+
+def test_sweep_closes_idle_connections_and_drops_empty_pools(conn_str, monkeypatch):
+    monkeypatch.setattr(sql_source, "_pools", {})
+    pool = sql_source.get_pool(conn_str)
+    with pool.connection() as conn:
+        pass
+    busy = sql_source.get_pool(conn_str + "?busy")
+    held = busy.acquire()
+    sql_source.sweep_pools(now=time.monotonic() + sql_source.IDLE_TIMEOUT + 1)
+    assert pool.size == 0
+    assert list(sql_source._pools.values()) == [busy]
+    assert sql_source.get_pool(conn_str) is not pool
+    # A connection checked out of a dropped pool is closed when it comes back
+    with pytest.raises(sqlite3.ProgrammingError):
+        with pool.connection() as late:
+            pass
+        late.cursor()
+    busy.release(held)
+
+
+def test_interrupted_block_releases_its_connection(conn_str):
+    pool, created = make_pool(conn_str)
+    with pytest.raises(KeyboardInterrupt):
+        with pool.connection() as conn:
+            raise KeyboardInterrupt
+    assert conn.closed
+    assert pool.size == 0
+
+
+def test_mixed_type_column_loads_as_text(conn_str):
+    with sql_source.connect(conn_str) as conn:
+        conn.execute("CREATE TABLE loose (id INTEGER, v)")
+        conn.executemany("INSERT INTO loose VALUES (?, ?)",
+                         [(0, 1), (1, 2.5), (2, "s"), (3, None), (4, 7), (5, 8)])
+        ref = sql_source.table_ref("main", "main", "loose", "sqlite")
+        # The second batch is all integers; the column still comes back as one type
+        df = sql_source.load_table(conn, ref, batch_size=4)
+        page = sql_source.read_page(conn, ref, 0, 3, "sqlite", order_by="id")
+        filtered = sql_source.read_filtered(conn, ref, ["v"], {"id": (0, 2)}, "sqlite")
+    assert df["v"].tolist()[:3] == ["1", "2.5", "s"]
+    assert df["v"].isna().tolist() == [False, False, False, True, False, False]
+    assert df["v"].tolist()[4:] == ["7", "8"]
+    assert page["v"].tolist() == ["1", "2.5", "s"]
+    assert filtered["v"].tolist() == ["1", "2.5", "s"]
@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+import pytest
+from matplotlib import cbook
+
+import stats
+
+
+@pytest.fixture
+def values():
+    rng = np.random.default_rng(1)
+    v = np.concatenate([rng.lognormal(0, 2, 4000), -rng.lognormal(1, 1, 1500), np.zeros(300)])
+    v[rng.choice(v.size, 50, replace=False)] = np.nan
+    return rng.permutation(v)
+
+
+def within(estimate, true, accuracy=stats.SKETCH_ACCURACY):
+    return abs(estimate - true) <= accuracy * abs(true) + 1e-12
+
+
+@pytest.mark.parametrize("q", [0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99])
+def test_sketch_relative_accuracy(values, q):
+    sketch = stats.QuantileSketch().add(values)
+    assert within(sketch.quantile(q), np.nanquantile(values, q, method="lower"))
+
+
+def test_sketch_extremes_and_zero(values):
+    sketch = stats.QuantileSketch().add(values)
+    assert sketch.quantile(0) == np.nanmin(values)
+    assert sketch.quantile(1) == np.nanmax(values)
+    assert sketch.count == np.count_nonzero(~np.isnan(values))
+    zero_rank = (np.sort(values[~np.isnan(values)]) < 0).sum() + 150
+    assert sketch.quantile(zero_rank / (sketch.count - 1)) == 0.0
+    assert np.isnan(stats.QuantileSketch().quantile(0.5))
+
+
+def test_sketch_merge_equals_one_pass(values):
+    whole = stats.QuantileSketch().add(values)
+    merged = stats.QuantileSketch().add(values[:2000]).merge(stats.QuantileSketch().add(values[2000:]))
+    assert (merged.positive, merged.negative, merged.zero, merged.count) == \
+        (whole.positive, whole.negative, whole.zero, whole.count)
+    assert (merged.min, merged.max) == (whole.min, whole.max)
+
+
+def test_box_stats_match_matplotlib(monkeypatch, values):
+    monkeypatch.setattr(stats, "MAX_FLIERS", values.size)
+    df = pd.DataFrame({"v": values})
+    ours = stats.box_stats(df, ["v"])[0]
+    theirs = cbook.boxplot_stats(values[~np.isnan(values)], whis=1.5)[0]
+    for key in ("med", "q1", "q3", "whislo", "whishi"):
+        assert ours[key] == pytest.approx(theirs[key])
+    np.testing.assert_array_equal(np.sort(ours["fliers"]), np.sort(theirs["fliers"]))
+
+
+def test_box_stats_cap_fliers(monkeypatch, values):
+    monkeypatch.setattr(stats, "MAX_FLIERS", 10)
+    fliers = stats.box_stats(pd.DataFrame({"v": values}), ["v"])[0]["fliers"]
+    assert fliers.size == 10
+    assert np.nanmax(values) in fliers and np.nanmin(values) in fliers
+
+
+def test_sketched_box_stats(monkeypatch, values):
+    monkeypatch.setattr(stats, "SKETCH_MIN_ROWS", 100)
+    monkeypatch.setattr(stats, "SKETCH_CHUNK_ROWS", 999)
+    ours = stats.box_stats(pd.DataFrame({"v": values}), ["v"])[0]
+    for key, q in (("q1", 0.25), ("med", 0.5), ("q3", 0.75)):
+        assert within(ours[key], np.nanquantile(values, q, method="lower"))
+    iqr = ours["q3"] - ours["q1"]
+    assert ours["whislo"] == max(np.nanmin(values), ours["q1"] - 1.5 * iqr)
+    assert ours["whishi"] == min(np.nanmax(values), ours["q3"] + 1.5 * iqr)
+    assert np.nanmax(values) in ours["fliers"]
+
+
+@pytest.mark.parametrize("chunk_rows", [7, 1000, 10_000])
+def test_chunked_histogram_matches_numpy(values, chunk_rows):
+    counts, edges = stats.histogram_counts(pd.DataFrame({"v": values}), "v", 20, chunk_rows=chunk_rows)
+    expected, expected_edges = np.histogram(values[~np.isnan(values)], bins=20)
+    np.testing.assert_array_equal(counts, expected)
+    np.testing.assert_allclose(edges, expected_edges)
+
+
+def test_histogram_of_constant_and_empty_columns():
+    counts, edges = stats.histogram_counts(pd.DataFrame({"v": [3.0, 3.0]}), "v", 4)
+    assert counts.sum() == 2 and edges[0] < 3 < edges[-1]
+    counts, _ = stats.histogram_counts(pd.DataFrame({"v": [np.nan]}), "v", 4)
+    assert counts.sum() == 0
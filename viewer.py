@@ -0,0 +1,92 @@
+"""Paginated table viewer.
+
+``st.dataframe(df)`` sends the whole frame to the browser on every rerun.
+:func:`show_frame` sends only the visible page. Sorting is done here on the
+server, and pages are kept as Arrow tables in a shared cache keyed by the
+frame's version, so paging through a large result costs one slice each.
+Out-of-core datasets are paged straight from their row groups, unsorted.
+"""
+import math
+
+import pyarrow as pa
+import streamlit as st
+
+import outofcore
+from cache import ByteLRUCache
+
+PAGE_SIZES = [25, 50, 100, 500, 1000]
+DEFAULT_PAGE_SIZE = 100
+CACHE_BUDGET_BYTES = 256 * 1024 ** 2
+
+_pages = ByteLRUCache(CACHE_BUDGET_BYTES, sizeof=lambda t: t.nbytes)
+_orders = ByteLRUCache(CACHE_BUDGET_BYTES, sizeof=lambda a: a.nbytes)
+
+
+def sort_order(df, column, ascending=True, version=None):
+    """Row positions of ``df`` sorted by ``column`` (missing values last)."""
+    key = (version, column, ascending)
+    order = _orders.get(key) if version is not None else None
+    if order is None:
+        s = df[column].reset_index(drop=True)
+        order = s.sort_values(ascending=ascending, kind="stable", na_position="last").index.to_numpy()
+        if version is not None:
+            _orders.put(key, order)
+    return order
+
+
+def _to_arrow(page):
+    try:
+        return pa.Table.from_pandas(page)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError):
+        # Mixed-type object columns: show them as text, like st.dataframe does
+        fixed = page.copy()
+        for col in fixed.columns:
+            if fixed[col].dtype == object:
+                fixed[col] = fixed[col].astype(str)
+        return pa.Table.from_pandas(fixed)
+
+
+def page_table(df, page, page_size, sort_by=None, ascending=True, version=None):
+    """Arrow table for page ``page`` (0-based) of ``df``, cached per version."""
+    key = (version, sort_by, ascending, page, page_size)
+    table = _pages.get(key) if version is not None else None
+    if table is None:
+        start = page * page_size
+        stop = min(start + page_size, len(df))
+        if isinstance(df, outofcore.Dataset):
+            table = df.read_rows(start, stop)
+        else:
+            if sort_by is None:
+                rows = df.iloc[start:stop]
+            else:
+                rows = df.take(sort_order(df, sort_by, ascending, version)[start:stop])
+            table = _to_arrow(rows)
+        if version is not None:
+            _pages.put(key, table)
+    return table
+
+
+def show_frame(df, key, version=None):
+    """Render ``df`` one page at a time with server-side sorting.
+
+    ``key`` must be unique per call site; ``version`` identifies the frame's
+    content and enables caching (pass ``None`` for frames that change in place).
+    """
+    n = len(df)
+    c1, c2, c3, c4 = st.columns([2, 1, 1, 1])
+    sortable = [] if isinstance(df, outofcore.Dataset) else list(df.columns)
+    sort_by = c1.selectbox("Sort by", [None] + sortable, key=f"{key}_sort",
+                           format_func=lambda c: "(original order)" if c is None else str(c))
+    ascending = c2.checkbox("Ascending", value=True, key=f"{key}_asc")
+    page_size = c3.selectbox("Rows per page", PAGE_SIZES, index=PAGE_SIZES.index(DEFAULT_PAGE_SIZE),
+                             key=f"{key}_size")
+    pages = max(1, math.ceil(n / page_size))
+    page_key = f"{key}_page"
+    # Keep the page number valid when the frame shrinks (e.g. a new filter)
+    if st.session_state.get(page_key, 1) > pages:
+        st.session_state[page_key] = 1
+    page = int(c4.number_input(f"Page (of {pages:,})", 1, pages, key=page_key)) - 1
+
+    st.dataframe(page_table(df, page, page_size, sort_by, ascending, version))
+    start = page * page_size
+    st.caption(f"Rows {min(start + 1, n):,}–{min(start + page_size, n):,} of {n:,}")